@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""
+计算核心微基准
+
+对房贷月供、成本推算、收支平衡网格、评分和 Excel 报告生成等热点函数计时，不需要浏览器。
+每个基准先自动确定循环次数，使单次测量不少于 0.2 秒，再重复多次取每次调用耗时的最小值和中位数。
+结果可以保存为 JSON 基线文件；与基线对比时，最小耗时变慢超过阈值的基准会被标记为回归，并以非零状态码退出。
+基线与机器有关，只保存在本地（不纳入版本库）：没有基线文件时本次结果直接保存为基线；基线记录的运行环境
+（主机、Python、NumPy 版本）与当前不同时只显示比值，不判定回归，需要用 --save 重新生成。
+
+用法:
+    python benchmarks/bench_core.py                       # 运行并与基线对比，首次运行时生成基线
+    python benchmarks/bench_core.py --save                # 运行并更新基线
+    python benchmarks/bench_core.py --threshold 0.3 grid  # 只运行名称包含 grid 的基准，阈值30%
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import timeit
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from rent_vs_buy_model import (
+    calculate_buy_vs_rent,
+    calculate_economic_score,
+    calculate_flexibility_score,
+    calculate_mortgage_payment,
+    calculate_summary,
+    compute_break_even_grid,
+    compute_break_even_grid_adaptive,
+)
+from rent_vs_buy_report import generate_excel_report
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline_core.json')
+
+# 与页面侧边栏默认值一致的参数
+BASE_PARAMS = {
+    'house_price': 5000000,
+    'down_payment_percent': 30,
+    'loan_years': 30,
+    'loan_rate': 4.9,
+    'repayment_method': 'equal_installment',
+    'monthly_rent': 8000,
+    'rent_growth': 5.0,
+    'investment_return': 6.0,
+    'property_fee': 5,
+    'property_area': 100,
+    'property_tax': 0.5,
+    'maintenance_fund': 10000,
+    'living_years': 10,
+    'house_price_growth': 3.0,
+    'inflation_rate': 2.5,
+    'use_real_returns': True,
+    'use_housing_fund': False,
+    'housing_fund_amount': 0,
+    'housing_fund_rate': 3.1,
+}
+
+SCORES = {'buy_economic': 60.0, 'buy_flexibility': 25, 'rent_economic': 40.0, 'rent_flexibility': 75}
+
+
+def _grid(params, row_key, col_key, resolution, adaptive=False):
+    """与页面敏感度热力图相同的网格范围"""
+    spans = {'house_price_growth': (5, -np.inf), 'rent_growth': (5, -np.inf),
+             'loan_rate': (3, 1), 'investment_return': (3, 1)}
+    axes = []
+    for key in (row_key, col_key):
+        span, floor = spans[key]
+        axes.append(np.linspace(max(params[key] - span, floor), params[key] + span, resolution))
+    compute = compute_break_even_grid_adaptive if adaptive else compute_break_even_grid
+    return lambda: compute(params, row_key, axes[0], col_key, axes[1])
+
+
+def build_benchmarks():
+    """基准名称 -> 无参数的可调用对象"""
+    benchmarks = {
+        'mortgage_payment': lambda: calculate_mortgage_payment(3500000, 4.9, 30),
+    }
+    for living_years in (1, 10, 30):
+        params = {**BASE_PARAMS, 'living_years': living_years}
+        benchmarks[f'buy_vs_rent_{living_years}y'] = lambda params=params: calculate_buy_vs_rent(params)
+    benchmarks['summary_10y'] = lambda: calculate_summary(BASE_PARAMS)
+
+    for name, row_key, col_key in (('price_rent', 'house_price_growth', 'rent_growth'),
+                                   ('rate_invest', 'loan_rate', 'investment_return')):
+        benchmarks[f'grid_{name}_5'] = _grid(BASE_PARAMS, row_key, col_key, 5)
+        benchmarks[f'grid_{name}_100'] = _grid(BASE_PARAMS, row_key, col_key, 100)
+        benchmarks[f'grid_{name}_100_adaptive'] = _grid(BASE_PARAMS, row_key, col_key, 100, adaptive=True)
+
+    results, summary = calculate_buy_vs_rent(BASE_PARAMS)
+    benchmarks['economic_score'] = lambda: calculate_economic_score(BASE_PARAMS, summary)
+    benchmarks['flexibility_score'] = lambda: calculate_flexibility_score(BASE_PARAMS, summary)
+    benchmarks['generate_excel'] = lambda: generate_excel_report(BASE_PARAMS, results, summary, SCORES)
+    return benchmarks
+
+
+def time_call(func, repeat=5, min_time=0.2):
+    """返回每次调用的耗时样本（秒）"""
+    timer = timeit.Timer(func)
+    number, elapsed = timer.autorange()
+    if elapsed < min_time:
+        number = max(1, int(number * min_time / max(elapsed, 1e-9)))
+    return [t / number for t in timer.repeat(repeat=repeat, number=number)]
+
+
+def compare(results, baseline, threshold):
+    """与基线对比，返回 {名称: 相对基线的比值} 和超过阈值的回归列表"""
+    ratios, regressions = {}, []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        ratio = result['min_s'] / baseline[name]['min_s']
+        ratios[name] = ratio
+        if ratio > 1 + threshold:
+            regressions.append(name)
+    return ratios, regressions
+
+
+def environment():
+    """基线记录的运行环境，环境不同的基线之间不判定回归"""
+    return {
+        'host': platform.node(),
+        'machine': platform.machine(),
+        'python': sys.version.split()[0],
+        'numpy': np.__version__,
+    }
+
+
+def _format_time(seconds):
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:9.1f} us"
+    return f"{seconds * 1e3:9.2f} ms"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5, help='每个基准的重复次数')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='基线 JSON 文件')
+    parser.add_argument('--save', action='store_true', help='把本次结果写入基线文件')
+    parser.add_argument('--threshold', type=float, default=0.2, help='判定回归的相对变慢幅度（默认0.2即20%%）')
+    parser.add_argument('filters', nargs='*', help='只运行名称包含任一关键字的基准，默认全部')
+    args = parser.parse_args(argv)
+
+    baseline, same_environment = {}, True
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            saved = json.load(f)
+        baseline = saved['results']
+        same_environment = all(saved.get(key) == value for key, value in environment().items())
+        if not same_environment:
+            print(f"基线 {args.baseline} 来自不同的运行环境，只显示比值、不判定回归；可用 --save 重新生成")
+    elif not args.save:
+        print(f"未找到基线 {args.baseline}，本次结果将保存为基线")
+        args.save = True
+
+    results = {}
+    for name, func in build_benchmarks().items():
+        if args.filters and not any(key in name for key in args.filters):
+            continue
+        samples = time_call(func, args.repeat)
+        results[name] = {'median_s': statistics.median(samples), 'min_s': min(samples)}
+
+    ratios, regressions = compare(results, baseline, args.threshold)
+    if not same_environment:
+        regressions = []
+    for name, result in results.items():
+        line = f"{name:<30} 最小 {_format_time(result['min_s'])}   中位数 {_format_time(result['median_s'])}"
+        if name in ratios:
+            line += f"   基线 x{ratios[name]:.2f}" + ("  <-- 回归" if name in regressions else "")
+        print(line)
+
+    if args.save:
+        # 只更新本次运行的基准，保留基线中同一环境下其他基准的记录
+        merged = {**baseline, **results} if same_environment else results
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({
+                **environment(),
+                'repeat': args.repeat,
+                'results': merged,
+            }, f, indent=2, sort_keys=False)
+        print(f"基线已保存到 {args.baseline}")
+
+    if regressions and not args.save:
+        print(f"{len(regressions)} 个基准相对基线变慢超过 {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
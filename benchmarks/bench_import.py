@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+冷启动导入耗时基准
+
+每次测量都在全新的 Python 子进程中导入目标模块，记录导入所需的墙钟时间，取多次运行的中位数。
+用于跟踪页面启动时需要加载的依赖，避免重型可视化库重新回到启动路径上。
+
+用法:
+    python benchmarks/bench_import.py
+    python benchmarks/bench_import.py --repeat 10 --json import_times.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 页面启动时导入的模块组合，以及用于对比的单个依赖
+TARGETS = {
+    'rent_vs_buy_model': 'import rent_vs_buy_model',
+    'page_imports': 'import streamlit, numpy, pandas, plotly.graph_objects, rent_vs_buy_model',
+    'streamlit': 'import streamlit',
+    'numpy': 'import numpy',
+    'pandas': 'import pandas',
+    'plotly.graph_objects': 'import plotly.graph_objects',
+    'plotly.subplots': 'import plotly.subplots',
+}
+
+_TIMER = (
+    "import time, sys\n"
+    "start = time.perf_counter()\n"
+    "{statement}\n"
+    "sys.stdout.write(repr(time.perf_counter() - start))\n"
+)
+
+
+def time_import(statement, repeat=5):
+    """在新的子进程中重复执行导入语句，返回每次的耗时（秒）"""
+    samples = []
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, '-c', _TIMER.format(statement=statement)],
+            cwd=ROOT, capture_output=True, text=True, check=True,
+        )
+        samples.append(float(out.stdout))
+    return samples
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5, help='每个目标的测量次数')
+    parser.add_argument('--json', help='把结果写入 JSON 文件')
+    parser.add_argument('targets', nargs='*', help='只测量指定的目标，默认全部')
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name in args.targets or TARGETS:
+        try:
+            samples = time_import(TARGETS[name], args.repeat)
+        except subprocess.CalledProcessError as exc:
+            print(f"{name:<24} 导入失败: {exc.stderr.strip().splitlines()[-1]}")
+            continue
+        results[name] = {'median_s': statistics.median(samples), 'min_s': min(samples)}
+        print(f"{name:<24} 中位数 {results[name]['median_s'] * 1000:8.1f} ms   最小 {results[name]['min_s'] * 1000:8.1f} ms")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'python': sys.version.split()[0], 'repeat': args.repeat, 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
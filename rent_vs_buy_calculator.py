@@ -5,19 +5,60 @@ Created on Fri Feb 28 09:09:27 2025
 @author: zhisen
 """
 
+import os
+
 import streamlit as st
 import numpy as np
-import pandas as pd
 import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import plotly.express as px
-import matplotlib.pyplot as plt
-import seaborn as sns
-from io import BytesIO
-import base64
 from datetime import datetime
-import matplotlib
-matplotlib.use('Agg')
+
+from rent_vs_buy_model import (
+    BREAK_EVEN_HORIZON,
+    MONTE_CARLO_DEFAULTS,
+    REPAYMENT_METHODS,
+    RESOLUTION_STEPS,
+    cached_break_even_grid,
+    cached_calculate_buy_vs_rent,
+    cached_calculate_summary,
+    calculate_economic_score,
+    calculate_flexibility_score,
+    calculate_sensitivities,
+    calculate_loan_schedule,
+    calculate_personal_scores,
+    canonical_params_key,
+    compare_configs,
+    one_at_a_time_sweep,
+    optimize_prepayment_strategy,
+    simulate_monte_carlo,
+    solve_break_even,
+)
+from rent_vs_buy_charts import line_trace, multi_line_trace, percentile_band_traces, percentile_bands
+from rent_vs_buy_report import cached_excel_report
+from rent_vs_buy_profiling import RenderProfiler
+from rent_vs_buy_store import ConfigStore
+
+# 页面区段对输入的依赖。MODEL_INPUTS 代表除个人因素外的全部侧边栏控件（构成模型参数 params 以及市场周期、供需状况），
+# 它们改变时整页重新运行。其余输入是各区段自己的控件：这些区段写成片段（st.fragment），
+# 只调整自己的控件时只重新运行该片段，不重新计算敏感度网格、其他图表和报告。
+# 新增区段或控件时同步更新此表，片段内不得赋值片段外会用到的变量。
+MODEL_INPUTS = '模型参数'
+SECTION_INPUTS = {
+    '关键决策指标': (MODEL_INPUTS,),
+    '成本对比趋势': (MODEL_INPUTS,),
+    '参数敏感度分析': (MODEL_INPUTS, 'grid_resolution', 'adaptive_grid', 'sensitivity_target', 'sweep_range'),
+    '决策矩阵分析': (MODEL_INPUTS,),
+    '情景分析': (MODEL_INPUTS, 'scenario_price', 'scenario_rent', 'scenario_inv'),
+    '风险评估': (MODEL_INPUTS,),
+    '蒙特卡洛风险模拟': (MODEL_INPUTS, 'mc_paths', 'mc_house_vol', 'mc_inv_vol', 'mc_seed'),
+    '提前还款与转贷策略': (MODEL_INPUTS, 'prepay_cash', 'refinance_rate', 'rate_change_year', 'refinance_cost'),
+    '财务摘要': (MODEL_INPUTS,),
+    '个人因素评估': ('career_stability', 'family_plan', 'mobility_need', 'ownership_importance'),
+    '房贷与投资收益对比': (MODEL_INPUTS,),
+    '报告生成': (MODEL_INPUTS, 'config_name'),
+    '已保存的参数配置': ('saved_order', 'saved_max_price', 'saved_max_break_even', 'selected_config', 'compare_count'),
+}
+# 写成片段的区段；报告生成区段的保存按钮需要刷新已保存配置列表，保持整页运行
+FRAGMENT_SECTIONS = ('参数敏感度分析', '情景分析', '蒙特卡洛风险模拟', '提前还款与转贷策略', '个人因素评估', '已保存的参数配置')
 
 # 设置页面配置
 st.set_page_config(
@@ -27,6 +68,20 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# 渲染计时：在地址后加 ?profile=1 或设置环境变量 RENT_VS_BUY_PROFILE=1 开启，页面底部显示性能调试面板
+profiling_enabled = st.query_params.get('profile') == '1' or os.environ.get('RENT_VS_BUY_PROFILE') == '1'
+profiler = RenderProfiler(enabled=profiling_enabled)
+profiler.mark("页面初始化")
+# 模型调用逐次计时（未开启时为原函数）
+(cached_calculate_buy_vs_rent, cached_calculate_summary, cached_break_even_grid, calculate_sensitivities,
+ one_at_a_time_sweep, simulate_monte_carlo, optimize_prepayment_strategy, calculate_loan_schedule,
+ calculate_economic_score, calculate_flexibility_score, calculate_personal_scores, compare_configs,
+ solve_break_even) = map(profiler.wrap, (
+    cached_calculate_buy_vs_rent, cached_calculate_summary, cached_break_even_grid, calculate_sensitivities,
+    one_at_a_time_sweep, simulate_monte_carlo, optimize_prepayment_strategy, calculate_loan_schedule,
+    calculate_economic_score, calculate_flexibility_score, calculate_personal_scores, compare_configs,
+    solve_break_even))
+
 # 自定义CSS样式
 st.markdown("""
 <style>
@@ -131,6 +186,25 @@ st.markdown("""
 st.markdown('<div class="main-header">买房 vs 租房决策分析工具</div>', unsafe_allow_html=True)
 st.markdown('这个工具可以帮助您分析在当前经济和市场条件下，买房和租房哪种选择更加经济。通过调整左侧的参数，探索不同场景下的最佳决策。')
 
+@st.cache_resource
+def get_config_store():
+    """所有会话共享的参数配置存储"""
+    return ConfigStore()
+
+
+config_store = get_config_store()
+
+# 载入已保存的配置：在侧边栏控件创建之前写入对应的会话状态
+pending_config = st.session_state.pop('_pending_config', None)
+if pending_config is not None:
+    for key, value in pending_config.items():
+        # 未启用公积金贷款时相关控件不会创建，不写入其取值
+        if key in ('housing_fund_amount', 'housing_fund_rate') and not pending_config.get('use_housing_fund'):
+            continue
+        st.session_state[key] = value
+
+profiler.mark("侧边栏参数")
+
 # 创建侧边栏参数输入区
 st.sidebar.markdown('## 参数设置')
 
@@ -145,7 +219,8 @@ with st.sidebar.expander("经济参数", expanded=True):
             max_value=20000000, 
             value=5000000, 
             step=100000,
-            format="%d"
+            format="%d",
+            key="house_price"
         )
     with col2:
         st.markdown('<div class="tooltip" data-tip="目标房产总价">?</div>', unsafe_allow_html=True)
@@ -159,7 +234,8 @@ with st.sidebar.expander("经济参数", expanded=True):
             max_value=100, 
             value=30, 
             step=5,
-            format="%d%%"
+            format="%d%%",
+            key="down_payment_percent"
         )
     with col2:
         st.markdown('<div class="tooltip" data-tip="首付款占房价的百分比">?</div>', unsafe_allow_html=True)
@@ -172,7 +248,8 @@ with st.sidebar.expander("经济参数", expanded=True):
             min_value=10, 
             max_value=30, 
             value=30, 
-            step=5
+            step=5,
+            key="loan_years"
         )
     with col2:
         st.markdown('<div class="tooltip" data-tip="按揭贷款期限">?</div>', unsafe_allow_html=True)
@@ -186,11 +263,25 @@ with st.sidebar.expander("经济参数", expanded=True):
             max_value=10.0, 
             value=4.9, 
             step=0.1,
-            format="%.1f%%"
+            format="%.1f%%",
+            key="loan_rate"
         )
     with col2:
         st.markdown('<div class="tooltip" data-tip="商业贷款年利率">?</div>', unsafe_allow_html=True)
     
+    # 还款方式
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        repayment_method = st.radio(
+            "还款方式",
+            options=list(REPAYMENT_METHODS),
+            format_func=REPAYMENT_METHODS.get,
+            horizontal=True,
+            key="repayment_method"
+        )
+    with col2:
+        st.markdown('<div class="tooltip" data-tip="等额本息每月还款额固定；等额本金每月偿还相同本金，月供逐月递减">?</div>', unsafe_allow_html=True)
+    
     # 月租金
     col1, col2 = st.columns([3, 1])
     with col1:
@@ -200,7 +291,8 @@ with st.sidebar.expander("经济参数", expanded=True):
             max_value=50000, 
             value=8000, 
             step=500,
-            format="%d"
+            format="%d",
+            key="monthly_rent"
         )
     with col2:
         st.markdown('<div class="tooltip" data-tip="当前市场租金(元/月)">?</div>', unsafe_allow_html=True)
@@ -214,7 +306,8 @@ with st.sidebar.expander("经济参数", expanded=True):
             max_value=15.0, 
             value=5.0, 
             step=0.5,
-            format="%.1f%%"
+            format="%.1f%%",
+            key="rent_growth"
         )
     with col2:
         st.markdown('<div class="tooltip" data-tip="租金年均增长率">?</div>', unsafe_allow_html=True)
@@ -228,7 +321,8 @@ with st.sidebar.expander("经济参数", expanded=True):
             max_value=20.0, 
             value=6.0, 
             step=0.5,
-            format="%.1f%%"
+            format="%.1f%%",
+            key="investment_return"
         )
     with col2:
         st.markdown('<div class="tooltip" data-tip="首付款替代投资年化收益">?</div>', unsafe_allow_html=True)
@@ -242,7 +336,8 @@ with st.sidebar.expander("经济参数", expanded=True):
             max_value=20, 
             value=5, 
             step=1,
-            format="%d"
+            format="%d",
+            key="property_fee"
         )
     with col2:
         st.markdown('<div class="tooltip" data-tip="物业管理费单价(元/㎡/月)">?</div>', unsafe_allow_html=True)
@@ -256,7 +351,8 @@ with st.sidebar.expander("经济参数", expanded=True):
             max_value=500, 
             value=100, 
             step=10,
-            format="%d"
+            format="%d",
+            key="property_area"
         )
     with col2:
         st.markdown('<div class="tooltip" data-tip="房产建筑面积，用于计算物业费">?</div>', unsafe_allow_html=True)
@@ -270,7 +366,8 @@ with st.sidebar.expander("经济参数", expanded=True):
             max_value=2.0, 
             value=0.5, 
             step=0.1,
-            format="%.1f%%"
+            format="%.1f%%",
+            key="property_tax"
         )
     with col2:
         st.markdown('<div class="tooltip" data-tip="房产评估价值年税率">?</div>', unsafe_allow_html=True)
@@ -285,14 +382,15 @@ with st.sidebar.expander("经济参数", expanded=True):
             value=10000, 
             step=1000,
             format="%d",
-            help="每年房价的百分比，用于房屋维护和修缮，不同于物业费。例如：0.5%表示每年需拿出房价0.5%的金额用于维护"
+            help="每年房价的百分比，用于房屋维护和修缮，不同于物业费。例如：0.5%表示每年需拿出房价0.5%的金额用于维护",
+            key="maintenance_fund"
         )
     with col2:
         st.markdown('<div class="tooltip" data-tip="年均房屋维护费用(元/年)">?</div>', unsafe_allow_html=True)
     
     st.markdown("### 公积金贷款设置")
     
-    use_housing_fund = st.checkbox("使用公积金贷款", value=False)
+    use_housing_fund = st.checkbox("使用公积金贷款", value=False, key="use_housing_fund")
     
     if use_housing_fund:
         col1, col2 = st.columns([3, 1])
@@ -304,7 +402,8 @@ with st.sidebar.expander("经济参数", expanded=True):
                 value=800000, 
                 step=100000,
                 format="%d",
-                help="公积金贷款最高额度，单人80万，夫妻两人最高160万"
+                help="公积金贷款最高额度，单人80万，夫妻两人最高160万",
+                key="housing_fund_amount"
             )
         with col2:
             st.markdown('<div class="tooltip" data-tip="公积金贷款额度">?</div>', unsafe_allow_html=True)
@@ -318,7 +417,8 @@ with st.sidebar.expander("经济参数", expanded=True):
                 value=3.1, 
                 step=0.1,
                 format="%.1f%%",
-                help="当前公积金贷款基准利率为3.1%"
+                help="当前公积金贷款基准利率为3.1%",
+                key="housing_fund_rate"
             )
         with col2:
             st.markdown('<div class="tooltip" data-tip="公积金贷款年利率">?</div>', unsafe_allow_html=True)
@@ -361,7 +461,8 @@ with st.sidebar.expander("市场参数", expanded=True):
             min_value=1, 
             max_value=30, 
             value=10, 
-            step=1
+            step=1,
+            key="living_years"
         )
     with col2:
         st.markdown('<div class="tooltip" data-tip="预计持有/租住时长(年)">?</div>', unsafe_allow_html=True)
@@ -375,7 +476,8 @@ with st.sidebar.expander("市场参数", expanded=True):
             max_value=15.0, 
             value=3.0, 
             step=0.5,
-            format="%.1f%%"
+            format="%.1f%%",
+            key="house_price_growth"
         )
     with col2:
         st.markdown('<div class="tooltip" data-tip="预期房产年均增值率">?</div>', unsafe_allow_html=True)
@@ -389,13 +491,21 @@ with st.sidebar.expander("市场参数", expanded=True):
             max_value=10.0, 
             value=2.5, 
             step=0.1,
-            format="%.1f%%"
+            format="%.1f%%",
+            key="inflation_rate"
         )
     with col2:
         st.markdown('<div class="tooltip" data-tip="年度通货膨胀率，用于计算实际收益率">?</div>', unsafe_allow_html=True)
     
     # 是否考虑通货膨胀进行实际收益率计算
-    use_real_returns = st.checkbox("使用实际收益率计算（考虑通货膨胀）", value=True)
+    use_real_returns = st.checkbox("使用实际收益率计算（考虑通货膨胀）", value=True, key="use_real_returns")
+    
+    # 按月扫描可以发现年内出现又消失的短暂收支平衡
+    monthly_resolution = st.checkbox(
+        "按月精度计算",
+        value=False,
+        help="按月扫描租房与买房的有效成本差额来定位收支平衡区间（默认按年扫描），收支平衡时间均在区间内精确求解；图表仍按年展示"
+    )
     
     # 添加市场周期位置滑块
     market_cycle = st.slider(
@@ -419,258 +529,159 @@ with st.sidebar.expander("市场参数", expanded=True):
         help="负值表示供大于求，正值表示供不应求，0表示平衡"
     )
 
-with st.sidebar.expander("个人因素", expanded=False):
-    career_stability = st.slider(
-        "职业稳定性", 
-        min_value=1, 
-        max_value=10, 
-        value=7, 
-        step=1,
-        help="1=非常不稳定，10=非常稳定"
-    )
+# 个人因素控件由主区域的个人因素评估片段渲染到这里，调整后只重新运行该片段
+personal_factor_panel = st.sidebar.expander("个人因素", expanded=False)
+personal_factor_panel.caption("只影响个人因素评估，调整后不会重新计算其他部分")
+
+# 图表函数
+@st.cache_data(max_entries=64, show_spinner=False)
+def break_even_heatmap_figure(params_key, _params, row_key, row_values, col_key, col_values,
+                              title, row_label, col_label, adaptive=False):
+    """计算收支平衡年限网格并生成Plotly热力图
+
+    params_key 为 canonical_params_key(_params)，与网格取值一起作为缓存键；相同输入的重复运行直接复用图表。
+    网格较密时不再逐格标注数值，只通过悬停查看。
+    """
+    living_years = _params['living_years']
+    matrix, n_evaluated = cached_break_even_grid(_params, row_key, row_values, col_key, col_values, adaptive)
+    matrix = np.nan_to_num(matrix, nan=living_years + 5)  # 表示超过居住年限
+    
+    # 格式化标签显示为百分比
+    precision = 1 if len(row_values) <= 15 and len(col_values) <= 15 else 2
+    row_labels = [f"{x:.{precision}f}%" for x in row_values]
+    col_labels = [f"{x:.{precision}f}%" for x in col_values]
+    text = [["超过<br>计划期" if value > living_years else f"{value:.1f}年" for value in row] for row in matrix]
+    annotate = precision == 1
     
-    family_plan = st.radio(
-        "未来3-5年家庭计划",
-        options=["无变化", "扩大家庭", "缩小家庭", "不确定"]
-    )
+    fig = go.Figure()
     
-    mobility_need = st.slider(
-        "生活流动性需求", 
-        min_value=1, 
-        max_value=10, 
-        value=5, 
-        step=1,
-        help="1=几乎不需要变动，10=需要高度灵活性"
-    )
+    # 红色表示租房有利，绿色表示买房有利
+    fig.add_trace(go.Heatmap(
+        z=matrix,
+        x=col_labels,
+        y=row_labels,
+        text=text,
+        texttemplate="%{text}" if annotate else None,
+        textfont=dict(size=13),
+        colorscale='RdYlGn_r',
+        colorbar=dict(title='收支平衡年限'),
+        hovertemplate=f"{col_label}: %{{x}}<br>{row_label}: %{{y}}<br>收支平衡: %{{text}}<extra></extra>"
+    ))
     
-    ownership_importance = st.slider(
-        "房屋所有权重要性", 
-        min_value=1, 
-        max_value=10, 
-        value=7, 
-        step=1,
-        help="拥有自己房子对您的重要程度"
+    # 突出显示当前设置点
+    current_row_idx = int(np.argmin(np.abs(np.asarray(row_values) - _params[row_key])))
+    current_col_idx = int(np.argmin(np.abs(np.asarray(col_values) - _params[col_key])))
+    fig.add_trace(go.Scatter(
+        x=[col_labels[current_col_idx]],
+        y=[row_labels[current_row_idx]],
+        mode='markers',
+        marker=dict(size=28 if annotate else 14, symbol='circle-open', color='blue', line=dict(width=3)),
+        name="当前设置",
+        hoverinfo='skip'
+    ))
+    
+    if n_evaluated < matrix.size:
+        title = f"{title}<br><sup>自适应细化：实际计算 {n_evaluated:,} / {matrix.size:,} 个网格点</sup>"
+    
+    fig.update_layout(
+        title=title,
+        xaxis_title=col_label,
+        yaxis_title=row_label,
+        yaxis=dict(autorange='reversed'),
+        height=550,
+        template="plotly_white",
+        showlegend=False
     )
+    return fig
 
-# 计算函数
-def calculate_mortgage_payment(loan_amount, annual_rate, years):
-    """计算每月等额本息还款额"""
-    monthly_rate = annual_rate / 100 / 12
-    num_payments = years * 12
-    if monthly_rate == 0:
-        return loan_amount / num_payments
-    return loan_amount * monthly_rate * (1 + monthly_rate) ** num_payments / ((1 + monthly_rate) ** num_payments - 1)
-
-def calculate_buy_vs_rent(params):
-    """计算买房与租房的成本对比"""
-    # 解析参数
-    P = params['house_price']
-    dp_percent = params['down_payment_percent'] / 100
-    n_loan = params['loan_years']
-    r_loan = params['loan_rate'] / 100
-    rent = params['monthly_rent']
-    g_rent = params['rent_growth'] / 100
-    r_inv = params['investment_return'] / 100
-    fee = params['property_fee']
-    area = params['property_area']
-    tax = params['property_tax'] / 100
-    maint = params['maintenance_fund']
-    n_live = params['living_years']
-    g_home = params['house_price_growth'] / 100
-    inflation = params['inflation_rate'] / 100
-    use_real = params['use_real_returns']
-    use_housing_fund = params.get('use_housing_fund', False)
-    housing_fund_amount = params.get('housing_fund_amount', 0)
-    housing_fund_rate = params.get('housing_fund_rate', 0) / 100
-    
-    # 计算实际利率（如果启用）
-    if use_real:
-        r_inv_real = (1 + r_inv) / (1 + inflation) - 1
-    else:
-        r_inv_real = r_inv
-    
-    # 买房成本计算
-    down_payment = P * dp_percent
-    total_loan_amount = P * (1 - dp_percent)
+def tornado_figure(labels, low, high, title, value_label, hover=None):
+    """龙卷风图：每个参数一行，low/high 为参数向下/向上变动时结果的变化量，按总摆幅从大到小自上而下排列"""
+    low, high = np.asarray(low, dtype=float), np.asarray(high, dtype=float)
+    order = np.argsort(np.abs(high - low), kind='stable')  # 横向条形图自下而上绘制
+    labels = [labels[i] for i in order]
+    customdata = [hover[i] for i in order] if hover is not None else None
     
-    # 分配贷款金额
-    if use_housing_fund and housing_fund_amount > 0:
-        # 确保公积金贷款不超过总贷款额
-        housing_fund_amount = min(housing_fund_amount, total_loan_amount)
-        commercial_loan_amount = total_loan_amount - housing_fund_amount
-    else:
-        housing_fund_amount = 0
-        commercial_loan_amount = total_loan_amount
-    
-    # 计算公积金贷款月供
-    housing_fund_monthly_payment = calculate_mortgage_payment(housing_fund_amount, housing_fund_rate * 100, n_loan)
-    
-    # 计算商业贷款月供
-    commercial_monthly_payment = calculate_mortgage_payment(commercial_loan_amount, r_loan * 100, n_loan)
-    
-    # 总月供
-    monthly_payment = housing_fund_monthly_payment + commercial_monthly_payment
-    
-    # 初始化结果数据
-    years = np.arange(1, n_live + 1)
-    results = pd.DataFrame(index=years)
-    
-    # 购房成本随时间变化
-    total_payments = np.zeros(n_live)
-    remaining_principal = np.zeros(n_live)
-    
-    # 计算每年的贷款支付和剩余本金
-    for i in range(n_live):
-        year_payments = monthly_payment * 12
-        if i == 0:
-            total_payments[i] = down_payment + year_payments
-            if n_loan > 0:
-                # 计算第一年后的剩余本金
-                monthly_rate = r_loan / 12
-                remaining = loan_amount
-                for _ in range(12):
-                    interest = remaining * monthly_rate
-                    principal = monthly_payment - interest
-                    remaining -= principal
-                remaining_principal[i] = remaining if remaining > 0 else 0
-            else:
-                remaining_principal[i] = 0
-        else:
-            total_payments[i] = total_payments[i-1] + year_payments
-            if i < n_loan:
-                # 计算之后年份的剩余本金
-                monthly_rate = r_loan / 12
-                remaining = remaining_principal[i-1]
-                for _ in range(12):
-                    if remaining <= 0:
-                        break
-                    interest = remaining * monthly_rate
-                    principal = monthly_payment - interest
-                    remaining -= principal
-                remaining_principal[i] = remaining if remaining > 0 else 0
-            else:
-                remaining_principal[i] = 0
-    
-    # 房屋持有成本
-    annual_property_fee = fee * area * 12
-    annual_property_tax = P * tax
-    annual_holding_costs = np.zeros(n_live)
-    
-    for i in range(n_live):
-        # 计算第i年的房产价值（用于计算房产税）
-        current_property_value = P * (1 + g_home) ** i
-        annual_property_tax = current_property_value * tax
-        annual_holding_costs[i] = annual_property_fee + annual_property_tax + maint
-        if i > 0:
-            annual_holding_costs[i] = annual_holding_costs[i-1] + annual_holding_costs[i]
-    
-    # 房产残值
-    property_final_value = P * (1 + g_home) ** n_live
-    
-    # 买房总成本
-    buy_total_costs = total_payments + annual_holding_costs
-    
-    # 租房成本计算
-    rent_costs = np.zeros(n_live)
-    for i in range(n_live):
-        annual_rent = rent * 12 * (1 + g_rent) ** i
-        if i == 0:
-            rent_costs[i] = annual_rent
-        else:
-            rent_costs[i] = rent_costs[i-1] + annual_rent
-    
-    # 首付投资收益
-    investment_value = np.zeros(n_live)
-    for i in range(n_live):
-        investment_value[i] = down_payment * (1 + r_inv_real) ** (i + 1)
-    
-    # 租房总成本（考虑投资收益为负成本）
-    rent_total_costs = rent_costs
-    
-    # 投资机会成本（买房的隐性成本）
-    opportunity_cost = investment_value - down_payment
-    
-    # 净房屋价值（扣除贷款剩余）
-    net_property_value = property_final_value - remaining_principal
-    
-    # 有效买房成本（考虑房产增值为负成本）
-    effective_buy_costs = np.zeros(n_live)
-    for i in range(n_live):
-        current_property_value = P * (1 + g_home) ** (i + 1)
-        current_remaining_loan = remaining_principal[i]
-        property_equity = current_property_value - current_remaining_loan
-        effective_buy_costs[i] = buy_total_costs[i] - (property_equity - down_payment)
-    
-    # 有效租房成本（考虑投资收益为负成本）
-    effective_rent_costs = np.zeros(n_live)
-    for i in range(n_live):
-        effective_rent_costs[i] = rent_costs[i] - opportunity_cost[i]
-    
-    # 整合结果
-    results['买房累计支出'] = buy_total_costs
-    results['租房累计支出'] = rent_costs
-    results['买房机会成本'] = opportunity_cost
-    results['房产净值'] = np.array([P * (1 + g_home) ** (i + 1) - remaining_principal[i] for i in range(n_live)])
-    results['有效买房成本'] = effective_buy_costs
-    results['有效租房成本'] = effective_rent_costs
-    results['成本差额(租-买)'] = effective_rent_costs - effective_buy_costs
-    
-    # 计算关键指标
-    break_even_year = None
-    for i in range(n_live):
-        if effective_rent_costs[i] > effective_buy_costs[i]:
-            break_even_year = i + 1
-            break
-    
-    # 计算价格租金比
-    price_to_rent_ratio = P / (rent * 12)
-    
-    # 计算剩余贷款占比
-    if n_live <= n_loan:
-        loan_remaining_percent = remaining_principal[n_live-1] / loan_amount * 100 if loan_amount > 0 else 0
+    fig = go.Figure()
+    for values, name, color in ((low[order], "参数下调", '#FF9800'), (high[order], "参数上调", '#1E88E5')):
+        fig.add_trace(go.Bar(
+            y=labels,
+            x=values,
+            orientation='h',
+            name=name,
+            marker_color=color,
+            customdata=customdata,
+            hovertemplate="%{y}: %{x:,.2f}" + ("<br>%{customdata}" if customdata else "") + "<extra>" + name + "</extra>"
+        ))
+    fig.add_vline(x=0, line=dict(color="gray", width=1))
+    fig.update_layout(
+        title=title,
+        xaxis_title=value_label,
+        barmode='overlay',
+        height=max(400, 32 * len(labels) + 120),
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+        template="plotly_white"
+    )
+    return fig
+
+# 配置对比超过该组数时只画分位数带
+COMPARISON_LINE_LIMIT = 50
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def saved_config_comparison(config_keys, names):
+    """批量对比已保存的配置并生成有效成本曲线图
+
+    配置以参数哈希为键，内容不变，因此可以用哈希和名称作为缓存键。配置不多时所有配置合并为买房、租房两个图层，
+    各配置之间以空值断开；超过 COMPARISON_LINE_LIMIT 组时只画各年份的分位数带，发送的数据量与配置数无关。
+    """
+    loaded = config_store.get_many(config_keys)
+    configs = [loaded[key][0] for key in config_keys]
+    comparison = compare_configs(configs, names)
+
+    years = comparison['years']
+    n = len(configs)
+    curves = ((comparison['effective_buy_costs'], "有效买房成本", '#1E88E5'),
+              (comparison['effective_rent_costs'], "有效租房成本", '#FF9800'))
+
+    fig = go.Figure()
+    if n > COMPARISON_LINE_LIMIT:
+        for costs, name, color in curves:
+            fig.add_traces(percentile_band_traces(years, percentile_bands(costs), color, name))
+        title = f"{n}组配置的有效成本分布"
     else:
-        loan_remaining_percent = 0
-    
-    # 计算租金覆盖率（月租金占每月房贷的百分比）
-    rent_coverage_ratio = rent / monthly_payment * 100 if monthly_payment > 0 else float('inf')
-    
-    # 总结果
-    summary = {
-        'break_even_year': break_even_year,
-        'price_to_rent_ratio': price_to_rent_ratio,
-        'final_property_value': property_final_value,
-        'total_mortgage_payment': total_payments[n_live-1] - down_payment,
-        'total_holding_cost': annual_holding_costs[n_live-1],
-        'total_rent_cost': rent_costs[n_live-1],
-        'investment_return': investment_value[n_live-1] - down_payment,
-        'loan_remaining_percent': loan_remaining_percent,
-        'rent_coverage_ratio': rent_coverage_ratio,
-        'down_payment': down_payment,
-        'monthly_payment': monthly_payment,
-        'annual_property_cost': annual_property_fee + maint + annual_property_tax,
-        # 添加公积金贷款相关字段
-        'housing_fund_amount': housing_fund_amount,
-        'housing_fund_monthly_payment': housing_fund_monthly_payment,
-        'commercial_loan_amount': commercial_loan_amount,
-        'commercial_monthly_payment': commercial_monthly_payment,
-        'total_monthly_payment': monthly_payment,
-        'housing_fund_interest_rate': housing_fund_rate * 100,
-        'commercial_interest_rate': r_loan * 100,
-        'use_housing_fund': use_housing_fund
-    }
-    
-    return results, summary
+        for costs, name, color in curves:
+            fig.add_trace(multi_line_trace(
+                years,
+                costs,
+                names,
+                name=name,
+                line=dict(color=color, width=1.5),
+                opacity=0.6 if n > 10 else 1.0,
+                hovertemplate="%{customdata}<br>第%{x}年: %{y:,.0f}元<extra>" + name + "</extra>"
+            ))
+        title = f"{n}组配置的有效成本曲线"
+    fig.update_layout(
+        title=title,
+        xaxis_title="年份",
+        yaxis_title="有效成本 (元)",
+        hovermode='closest',
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+        template="plotly_white"
+    )
+    return fig, comparison['summary']
 
 # 计算首付和贷款金额
 down_payment = house_price * down_payment_percent / 100
 loan_amount = house_price - down_payment
 
+profiler.mark("主计算")
+
 # 执行计算
 params = {
     'house_price': house_price,
     'down_payment_percent': down_payment_percent,
     'loan_years': loan_years,
     'loan_rate': loan_rate,
+    'repayment_method': repayment_method,
     'monthly_rent': monthly_rent,
     'rent_growth': rent_growth,
     'investment_return': investment_return,
@@ -688,13 +699,22 @@ params = {
     'housing_fund_rate': housing_fund_rate if 'housing_fund_rate' in locals() else 3.1
 }
 
-results, summary = calculate_buy_vs_rent(params)
+resolution = 'monthly' if monthly_resolution else 'yearly'
+results, summary = cached_calculate_buy_vs_rent(params, resolution)
+# summary 中的收支平衡时间限于计划居住期内，评分和决策都以它为准；关键指标和建议文字另外展示
+# BREAK_EVEN_HORIZON 年内、可能超过居住期的平衡时间，只在居住期内不平衡时才需要单独求解
+extended_break_even = summary['break_even_year']
+if extended_break_even is None:
+    extended_break_even = solve_break_even(params, BREAK_EVEN_HORIZON, RESOLUTION_STEPS[resolution])
+# 等额本金的月供逐月递减，展示时以首月月供为准
+payment_label = "首月月供" if repayment_method == 'equal_principal' else "月供"
 
 # 创建主容器布局
 main_col1, main_col2 = st.columns([2, 1])
 
 with main_col1:
     # 关键指标显示
+    profiler.mark("关键决策指标")
     st.markdown('<div class="sub-header">关键决策指标</div>', unsafe_allow_html=True)
     
     metric_col1, metric_col2, metric_col3 = st.columns(3)
@@ -709,12 +729,12 @@ with main_col1:
         """, unsafe_allow_html=True)
     
     with metric_col2:
-        if summary['break_even_year'] is None:
-            break_even_text = "永远不会平衡"
-        elif summary['break_even_year'] > living_years:
-            break_even_text = f"超过计划居住期 (约{summary['break_even_year']:.1f}年)"
+        if extended_break_even is None:
+            break_even_text = f"{BREAK_EVEN_HORIZON}年内无法平衡"
+        elif extended_break_even > living_years:
+            break_even_text = f"超过计划居住期 (约{extended_break_even:.1f}年)"
         else:
-            break_even_text = f"{summary['break_even_year']:.1f}年"
+            break_even_text = f"{extended_break_even:.1f}年"
             
         st.markdown(f"""
         <div class="metric-card">
@@ -757,15 +777,15 @@ with main_col1:
         # 收支平衡支持买房，价格租金比支持或中性
         recommendation_class = "recommendation-buy"
         recommendation_title = "推荐买房"
-        recommendation_text = f"分析显示，如果您计划居住{living_years}年，在第{summary['break_even_year']}年就能达到收支平衡。价格租金比为{price_rent_ratio:.1f}x，{'处于合理范围内' if ratio_suggests_buy == None else '较低，买房较为经济'}。长期来看，买房更经济。"
+        recommendation_text = f"分析显示，如果您计划居住{living_years}年，在第{summary['break_even_year']:.1f}年就能达到收支平衡。价格租金比为{price_rent_ratio:.1f}x，{'处于合理范围内' if ratio_suggests_buy == None else '较低，买房较为经济'}。长期来看，买房更经济。"
     elif balance_suggests_buy == False and (ratio_suggests_buy == False or ratio_suggests_buy == None):
         # 收支平衡支持租房，价格租金比支持或中性
         recommendation_class = "recommendation-rent"
         recommendation_title = "推荐租房"
-        if not summary['break_even_year']:
+        if not extended_break_even:
             break_even_text = "租房始终比买房更经济"
         else:
-            break_even_text = f"收支平衡要等到第{summary['break_even_year']}年"
+            break_even_text = f"收支平衡要等到第{extended_break_even:.1f}年"
             
         ratio_text = "处于合理范围内" if ratio_suggests_buy == None else "较高，租房较为经济"
         recommendation_text = f"在您计划的{living_years}年居住期内，{break_even_text}。价格租金比为{price_rent_ratio:.1f}x，{ratio_text}。如果不打算长期居住，租房是更好的选择。"
@@ -774,7 +794,7 @@ with main_col1:
         recommendation_class = "recommendation-buy"
         recommendation_title = "偏向买房"
         if balance_suggests_buy == True:
-            balance_text = f"同时，收支平衡点在第{summary['break_even_year']}年，支持买房决策。"
+            balance_text = f"同时，收支平衡点在第{summary['break_even_year']:.1f}年，支持买房决策。"
         else:
             balance_text = "但收支平衡分析显示需要权衡考虑其他因素。"
             
@@ -795,7 +815,7 @@ with main_col1:
         recommendation_title = "需权衡考虑"
         recommendation_text = f"价格租金比为{price_rent_ratio:.1f}x，处于{('较低水平' if ratio_suggests_buy == True else '较高水平' if ratio_suggests_buy == False else '15-25的合理范围')}。"
         if summary['break_even_year']:
-            recommendation_text += f" 收支平衡点在第{summary['break_even_year']}年。"
+            recommendation_text += f" 收支平衡点在第{summary['break_even_year']:.1f}年。"
         else:
             recommendation_text += " 在计划居住期内不会达到收支平衡。"
         recommendation_text += " 您需要权衡短期经济性与长期稳定性等多方面因素。"
@@ -807,7 +827,7 @@ with main_col1:
         <ul>
             <li>价格租金比: {summary['price_to_rent_ratio']:.1f}x (15-20为合理范围，<15买房更划算，>25租房更划算)</li>
             <li>首付金额: {summary['down_payment']:,.0f}元</li>
-            <li>月供: {summary['monthly_payment']:,.0f}元/月</li>
+            <li>{payment_label}: {summary['monthly_payment']:,.0f}元/月</li>
             <li>年房屋持有成本: {summary['annual_property_cost']:,.0f}元/年</li>
         </ul>
     </div>
@@ -863,9 +883,10 @@ with main_col1:
     """, unsafe_allow_html=True)
     
     # 成本对比图
+    profiler.mark("成本对比趋势")
     st.markdown('<div class="sub-header">成本对比趋势</div>', unsafe_allow_html=True)
     
-    tab1, tab2, tab3 = st.tabs(["累计成本对比", "有效成本对比", "详细数据"])
+    tab1, tab2, tab3, tab4 = st.tabs(["累计成本对比", "有效成本对比", "详细数据", "还款计划"])
     
     with tab1:
         st.markdown("""
@@ -877,10 +898,13 @@ with main_col1:
         正的成本差额表示租房更贵，负的差额表示买房更贵。不考虑房产增值和投资收益。
         """)
         
+        # 双坐标轴图只在此处使用，按需导入
+        from plotly.subplots import make_subplots
+        
         fig = make_subplots(specs=[[{"secondary_y": True}]])
         
         fig.add_trace(
-            go.Scatter(
+            line_trace(
                 x=results.index, 
                 y=results['买房累计支出'], 
                 name="买房累计支出",
@@ -890,7 +914,7 @@ with main_col1:
         )
         
         fig.add_trace(
-            go.Scatter(
+            line_trace(
                 x=results.index, 
                 y=results['租房累计支出'], 
                 name="租房累计支出",
@@ -900,7 +924,7 @@ with main_col1:
         )
         
         fig.add_trace(
-            go.Scatter(
+            line_trace(
                 x=results.index, 
                 y=results['成本差额(租-买)'], 
                 name="成本差额(租-买)",
@@ -913,15 +937,14 @@ with main_col1:
         if summary['break_even_year']:
             be_year = summary['break_even_year']
             if be_year <= living_years:
-                # 找到最接近交叉点的年份
-                years_array = np.array(results.index)
-                closest_idx = np.abs(years_array - be_year).argmin()
+                # 收支平衡时间含小数，按相邻年份插值
+                be_value = np.interp(be_year, results.index, results['买房累计支出'])
                 
                 # 在图表上添加标记
                 fig.add_trace(
                     go.Scatter(
                         x=[be_year],
-                        y=[results.iloc[closest_idx]['买房累计支出']],
+                        y=[be_value],
                         mode='markers',
                         marker=dict(
                             size=12,
@@ -936,7 +959,7 @@ with main_col1:
                 # 添加标注
                 fig.add_annotation(
                     x=be_year,
-                    y=results.iloc[closest_idx]['买房累计支出'],
+                    y=be_value,
                     text=f"收支平衡: {be_year:.1f}年",
                     showarrow=True,
                     arrowhead=1,
@@ -972,7 +995,7 @@ with main_col1:
         fig = go.Figure()
         
         fig.add_trace(
-            go.Scatter(
+            line_trace(
                 x=results.index, 
                 y=results['有效买房成本'], 
                 name="有效买房成本",
@@ -981,7 +1004,7 @@ with main_col1:
         )
         
         fig.add_trace(
-            go.Scatter(
+            line_trace(
                 x=results.index, 
                 y=results['有效租房成本'], 
                 name="有效租房成本",
@@ -993,7 +1016,8 @@ with main_col1:
         if summary['break_even_year']:
             break_even_year = summary['break_even_year']
             if break_even_year <= living_years:
-                break_even_value = results.loc[int(break_even_year), '有效买房成本']
+                # 收支平衡时间含小数，按相邻年份插值
+                break_even_value = np.interp(break_even_year, results.index, results['有效买房成本'])
                 
                 fig.add_trace(
                     go.Scatter(
@@ -1022,272 +1046,137 @@ with main_col1:
     with tab3:
         st.dataframe(results)
     
-    # 敏感度分析
-    st.markdown('<div class="sub-header">参数敏感度分析</div>', unsafe_allow_html=True)
-    
-    sensitivity_tab1, sensitivity_tab2 = st.tabs(["房价与租金变化影响", "利率敏感度"])
-    
-    with sensitivity_tab1:
-        # 添加中文字体支持
-        plt.rcParams['font.sans-serif'] = ['SimHei', 'Microsoft YaHei', 'SimSun', 'Arial']
-        plt.rcParams['axes.unicode_minus'] = False  # 解决负号显示问题
-        
-        # 创建房价和租金增长率变化的敏感度矩阵
-        house_growth_range = np.linspace(house_price_growth - 5, house_price_growth + 5, 5)
-        rent_growth_range = np.linspace(rent_growth - 5, rent_growth + 5, 5)
-        
-        break_even_matrix = np.zeros((len(house_growth_range), len(rent_growth_range)))
-        
-        for i, hg in enumerate(house_growth_range):
-            for j, rg in enumerate(rent_growth_range):
-                # 创建新参数集合
-                new_params = params.copy()
-                new_params['house_price_growth'] = hg
-                new_params['rent_growth'] = rg
-                
-                # 计算新结果
-                _, new_summary = calculate_buy_vs_rent(new_params)
-                
-                # 填充矩阵
-                if new_summary['break_even_year']:
-                    break_even_matrix[i, j] = new_summary['break_even_year']
-                else:
-                    break_even_matrix[i, j] = living_years + 5  # 表示超过居住年限
-        
-        # 创建热力图
-        fig, ax = plt.subplots(figsize=(10, 8))
-        
-        # 格式化标签显示为百分比
-        house_growth_labels = [f"{x:.1f}%" for x in house_growth_range]
-        rent_growth_labels = [f"{x:.1f}%" for x in rent_growth_range]
-        
-        # 设置颜色映射，红色表示租房有利，绿色表示买房有利
-        cmap = plt.cm.RdYlGn_r
-        
-        im = ax.imshow(break_even_matrix, cmap=cmap)
-        
-        # 添加数值标签
-        for i in range(len(house_growth_range)):
-            for j in range(len(rent_growth_range)):
-                value = break_even_matrix[i, j]
-                if value > living_years:
-                    text = "超过\n计划期"
-                else:
-                    text = f"{int(value)}年"
-                ax.text(j, i, text, ha="center", va="center", 
-                        color="white" if 5 <= value <= living_years else "black",
-                        fontweight='bold')
-        
-        # 设置坐标轴
-        ax.set_xticks(np.arange(len(rent_growth_range)))
-        ax.set_yticks(np.arange(len(house_growth_range)))
-        ax.set_xticklabels(rent_growth_labels)
-        ax.set_yticklabels(house_growth_labels)
-        
-        # 添加标题和标签
-        plt.title("收支平衡年限敏感度分析")
-        plt.xlabel("租金年增长率")
-        plt.ylabel("房价年增长率")
+    with tab4:
+        loan_schedule = calculate_loan_schedule(params)
+        # 按年汇总：月供与利息取年度合计，剩余本金取年末值
+        yearly_schedule = loan_schedule.groupby((loan_schedule.index - 1) // 12 + 1).agg({
+            '合计月供': 'sum',
+            '合计利息': 'sum',
+            '合计剩余本金': 'last',
+        })
+        yearly_schedule.index.name = '年份'
+        yearly_schedule['合计本金'] = yearly_schedule['合计月供'] - yearly_schedule['合计利息']
         
-        # 添加颜色条
-        cbar = plt.colorbar(im)
-        cbar.set_label('收支平衡年限')
-        
-        # 突出显示当前设置点
-        current_house_growth_idx = np.argmin(np.abs(house_growth_range - house_price_growth))
-        current_rent_growth_idx = np.argmin(np.abs(rent_growth_range - rent_growth))
-        ax.plot(current_rent_growth_idx, current_house_growth_idx, 'o', markersize=12, 
-                markerfacecolor='none', markeredgecolor='blue', markeredgewidth=2)
-        
-        plt.tight_layout()
-        st.pyplot(fig)
+        fig = go.Figure()
+        fig.add_trace(go.Bar(x=yearly_schedule.index, y=yearly_schedule['合计本金'],
+                             name='偿还本金', marker_color='#4CAF50'))
+        fig.add_trace(go.Bar(x=yearly_schedule.index, y=yearly_schedule['合计利息'],
+                             name='支付利息', marker_color='#FF9800'))
+        fig.add_trace(go.Scatter(x=yearly_schedule.index, y=yearly_schedule['合计剩余本金'],
+                                 name='年末剩余本金', mode='lines+markers',
+                                 line=dict(color='#2196F3', width=2), yaxis='y2'))
+        fig.update_layout(
+            title=f"{REPAYMENT_METHODS[repayment_method]}还款计划（按年汇总）",
+            xaxis_title="年份",
+            yaxis=dict(title="年度还款（元）"),
+            yaxis2=dict(title="剩余本金（元）", overlaying='y', side='right'),
+            barmode='stack',
+            height=500,
+            legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+            template="plotly_white"
+        )
+        st.plotly_chart(fig, use_container_width=True)
+        st.dataframe(yearly_schedule.style.format("{:,.0f}"))
     
-    with sensitivity_tab2:
-        # 添加中文字体支持
-        plt.rcParams['font.sans-serif'] = ['SimHei', 'Microsoft YaHei', 'SimSun', 'Arial']
-        plt.rcParams['axes.unicode_minus'] = False  # 解决负号显示问题
-        
-        # 创建贷款利率和投资回报率变化的敏感度矩阵
-        loan_rate_range = np.linspace(max(loan_rate - 3, 1), loan_rate + 3, 5)
-        investment_return_range = np.linspace(max(investment_return - 3, 1), investment_return + 3, 5)
-        
-        break_even_matrix = np.zeros((len(loan_rate_range), len(investment_return_range)))
-        
-        for i, lr in enumerate(loan_rate_range):
-            for j, ir in enumerate(investment_return_range):
-                # 创建新参数集合
-                new_params = params.copy()
-                new_params['loan_rate'] = lr
-                new_params['investment_return'] = ir
-                
-                # 计算新结果
-                _, new_summary = calculate_buy_vs_rent(new_params)
-                
-                # 填充矩阵
-                if new_summary['break_even_year']:
-                    break_even_matrix[i, j] = new_summary['break_even_year']
-                else:
-                    break_even_matrix[i, j] = living_years + 5  # 表示超过居住年限
-        
-        # 创建热力图
-        fig, ax = plt.subplots(figsize=(10, 8))
-        
-        # 格式化标签显示为百分比
-        loan_rate_labels = [f"{x:.1f}%" for x in loan_rate_range]
-        investment_return_labels = [f"{x:.1f}%" for x in investment_return_range]
-        
-        # 设置颜色映射
-        cmap = plt.cm.RdYlGn_r
-        
-        im = ax.imshow(break_even_matrix, cmap=cmap)
-        
-        # 添加数值标签
-        for i in range(len(loan_rate_range)):
-            for j in range(len(investment_return_range)):
-                value = break_even_matrix[i, j]
-                if value > living_years:
-                    text = "超过\n计划期"
-                else:
-                    text = f"{int(value)}年"
-                ax.text(j, i, text, ha="center", va="center", 
-                        color="white" if 5 <= value <= living_years else "black",
-                        fontweight='bold')
-        
-        # 设置坐标轴
-        ax.set_xticks(np.arange(len(investment_return_range)))
-        ax.set_yticks(np.arange(len(loan_rate_range)))
-        ax.set_xticklabels(investment_return_labels)
-        ax.set_yticklabels(loan_rate_labels)
-        
-        # 添加标题和标签
-        plt.title("利率敏感度分析 - 收支平衡年限")
-        plt.xlabel("投资回报率")
-        plt.ylabel("贷款利率")
-        
-        # 添加颜色条
-        cbar = plt.colorbar(im)
-        cbar.set_label('收支平衡年限')
-        
-        # 突出显示当前设置点
-        current_loan_rate_idx = np.argmin(np.abs(loan_rate_range - loan_rate))
-        current_investment_return_idx = np.argmin(np.abs(investment_return_range - investment_return))
-        ax.plot(current_investment_return_idx, current_loan_rate_idx, 'o', markersize=12, 
-                markerfacecolor='none', markeredgecolor='blue', markeredgewidth=2)
-        
-        plt.tight_layout()
-        st.pyplot(fig)
+    # 敏感度分析
+    profiler.mark("参数敏感度分析")
+    st.markdown('<div class="sub-header">参数敏感度分析</div>', unsafe_allow_html=True)
+    @st.fragment
+    def sensitivity_section():
+        """收支平衡热力图、全参数敏感度和单因素扫描"""
+
+        sensitivity_ctrl_cols = st.columns(2)
+        with sensitivity_ctrl_cols[0]:
+            grid_resolution = st.slider(
+                "网格分辨率",
+                min_value=5,
+                max_value=200,
+                value=5,
+                step=1,
+                help="每个参数方向上的取值个数，分辨率越高越能精确定位收支平衡分界线",
+                key="grid_resolution"
+            )
+        with sensitivity_ctrl_cols[1]:
+            adaptive_grid = st.checkbox(
+                "自适应细化",
+                value=True,
+                help="先计算粗网格，只在相邻格点收支平衡年限不同的区域加密计算",
+                key="adaptive_grid"
+            )
 
-    # 添加决策矩阵部分
-    st.markdown('<div class="sub-header">决策矩阵分析</div>', unsafe_allow_html=True)
+        sensitivity_tab1, sensitivity_tab2, sensitivity_tab3, sensitivity_tab4 = st.tabs(
+            ["房价与租金变化影响", "利率敏感度", "全参数敏感度", "单因素扫描"])
 
-    # 定义评分函数，生成经济性和灵活性得分
-    def calculate_economic_score(params, summary):
-        """计算长期经济性得分 (0-100)"""
-        score = 50  # 中性起点
-        
-        # 价格租金比影响 (-20 到 +20)
-        pr_ratio = summary['price_to_rent_ratio']
-        if pr_ratio < 12:
-            score += 20  # 买房极其有利
-        elif pr_ratio < 15:
-            score += 15  # 买房非常有利
-        elif pr_ratio < 20:
-            score += 5   # 买房略有优势
-        elif pr_ratio > 30:
-            score -= 20  # 租房极其有利
-        elif pr_ratio > 25:
-            score -= 15  # 租房非常有利
-        elif pr_ratio > 20:
-            score -= 5   # 租房略有优势
-        
-        # 收支平衡点影响 (-25 到 +25)
-        living_years = params['living_years']
-        if summary['break_even_year'] and summary['break_even_year'] <= living_years / 3:
-            score += 25  # 买房极其有利
-        elif summary['break_even_year'] and summary['break_even_year'] <= living_years / 2:
-            score += 15  # 买房非常有利
-        elif summary['break_even_year'] and summary['break_even_year'] <= living_years:
-            score += 5   # 买房略有优势
-        elif not summary['break_even_year']:
-            score -= 25  # 租房极其有利
-        else:
-            score -= 10  # 租房有一定优势
-        
-        # 房价增长预期影响 (-15 到 +15)
-        g_home = params['house_price_growth']
-        if g_home > 8:
-            score += 15  # 买房极其有利
-        elif g_home > 5:
-            score += 10  # 买房非常有利
-        elif g_home > 3:
-            score += 5   # 买房略有优势
-        elif g_home < 0:
-            score -= 15  # 租房极其有利
-        elif g_home < 1:
-            score -= 10  # 租房非常有利
-        elif g_home < 3:
-            score -= 5   # 租房略有优势
-        
-        # 投资回报率影响 (-15 到 +15)
-        r_inv = params['investment_return']
-        if r_inv > 10:
-            score -= 15  # 租房极其有利
-        elif r_inv > 8:
-            score -= 10  # 租房非常有利
-        elif r_inv > 6:
-            score -= 5   # 租房略有优势
-        elif r_inv < 2:
-            score += 15  # 买房极其有利
-        elif r_inv < 3:
-            score += 10  # 买房非常有利
-        elif r_inv < 4:
-            score += 5   # 买房略有优势
-        
-        # 确保得分在0-100范围内
-        return max(0, min(100, score))
+        with sensitivity_tab1:
+            # 创建房价和租金增长率变化的敏感度矩阵
+            house_growth_range = np.linspace(house_price_growth - 5, house_price_growth + 5, grid_resolution)
+            rent_growth_range = np.linspace(rent_growth - 5, rent_growth + 5, grid_resolution)
 
-    def calculate_flexibility_score(params, summary):
-        """计算短期灵活性得分 (0-100)，高分表示更灵活"""
-        score = 50  # 中性起点
-        
-        # 首付比例影响 (-20 到 +20)
-        dp_percent = params['down_payment_percent']
-        if dp_percent >= 70:
-            score += 10  # 高首付增加灵活性
-        elif dp_percent >= 50:
-            score += 5   # 较高首付略增灵活性
-        elif dp_percent <= 20:
-            score -= 20  # 极低首付大幅降低灵活性
-        elif dp_percent <= 30:
-            score -= 10  # 低首付降低灵活性
-        
-        # 贷款压力影响 (-20 到 +20)
-        rent_coverage = summary['rent_coverage_ratio']
-        if rent_coverage > 150:
-            score -= 20  # 租金远高于月供，买房更灵活
-        elif rent_coverage > 120:
-            score -= 10  # 租金高于月供，买房较灵活
-        elif rent_coverage < 70:
-            score += 20  # 月供远高于租金，租房更灵活
-        elif rent_coverage < 90:
-            score += 10  # 月供高于租金，租房较灵活
-        
-        # 资金占用影响 (恒定 -20 对买房)
-        score += 20  # 租房更灵活，资金不会被房产占用
-        
-        # 居住年限影响
-        living_years = params['living_years']
-        if living_years <= 3:
-            score += 15  # 短期居住，租房灵活性优势明显
-        elif living_years <= 5:
-            score += 10  # 中短期居住，租房有灵活性优势
-        elif living_years >= 15:
-            score -= 15  # 长期居住，买房灵活性成本降低
-        elif living_years >= 10:
-            score -= 10  # 中长期居住，买房灵活性成本较低
-        
-        # 确保得分在0-100范围内
-        return max(0, min(100, score))
+            fig = break_even_heatmap_figure(
+                canonical_params_key(params), params,
+                'house_price_growth', house_growth_range, 'rent_growth', rent_growth_range,
+                "收支平衡年限敏感度分析", "房价年增长率", "租金年增长率", adaptive=adaptive_grid
+            )
+            st.plotly_chart(fig, use_container_width=True)
+
+        with sensitivity_tab2:
+            # 创建贷款利率和投资回报率变化的敏感度矩阵
+            loan_rate_range = np.linspace(max(loan_rate - 3, 1), loan_rate + 3, grid_resolution)
+            investment_return_range = np.linspace(max(investment_return - 3, 1), investment_return + 3, grid_resolution)
+
+            fig = break_even_heatmap_figure(
+                canonical_params_key(params), params,
+                'loan_rate', loan_rate_range, 'investment_return', investment_return_range,
+                "利率敏感度分析 - 收支平衡年限", "贷款利率", "投资回报率", adaptive=adaptive_grid
+            )
+            st.plotly_chart(fig, use_container_width=True)
+
+        with sensitivity_tab3:
+            # 一次批量计算得到所有参数的偏导数，按参数变动±1%时的影响排序
+            sensitivities = calculate_sensitivities(params, summary['break_even_year'])
+            sensitivity_target = st.radio(
+                "分析指标",
+                ["期末成本差额", "收支平衡时间"],
+                horizontal=True,
+                disabled=summary['break_even_year'] is None,
+                help="收支平衡时间的敏感度只在计划居住期内存在收支平衡点时可用",
+                key="sensitivity_target"
+            )
+            column, unit = ("期末差额", "元") if sensitivity_target == "期末成本差额" else ("收支平衡", "年")
+            elasticity = sensitivities[f"{column}弹性"].to_numpy()
+            hover = [f"取值 {value:,.4g}，导数 {derivative:,.4g}{unit}/单位"
+                     for value, derivative in zip(sensitivities['取值'], sensitivities[f"{column}导数"])]
+            fig = tornado_figure(
+                list(sensitivities['参数']), -elasticity, elasticity,
+                f"{sensitivity_target}对各参数的敏感度（参数变动±1%）", f"{sensitivity_target}变化({unit})", hover
+            )
+            st.plotly_chart(fig, use_container_width=True)
+            st.caption("期末成本差额 = 居住期末的有效租房成本 - 有效买房成本，正值表示买房更有利。导数由复数步长法精确计算，为局部线性近似。")
+
+        with sensitivity_tab4:
+            # 每个参数单独在 ±范围内扫描，所有扫描点一次批量计算
+            sweep_range = st.slider("扫描范围", min_value=5, max_value=50, value=20, step=5, format="±%d%%",
+                                    help="每个参数在当前值的该相对范围内取50个点，其余参数保持不变",
+                                    key="sweep_range")
+            sweep = one_at_a_time_sweep(params, relative_range=sweep_range / 100)
+            sweep_summary = sweep['summary']
+            hover = [f"{name}取值 {low:,.4g} ~ {high:,.4g}，摆幅 {swing:,.0f}元"
+                     for name, low, high, swing in zip(sweep_summary['参数'], sweep_summary['下限'],
+                                                        sweep_summary['上限'], sweep_summary['摆幅'])]
+            fig = tornado_figure(
+                list(sweep_summary['参数']),
+                sweep_summary['下限差额'] - sweep['baseline'],
+                sweep_summary['上限差额'] - sweep['baseline'],
+                f"期末成本差额的单因素敏感度（参数变动±{sweep_range}%）", "期末成本差额变化(元)", hover
+            )
+            st.plotly_chart(fig, use_container_width=True)
+            st.caption(f"当前参数下的期末成本差额为 {sweep['baseline']:,.0f}元。条形为参数取扫描范围两端时的变化，与导数不同，包含非线性影响。")
+
+    sensitivity_section()
+
+    # 添加决策矩阵部分
+    profiler.mark("决策矩阵分析")
+    st.markdown('<div class="sub-header">决策矩阵分析</div>', unsafe_allow_html=True)
 
     # 计算经济性和灵活性得分
     economic_score = calculate_economic_score(params, summary)
@@ -1438,7 +1327,7 @@ with main_col1:
         
         **经济性评分考虑因素:**
         - 价格租金比: {summary['price_to_rent_ratio']:.1f}倍
-        - 收支平衡年限: {summary['break_even_year'] if summary['break_even_year'] else '超出计划期限'}
+        - 收支平衡年限: {f"{summary['break_even_year']:.1f}年" if summary['break_even_year'] else '超出计划期限'}
         - 房价年增长预期: {params['house_price_growth']}%
         - 投资回报率: {params['investment_return']}%
         
@@ -1493,184 +1382,190 @@ with main_col1:
 
     st.markdown(matrix_recommendation, unsafe_allow_html=True)
 
-    # 情景分析功能
-    st.markdown("### 情景分析")
-    scenario_cols = st.columns(4)
-
-    with scenario_cols[0]:
-        scenario_price_growth = st.slider(
-            "假设房价年增长率", 
-            min_value=-10.0, 
-            max_value=15.0, 
-            value=house_price_growth, 
-            step=0.5,
-            format="%.1f%%",
-            key="scenario_price"
-        )
-        
-    with scenario_cols[1]:
-        scenario_rent_growth = st.slider(
-            "假设租金年增长率", 
-            min_value=-5.0, 
-            max_value=15.0, 
-            value=rent_growth, 
-            step=0.5,
-            format="%.1f%%",
-            key="scenario_rent"
-        )
-        
-    with scenario_cols[2]:
-        scenario_investment = st.slider(
-            "假设投资回报率", 
-            min_value=1.0, 
-            max_value=15.0, 
-            value=investment_return, 
-            step=0.5,
-            format="%.1f%%",
-            key="scenario_inv"
-        )
-
-    with scenario_cols[3]:
-        run_scenario = st.button("运行情景分析")
+    @st.fragment
+    def scenario_section():
+        """情景分析"""
+        # 情景分析功能
+        st.markdown("### 情景分析")
+        scenario_cols = st.columns(4)
 
-    if run_scenario:
-        # 创建新的参数集合
-        scenario_params = params.copy()
-        scenario_params['house_price_growth'] = scenario_price_growth
-        scenario_params['rent_growth'] = scenario_rent_growth
-        scenario_params['investment_return'] = scenario_investment
-        
-        # 计算新的结果
-        scenario_results, scenario_summary = calculate_buy_vs_rent(scenario_params)
-        
-        # 计算新的矩阵位置
-        scenario_economic_score = calculate_economic_score(scenario_params, scenario_summary)
-        scenario_flexibility_score = calculate_flexibility_score(scenario_params, scenario_summary)
-        
-        scenario_buy_economic = scenario_economic_score
-        scenario_buy_flexibility = 25
-        scenario_rent_economic = 100 - scenario_economic_score
-        scenario_rent_flexibility = 75
-        
-        # 显示情景分析结果
-        st.markdown("#### 情景分析结果")
-        
-        scenario_cols = st.columns(2)
         with scenario_cols[0]:
-            st.metric("情景收支平衡年限", 
-                    f"{scenario_summary['break_even_year']:.1f}年" if scenario_summary['break_even_year'] else "超过计划期限", 
-                    f"{scenario_summary['break_even_year'] - summary['break_even_year']:.1f}年" if scenario_summary['break_even_year'] and summary['break_even_year'] else "无法比较")
-        
-        with scenario_cols[1]:
-            st.metric("情景买房经济性得分", 
-                    f"{scenario_buy_economic:.1f}/100", 
-                    f"{scenario_buy_economic - buy_economic:.1f}")
-        
-        # 创建情景分析矩阵图
-        fig = go.Figure()
-
-        # 添加象限分隔线
-        fig.add_shape(
-            type="line",
-            x0=0, y0=50, x1=100, y1=50,
-            line=dict(color="gray", width=1, dash="dash"),
-        )
-
-        fig.add_shape(
-            type="line",
-            x0=50, y0=0, x1=50, y1=100,
-            line=dict(color="gray", width=1, dash="dash"),
-        )
+            scenario_price_growth = st.slider(
+                "假设房价年增长率", 
+                min_value=-10.0, 
+                max_value=15.0, 
+                value=house_price_growth, 
+                step=0.5,
+                format="%.1f%%",
+                key="scenario_price"
+            )
 
-        # 添加原始买房和租房的点
-        fig.add_trace(go.Scatter(
-            x=[buy_flexibility], 
-            y=[buy_economic],
-            mode="markers+text",
-            marker=dict(size=12, color="#1E88E5"),
-            text=["买房(当前)"],
-            textposition="top center",
-            name="买房(当前)"
-        ))
+        with scenario_cols[1]:
+            scenario_rent_growth = st.slider(
+                "假设租金年增长率", 
+                min_value=-5.0, 
+                max_value=15.0, 
+                value=rent_growth, 
+                step=0.5,
+                format="%.1f%%",
+                key="scenario_rent"
+            )
 
-        fig.add_trace(go.Scatter(
-            x=[rent_flexibility], 
-            y=[rent_economic],
-            mode="markers+text",
-            marker=dict(size=12, color="#FFC107"),
-            text=["租房(当前)"],
-            textposition="top center",
-            name="租房(当前)"
-        ))
+        with scenario_cols[2]:
+            scenario_investment = st.slider(
+                "假设投资回报率", 
+                min_value=1.0, 
+                max_value=15.0, 
+                value=investment_return, 
+                step=0.5,
+                format="%.1f%%",
+                key="scenario_inv"
+            )
 
-        # 添加情景分析的点
-        fig.add_trace(go.Scatter(
-            x=[scenario_buy_flexibility], 
-            y=[scenario_buy_economic],
-            mode="markers+text",
-            marker=dict(size=15, color="#1E88E5", symbol="star"),
-            text=["买房(情景)"],
-            textposition="top center",
-            name="买房(情景)"
-        ))
+        with scenario_cols[3]:
+            run_scenario = st.button("运行情景分析")
+
+        if run_scenario:
+            # 创建新的参数集合
+            scenario_params = params.copy()
+            scenario_params['house_price_growth'] = scenario_price_growth
+            scenario_params['rent_growth'] = scenario_rent_growth
+            scenario_params['investment_return'] = scenario_investment
+
+            # 情景对比只需要摘要指标，不生成逐年数据
+            scenario_summary = cached_calculate_summary(scenario_params, resolution)
+
+            # 计算新的矩阵位置
+            scenario_economic_score = calculate_economic_score(scenario_params, scenario_summary)
+            scenario_flexibility_score = calculate_flexibility_score(scenario_params, scenario_summary)
+
+            scenario_buy_economic = scenario_economic_score
+            scenario_buy_flexibility = 25
+            scenario_rent_economic = 100 - scenario_economic_score
+            scenario_rent_flexibility = 75
+
+            # 显示情景分析结果
+            st.markdown("#### 情景分析结果")
+
+            scenario_cols = st.columns(2)
+            with scenario_cols[0]:
+                st.metric("情景收支平衡年限", 
+                        f"{scenario_summary['break_even_year']:.1f}年" if scenario_summary['break_even_year'] else "超过计划期限", 
+                        f"{scenario_summary['break_even_year'] - summary['break_even_year']:.1f}年" if scenario_summary['break_even_year'] and summary['break_even_year'] else "无法比较")
+
+            with scenario_cols[1]:
+                st.metric("情景买房经济性得分", 
+                        f"{scenario_buy_economic:.1f}/100", 
+                        f"{scenario_buy_economic - buy_economic:.1f}")
+
+            # 创建情景分析矩阵图
+            fig = go.Figure()
+
+            # 添加象限分隔线
+            fig.add_shape(
+                type="line",
+                x0=0, y0=50, x1=100, y1=50,
+                line=dict(color="gray", width=1, dash="dash"),
+            )
 
-        fig.add_trace(go.Scatter(
-            x=[scenario_rent_flexibility], 
-            y=[scenario_rent_economic],
-            mode="markers+text",
-            marker=dict(size=15, color="#FFC107", symbol="star"),
-            text=["租房(情景)"],
-            textposition="top center",
-            name="租房(情景)"
-        ))
+            fig.add_shape(
+                type="line",
+                x0=50, y0=0, x1=50, y1=100,
+                line=dict(color="gray", width=1, dash="dash"),
+            )
 
-        # 添加连接线
-        fig.add_trace(go.Scatter(
-            x=[buy_flexibility, scenario_buy_flexibility],
-            y=[buy_economic, scenario_buy_economic],
-            mode="lines",
-            line=dict(color="#1E88E5", width=1, dash="dot"),
-            showlegend=False
-        ))
+            # 添加原始买房和租房的点
+            fig.add_trace(go.Scatter(
+                x=[buy_flexibility], 
+                y=[buy_economic],
+                mode="markers+text",
+                marker=dict(size=12, color="#1E88E5"),
+                text=["买房(当前)"],
+                textposition="top center",
+                name="买房(当前)"
+            ))
+
+            fig.add_trace(go.Scatter(
+                x=[rent_flexibility], 
+                y=[rent_economic],
+                mode="markers+text",
+                marker=dict(size=12, color="#FFC107"),
+                text=["租房(当前)"],
+                textposition="top center",
+                name="租房(当前)"
+            ))
+
+            # 添加情景分析的点
+            fig.add_trace(go.Scatter(
+                x=[scenario_buy_flexibility], 
+                y=[scenario_buy_economic],
+                mode="markers+text",
+                marker=dict(size=15, color="#1E88E5", symbol="star"),
+                text=["买房(情景)"],
+                textposition="top center",
+                name="买房(情景)"
+            ))
+
+            fig.add_trace(go.Scatter(
+                x=[scenario_rent_flexibility], 
+                y=[scenario_rent_economic],
+                mode="markers+text",
+                marker=dict(size=15, color="#FFC107", symbol="star"),
+                text=["租房(情景)"],
+                textposition="top center",
+                name="租房(情景)"
+            ))
+
+            # 添加连接线
+            fig.add_trace(go.Scatter(
+                x=[buy_flexibility, scenario_buy_flexibility],
+                y=[buy_economic, scenario_buy_economic],
+                mode="lines",
+                line=dict(color="#1E88E5", width=1, dash="dot"),
+                showlegend=False
+            ))
+
+            fig.add_trace(go.Scatter(
+                x=[rent_flexibility, scenario_rent_flexibility],
+                y=[rent_economic, scenario_rent_economic],
+                mode="lines",
+                line=dict(color="#FFC107", width=1, dash="dot"),
+                showlegend=False
+            ))
+
+            # 更新布局
+            fig.update_layout(
+                title="情景分析决策矩阵比较",
+                xaxis=dict(
+                    title="短期灵活性",
+                    range=[0, 100],
+                    tickvals=[0, 25, 50, 75, 100],
+                    ticktext=["极低", "低", "中等", "高", "极高"]
+                ),
+                yaxis=dict(
+                    title="长期经济性",
+                    range=[0, 100],
+                    tickvals=[0, 25, 50, 75, 100],
+                    ticktext=["极低", "低", "中等", "高", "极高"]
+                ),
+                height=500,
+                template="plotly_white"
+            )
 
-        fig.add_trace(go.Scatter(
-            x=[rent_flexibility, scenario_rent_flexibility],
-            y=[rent_economic, scenario_rent_economic],
-            mode="lines",
-            line=dict(color="#FFC107", width=1, dash="dot"),
-            showlegend=False
-        ))
+            st.plotly_chart(fig, use_container_width=True)
 
-        # 更新布局
-        fig.update_layout(
-            title="情景分析决策矩阵比较",
-            xaxis=dict(
-                title="短期灵活性",
-                range=[0, 100],
-                tickvals=[0, 25, 50, 75, 100],
-                ticktext=["极低", "低", "中等", "高", "极高"]
-            ),
-            yaxis=dict(
-                title="长期经济性",
-                range=[0, 100],
-                tickvals=[0, 25, 50, 75, 100],
-                ticktext=["极低", "低", "中等", "高", "极高"]
-            ),
-            height=500,
-            template="plotly_white"
-        )
+            # 显示情景分析建议
+            if scenario_buy_economic - buy_economic > 10:
+                st.success("情景分析表明：在这种情况下，买房的经济性大幅提升，更加有利")
+            elif scenario_buy_economic - buy_economic < -10:
+                st.error("情景分析表明：在这种情况下，买房的经济性显著下降，租房更为有利")
+            else:
+                st.info("情景分析表明：在这种情况下，经济性变化不大，决策不会有根本改变")
 
-        st.plotly_chart(fig, use_container_width=True)
-        
-        # 显示情景分析建议
-        if scenario_buy_economic - buy_economic > 10:
-            st.success("情景分析表明：在这种情况下，买房的经济性大幅提升，更加有利")
-        elif scenario_buy_economic - buy_economic < -10:
-            st.error("情景分析表明：在这种情况下，买房的经济性显著下降，租房更为有利")
-        else:
-            st.info("情景分析表明：在这种情况下，经济性变化不大，决策不会有根本改变")
+    scenario_section()
 
     # 综合风险评估部分
+    profiler.mark("风险评估")
     st.markdown('<div class="sub-header">风险评估</div>', unsafe_allow_html=True)
 
     # 创建风险评估卡片
@@ -1753,8 +1648,160 @@ with main_col1:
             st.markdown(f"{factor['description']}")
             st.markdown("---")
 
+    # 蒙特卡洛风险模拟
+    profiler.mark("蒙特卡洛风险模拟")
+    st.markdown('<div class="sub-header">蒙特卡洛风险模拟</div>', unsafe_allow_html=True)
+    @st.fragment
+    def monte_carlo_section():
+        """蒙特卡洛风险模拟"""
+        st.markdown("将房价涨幅、租金涨幅和投资回报率视为逐年随机变化的相关变量（从当前市场周期位置出发），模拟大量可能路径，评估买房决策的风险分布。")
+
+        mc_cols = st.columns(4)
+        with mc_cols[0]:
+            mc_paths = st.selectbox("模拟路径数", options=[1000, 10000, 100000], index=1, key="mc_paths")
+        with mc_cols[1]:
+            mc_house_vol = st.slider("房价波动率", min_value=0.0, max_value=20.0,
+                                     value=MONTE_CARLO_DEFAULTS['volatility']['house_price_growth'],
+                                     step=0.5, format="%.1f%%", key="mc_house_vol")
+        with mc_cols[2]:
+            mc_inv_vol = st.slider("投资回报波动率", min_value=0.0, max_value=30.0,
+                                   value=MONTE_CARLO_DEFAULTS['volatility']['investment_return'],
+                                   step=0.5, format="%.1f%%", key="mc_inv_vol")
+        with mc_cols[3]:
+            mc_seed = st.number_input("随机种子", min_value=0, max_value=2**31 - 1, value=42, step=1, key="mc_seed")
+
+        run_monte_carlo = st.button("运行蒙特卡洛模拟")
+
+        if run_monte_carlo:
+            mc_result = simulate_monte_carlo(
+                params,
+                n_paths=mc_paths,
+                market_cycle=market_cycle,
+                seed=int(mc_seed),
+                volatility={'house_price_growth': mc_house_vol, 'investment_return': mc_inv_vol},
+            )
+            mc_break_even = mc_result['break_even_year']
+
+            mc_metric_cols = st.columns(3)
+            with mc_metric_cols[0]:
+                st.metric("买房胜出概率", f"{mc_result['buy_win_probability']*100:.1f}%",
+                          help=f"居住{living_years}年期末，有效租房成本高于有效买房成本的路径占比")
+            with mc_metric_cols[1]:
+                if mc_result['break_even_probability'] > 0:
+                    st.metric("收支平衡年限中位数", f"{np.nanmedian(mc_break_even):.1f}年",
+                              f"{mc_result['break_even_probability']*100:.1f}%路径可达平衡", delta_color="off")
+                else:
+                    st.metric("收支平衡年限中位数", "超过计划期限")
+            with mc_metric_cols[2]:
+                st.metric("期末净值差额中位数", f"{np.median(mc_result['terminal_difference']):,.0f}元",
+                          help="有效租房成本 - 有效买房成本，正值表示买房更有利")
+
+            # 期末净值差额分布（先在服务端分箱，避免把全部路径发送到浏览器）
+            counts, edges = np.histogram(mc_result['terminal_difference'], bins=50)
+            centers = (edges[:-1] + edges[1:]) / 2
+
+            fig = go.Figure()
+            fig.add_trace(go.Bar(
+                x=centers,
+                y=counts / len(mc_result['terminal_difference']) * 100,
+                marker=dict(color=np.where(centers > 0, '#1E88E5', '#FFC107')),
+                name="路径占比"
+            ))
+            fig.add_vline(x=0, line=dict(color="gray", dash="dash"))
+            fig.update_layout(
+                title=f'期末净值差额分布（{mc_paths:,}条路径）',
+                xaxis_title='有效租房成本 - 有效买房成本(元)',
+                yaxis_title='路径占比(%)',
+                height=400,
+                template="plotly_white",
+                showlegend=False
+            )
+            st.plotly_chart(fig, use_container_width=True)
+
+            # 成本差额的分位数扇形图
+            # 只发送分位数，不发送原始路径，数据量与路径数无关
+            fig = go.Figure(percentile_band_traces(mc_result['years'], mc_result['difference_percentiles'], '#1E88E5',
+                                                   percentiles=mc_result['percentiles']))
+            fig.add_hline(y=0, line=dict(color="gray", dash="dash"))
+            fig.update_layout(
+                title='成本差额(租-买)的模拟分布',
+                xaxis_title='年份',
+                yaxis_title='成本差额(元)',
+                legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+                hovermode="x unified",
+                height=400,
+                template="plotly_white"
+            )
+            st.plotly_chart(fig, use_container_width=True)
+
+    monte_carlo_section()
+
+    # 提前还款与转贷策略
+    profiler.mark("提前还款与转贷策略")
+    st.markdown('<div class="sub-header">提前还款与转贷策略</div>', unsafe_allow_html=True)
+    @st.fragment
+    def prepayment_section():
+        """提前还款与转贷策略搜索"""
+        st.markdown("在提前还款时间、金额、调整方式（缩短年限/减少月供）以及是否转贷的全部组合中，搜索使居住期末有效买房成本最低的策略。提前还款资金按投资收益率计算机会成本，只作用于商业贷款部分。")
+
+        # 资金和转贷利率的默认值来自侧边栏参数：总资产、房价、首付比例或贷款利率改变后，清除控件状态使其
+        # 回到新的默认值，不保留按旧参数调整过的值。上次的默认值记录在 <键>_default 中
+        default_cash = int(max(total_assets - house_price * down_payment_percent / 100, 0))
+        for key, default in (('prepay_cash', default_cash), ('refinance_rate', loan_rate)):
+            if st.session_state.get(f"{key}_default") != default:
+                st.session_state[f"{key}_default"] = default
+                st.session_state.pop(key, None)
+        prepay_cols = st.columns(4)
+        with prepay_cols[0]:
+            available_cash = st.number_input("可用于提前还款的资金", min_value=0, value=default_cash,
+                                             step=100000, format="%d", key="prepay_cash")
+        with prepay_cols[1]:
+            refinance_rate = st.slider("预期转贷利率", min_value=1.0, max_value=10.0, value=loan_rate,
+                                       step=0.1, format="%.1f%%", key="refinance_rate")
+        with prepay_cols[2]:
+            rate_change_year = st.number_input("利率调整年份", min_value=1, max_value=30, value=1, step=1,
+                                               key="rate_change_year", help="从该年末起可以按预期转贷利率转贷")
+        with prepay_cols[3]:
+            refinance_cost = st.number_input("转贷费用", min_value=0, value=10000, step=1000,
+                                             format="%d", key="refinance_cost")
+
+        strategy = optimize_prepayment_strategy(
+            params,
+            available_cash,
+            refinance_rate=refinance_rate if refinance_rate != loan_rate else None,
+            rate_change_year=rate_change_year,
+            refinance_cost=refinance_cost,
+        )
+        best = strategy['best']
+
+        strategy_cols = st.columns(3)
+        with strategy_cols[0]:
+            if np.isnan(best['提前还款年份']):
+                st.metric("最优提前还款", "不提前还款")
+            else:
+                st.metric("最优提前还款", f"第{best['提前还款年份']:.0f}年末 {best['提前还款金额']:,.0f}元",
+                          best['调整方式'], delta_color="off")
+        with strategy_cols[1]:
+            st.metric("最优转贷时机", "不转贷" if np.isnan(best['转贷年份']) else f"第{best['转贷年份']:.0f}年末")
+        with strategy_cols[2]:
+            st.metric("有效买房成本节省", f"{best['相对基准节省']:,.0f}元",
+                      f"租买差额 {strategy['effective_rent_cost'] - best['有效买房成本']:,.0f}元", delta_color="off",
+                      help=f"{strategy['strategies'].shape[0]:,}个候选策略中的最优结果，相对不提前还款、不转贷的基准")
+
+        st.dataframe(strategy['strategies'].head(10).style.format({
+            '提前还款年份': "{:.0f}",
+            '提前还款金额': "{:,.0f}",
+            '转贷年份': "{:.0f}",
+            '期末剩余本金': "{:,.0f}",
+            '有效买房成本': "{:,.0f}",
+            '相对基准节省': "{:,.0f}",
+        }, na_rep="-"))
+
+    prepayment_section()
+
 with main_col2:
     # 财务摘要
+    profiler.mark("财务摘要")
     st.markdown('<div class="sub-header">财务摘要</div>', unsafe_allow_html=True)
     
     col1, col2 = st.columns(2)
@@ -1762,8 +1809,11 @@ with main_col2:
         st.metric("首付款", f"{summary['down_payment']:,.0f}元", 
                  f"{summary['down_payment']/house_price*100:.1f}%")
     with col2:
-        st.metric("月供", f"{summary['monthly_payment']:,.0f}元/月", 
-                 f"{summary['monthly_payment']*12/summary['total_mortgage_payment']*100:.1f}%年")
+        if summary['total_mortgage_payment'] > 0:  # 防止除以零错误
+            payment_share_text = f"{summary['monthly_payment']*12/summary['total_mortgage_payment']*100:.1f}%年"
+        else:
+            payment_share_text = "全款购房"
+        st.metric(payment_label, f"{summary['monthly_payment']:,.0f}元/月", payment_share_text)
     
     # 如果使用了公积金贷款，显示贷款明细
     if params.get('use_housing_fund', False) and summary['housing_fund_amount'] > 0:
@@ -1839,71 +1889,81 @@ with main_col2:
     """, unsafe_allow_html=True)
     
     # 个人因素评估
+    profiler.mark("个人因素评估")
     st.markdown('<div class="sub-header">个人因素评估</div>', unsafe_allow_html=True)
     
-    # 基于个人因素打分
-    personal_buy_score = 0
-    personal_rent_score = 0
-    
-    # 职业稳定性影响
-    if career_stability >= 8:
-        personal_buy_score += 15
-    elif career_stability >= 5:
-        personal_buy_score += 5
-    else:
-        personal_rent_score += 15
-    
-    # 家庭计划影响
-    if family_plan == "扩大家庭":
-        personal_buy_score += 10
-    elif family_plan == "缩小家庭":
-        personal_rent_score += 5
-    elif family_plan == "不确定":
-        personal_rent_score += 10
-    
-    # 流动性需求影响
-    if mobility_need >= 7:
-        personal_rent_score += 15
-    elif mobility_need <= 3:
-        personal_buy_score += 15
-    
-    # 所有权重要性
-    if ownership_importance >= 8:
-        personal_buy_score += 15
-    elif ownership_importance <= 3:
-        personal_rent_score += 10
-    
-    # 归一化分数到100分制
-    max_possible_score = 40  # 根据上面规则的最大可能得分
-    personal_buy_score = (personal_buy_score / max_possible_score) * 100
-    personal_rent_score = (personal_rent_score / max_possible_score) * 100
+    @st.fragment
+    def personal_factor_section():
+        """个人因素控件（渲染在侧边栏）和个人因素评估"""
+        with personal_factor_panel:
+            career_stability = st.slider(
+                "职业稳定性", 
+                min_value=1, 
+                max_value=10, 
+                value=7, 
+                step=1,
+                help="1=非常不稳定，10=非常稳定",
+                key="career_stability"
+            )
     
-    col1, col2 = st.columns(2)
-    with col1:
-        st.metric("个人因素-买房倾向", f"{personal_buy_score:.0f}/100")
-    with col2:
-        st.metric("个人因素-租房倾向", f"{personal_rent_score:.0f}/100")
-    
-    # 个人因素推荐
-    personal_recommendation = ""
-    if personal_buy_score > personal_rent_score + 20:
-        personal_recommendation = "从个人因素考虑，**强烈建议买房**。您的职业稳定性高、家庭需求明确，且重视房屋所有权。"
-    elif personal_buy_score > personal_rent_score:
-        personal_recommendation = "从个人因素考虑，**偏向于买房**。您的个人情况比较适合置业，但仍有一些灵活性需求。"
-    elif personal_rent_score > personal_buy_score + 20:
-        personal_recommendation = "从个人因素考虑，**强烈建议租房**。您可能有较高的流动性需求或职业变动可能性。"
-    elif personal_rent_score > personal_buy_score:
-        personal_recommendation = "从个人因素考虑，**偏向于租房**。您的个人情况目前可能更适合保持灵活性。"
-    else:
-        personal_recommendation = "从个人因素考虑，买房和租房没有明显偏好，可以更多关注财务因素。"
+            family_plan = st.radio(
+                "未来3-5年家庭计划",
+                options=["无变化", "扩大家庭", "缩小家庭", "不确定"],
+                key="family_plan"
+            )
     
-    st.markdown(f"""
-    <div class="card">
-        <h3>个人因素建议</h3>
-        <p>{personal_recommendation}</p>
-    </div>
-    """, unsafe_allow_html=True)
+            mobility_need = st.slider(
+                "生活流动性需求", 
+                min_value=1, 
+                max_value=10, 
+                value=5, 
+                step=1,
+                help="1=几乎不需要变动，10=需要高度灵活性",
+                key="mobility_need"
+            )
     
+            ownership_importance = st.slider(
+                "房屋所有权重要性", 
+                min_value=1, 
+                max_value=10, 
+                value=7, 
+                step=1,
+                help="拥有自己房子对您的重要程度",
+                key="ownership_importance"
+            )
+
+        # 基于个人因素打分
+        personal_buy_score, personal_rent_score = calculate_personal_scores(
+            career_stability, family_plan, mobility_need, ownership_importance)
+
+        col1, col2 = st.columns(2)
+        with col1:
+            st.metric("个人因素-买房倾向", f"{personal_buy_score:.0f}/100")
+        with col2:
+            st.metric("个人因素-租房倾向", f"{personal_rent_score:.0f}/100")
+
+        # 个人因素推荐
+        personal_recommendation = ""
+        if personal_buy_score > personal_rent_score + 20:
+            personal_recommendation = "从个人因素考虑，**强烈建议买房**。您的职业稳定性高、家庭需求明确，且重视房屋所有权。"
+        elif personal_buy_score > personal_rent_score:
+            personal_recommendation = "从个人因素考虑，**偏向于买房**。您的个人情况比较适合置业，但仍有一些灵活性需求。"
+        elif personal_rent_score > personal_buy_score + 20:
+            personal_recommendation = "从个人因素考虑，**强烈建议租房**。您可能有较高的流动性需求或职业变动可能性。"
+        elif personal_rent_score > personal_buy_score:
+            personal_recommendation = "从个人因素考虑，**偏向于租房**。您的个人情况目前可能更适合保持灵活性。"
+        else:
+            personal_recommendation = "从个人因素考虑，买房和租房没有明显偏好，可以更多关注财务因素。"
+
+        st.markdown(f"""
+        <div class="card">
+            <h3>个人因素建议</h3>
+            <p>{personal_recommendation}</p>
+        </div>
+        """, unsafe_allow_html=True)
+
+    personal_factor_section()
+
     # 资产配置建议
     if summary['break_even_year'] and summary['break_even_year'] <= living_years / 2:
         asset_advice = """
@@ -1970,23 +2030,19 @@ with main_col2:
         """)
     
     # 房贷和投资收益对比
+    profiler.mark("房贷与投资收益对比")
     st.markdown('<div class="sub-header">房贷与投资收益对比</div>', unsafe_allow_html=True)
     
     # 创建房贷与投资收益对比图
-    loan_payments = np.zeros(living_years)
     investment_values = np.zeros(living_years)
     property_values = np.zeros(living_years)
     
     down_payment = house_price * down_payment_percent / 100
-    monthly_payment = summary['monthly_payment']
+    # 房贷总支出（首付+累计月供），按还款计划逐月累加，贷款还清后不再增加
+    monthly_payments = calculate_loan_schedule(params, living_years * 12)['合计月供'].to_numpy()
+    loan_payments = down_payment + np.cumsum(monthly_payments)[11::12]
     
     for i in range(living_years):
-        # 计算房贷总支出（首付+累计月供）
-        if i == 0:
-            loan_payments[i] = down_payment + monthly_payment * 12
-        else:
-            loan_payments[i] = loan_payments[i-1] + monthly_payment * 12
-        
         # 计算等额首付投资收益
         if use_real_returns:
             r_inv_real = (1 + investment_return / 100) / (1 + inflation_rate / 100) - 1
@@ -2001,8 +2057,8 @@ with main_col2:
     fig = go.Figure()
     
     fig.add_trace(
-        go.Scatter(
-            x=list(range(1, living_years + 1)), 
+        line_trace(
+            x=np.arange(1, living_years + 1), 
             y=loan_payments, 
             name="买房累计支出",
             line=dict(color='#FFC107', width=3)
@@ -2010,8 +2066,8 @@ with main_col2:
     )
     
     fig.add_trace(
-        go.Scatter(
-            x=list(range(1, living_years + 1)), 
+        line_trace(
+            x=np.arange(1, living_years + 1), 
             y=investment_values, 
             name="首付投资收益",
             line=dict(color='#4CAF50', width=3)
@@ -2019,8 +2075,8 @@ with main_col2:
     )
     
     fig.add_trace(
-        go.Scatter(
-            x=list(range(1, living_years + 1)), 
+        line_trace(
+            x=np.arange(1, living_years + 1), 
             y=property_values, 
             name="房产估值",
             line=dict(color='#1E88E5', width=3, dash='dash')
@@ -2051,6 +2107,8 @@ with main_col2:
           - $P$: 贷款本金
           - $r$: 月利率
           - $n$: 还款月数
+        - **月供计算** (等额本金): $M_k = \\frac{P}{n} + \\left(P - \\frac{P}{n}(k-1)\\right) \\times r$
+          - $M_k$: 第 $k$ 个月的月供，逐月递减
         - **持有成本** = (物业费×面积 + 维修基金 + 房产税×房价)×每年累计
         - **房产残值** = 房价×(1+年增值率)^居住年限
         
@@ -2095,6 +2153,7 @@ with main_col2:
         A: 通货膨胀会侵蚀名义回报的购买力。例如，如果名义收益率为6%，通货膨胀率为2%，则实际收益率约为3.9%。在长期财务规划中，使用实际收益率可更准确评估投资的真实增值。
         """)
 
+profiler.mark("决策指标解释")
 with st.expander("决策指标详细解释"):
     st.markdown("""
     **我们的建议综合考虑了两个关键指标：**
@@ -2117,219 +2176,182 @@ with st.expander("决策指标详细解释"):
     当两个核心指标给出一致建议时，决策较为明确；当存在分歧时，需要结合个人情况、风险偏好和对未来预期进行综合判断。
     """)
 
+profiler.mark("报告生成")
+
 # 添加报告生成功能
 st.markdown('<div class="sub-header">报告生成</div>', unsafe_allow_html=True)
 report_col1, report_col2 = st.columns(2)
 
-def generate_excel():
-    """生成Excel格式报告"""
-    output = BytesIO()
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-        # 添加参数表
-        params_list = [{
-            '参数名': '房价',
-            '符号': 'P',
-            '值': f"{house_price:,.0f}元",
-            '说明': '目标房产总价'
-        }, {
-            '参数名': '首付比例',
-            '符号': 'dp',
-            '值': f"{down_payment_percent}%",
-            '说明': '首付款占比'
-        }, {
-            '参数名': '贷款年限',
-            '符号': 'n_loan',
-            '值': f"{loan_years}年",
-            '说明': '按揭贷款期限'
-        }, {
-            '参数名': '贷款利率',
-            '符号': 'r_loan',
-            '值': f"{loan_rate}%/年",
-            '说明': '商业贷款年利率'
-        }, {
-            '参数名': '月租金',
-            '符号': 'rent',
-            '值': f"{monthly_rent:,.0f}元/月",
-            '说明': '当前市场租金'
-        }, {
-            '参数名': '租金年涨幅',
-            '符号': 'g_rent',
-            '值': f"{rent_growth}%/年",
-            '说明': '租金年均增长率'
-        }, {
-            '参数名': '投资回报率',
-            '符号': 'r_inv',
-            '值': f"{investment_return}%/年",
-            '说明': '首付款替代投资年化收益'
-        }, {
-            '参数名': '物业费',
-            '符号': 'fee',
-            '值': f"{property_fee}元/m²/月",
-            '说明': '物业管理费单价'
-        }, {
-            '参数名': '房产税率',
-            '符号': 'tax',
-            '值': f"{property_tax}%/年",
-            '说明': '房产评估价值年税率'
-        }, {
-            '参数名': '维修基金',
-            '符号': 'maint',
-            '值': f"{maintenance_fund:,.0f}元/年",
-            '说明': '年均房屋维护费用'
-        }, {
-            '参数名': '计划居住年限',
-            '符号': 'n_live',
-            '值': f"{living_years}年",
-            '说明': '预计持有/租住时长'
-        }, {
-            '参数名': '房价年涨幅',
-            '符号': 'g_home',
-            '值': f"{house_price_growth}%/年",
-            '说明': '预期房产年均增值率'
-        }, {
-            '参数名': '通货膨胀率',
-            '符号': 'inflation',
-            '值': f"{inflation_rate}%/年",
-            '说明': '年度通货膨胀率'
-        }]
-        
-        # 添加公积金贷款参数
-        if params.get('use_housing_fund', False):
-            params_list.extend([{
-                '参数名': '公积金贷款',
-                '符号': 'HF',
-                '值': f"{params.get('housing_fund_amount', 0):,.0f}元",
-                '说明': '公积金贷款金额'
-            }, {
-                '参数名': '公积金贷款利率',
-                '符号': 'r_hf',
-                '值': f"{params.get('housing_fund_rate', 3.1)}%/年",
-                '说明': '公积金贷款年利率'
-            }])
-
-        params_df = pd.DataFrame(params_list)
-        params_df.to_excel(writer, sheet_name='参数设置', index=False)
-        
-        # 添加结果表
-        results.to_excel(writer, sheet_name='详细数据', index_label='年份')
-        
-        # 添加摘要表
-        summary_list = [{
-            '指标': '价格租金比',
-            '值': f"{summary['price_to_rent_ratio']:.1f}",
-            '说明': '房价相当于多少年的租金总和'
-        }, {
-            '指标': '收支平衡年限',
-            '值': f"{summary['break_even_year'] if summary['break_even_year'] else '超过计划居住期'}",
-            '说明': '租房成本超过买房成本的时间点'
-        }, {
-            '指标': '租金覆盖率',
-            '值': f"{summary['rent_coverage_ratio']:.1f}%",
-            '说明': '月租金占月供的百分比'
-        }, {
-            '指标': '首付金额',
-            '值': f"{summary['down_payment']:,.0f}元",
-            '说明': '房价的首付款金额'
-        }, {
-            '指标': '月供',
-            '值': f"{summary['monthly_payment']:,.0f}元/月",
-            '说明': '每月按揭还款金额'
-        }, {
-            '指标': '总贷款支出',
-            '值': f"{summary['total_mortgage_payment']:,.0f}元",
-            '说明': '贷款期内所有还款总额'
-        }, {
-            '指标': '总房屋持有成本',
-            '值': f"{summary['total_holding_cost']:,.0f}元",
-            '说明': '物业费、维修费和房产税总和'
-        }, {
-            '指标': '总租金支出',
-            '值': f"{summary['total_rent_cost']:,.0f}元",
-            '说明': '租房期内所有租金总和'
-        }, {
-            '指标': '首付投资收益',
-            '值': f"{summary['investment_return']:,.0f}元",
-            '说明': '首付金额投资后的收益'
-        }, {
-            '指标': '最终房产估值',
-            '值': f"{summary['final_property_value']:,.0f}元",
-            '说明': f"{living_years}年后的房产价值"
-        }, {
-            '指标': '买房经济性得分',
-            '值': f"{buy_economic:.1f}/100",
-            '说明': '买房在决策矩阵中的经济性评分'
-        }, {
-            '指标': '买房灵活性得分',
-            '值': f"{buy_flexibility:.1f}/100",
-            '说明': '买房在决策矩阵中的灵活性评分'
-        }, {
-            '指标': '租房经济性得分',
-            '值': f"{rent_economic:.1f}/100",
-            '说明': '租房在决策矩阵中的经济性评分'
-        }, {
-            '指标': '租房灵活性得分',
-            '值': f"{rent_flexibility:.1f}/100",
-            '说明': '租房在决策矩阵中的灵活性评分'
-        }]
-
-        if params.get('use_housing_fund', False):
-            summary_list.extend([{
-                '指标': '公积金贷款金额',
-                '值': f"{summary['housing_fund_amount']:,.0f}元",
-                '说明': '使用的公积金贷款金额'
-            }, {
-                '指标': '公积金贷款月供',
-                '值': f"{summary['housing_fund_monthly_payment']:,.0f}元/月",
-                '说明': '公积金贷款部分的月供'
-            }, {
-                '指标': '商业贷款金额',
-                '值': f"{summary['commercial_loan_amount']:,.0f}元",
-                '说明': '使用的商业贷款金额'
-            }, {
-                '指标': '商业贷款月供',
-                '值': f"{summary['commercial_monthly_payment']:,.0f}元/月",
-                '说明': '商业贷款部分的月供'
-            }])
-
-        summary_df = pd.DataFrame(summary_list)
-        summary_df.to_excel(writer, sheet_name='摘要指标', index=False)
-        
-        # 配置工作簿
-        workbook = writer.book
-        
-        # 格式化数字
-        number_format = workbook.add_format({'num_format': '#,##0'})
-        percent_format = workbook.add_format({'num_format': '0.0%'})
-        
-        # 设置列宽
-        worksheet = writer.sheets['详细数据']
-        worksheet.set_column('A:H', 15, number_format)
-    
-    output.seek(0)
-    return output
-
 # 添加报告下载按钮
 with report_col1:
-    excel_data = generate_excel()
+    report_scores = {
+        'buy_economic': buy_economic,
+        'buy_flexibility': buy_flexibility,
+        'rent_economic': rent_economic,
+        'rent_flexibility': rent_flexibility,
+    }
+    # 报告只在点击下载时生成，相同参数重复下载复用缓存
     st.download_button(
         label="下载Excel报告",
-        data=excel_data,
+        data=lambda: cached_excel_report(params, results, summary, report_scores),
         file_name=f"买房vs租房分析_{datetime.now().strftime('%Y-%m-%d')}.xlsx",
         mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        on_click="ignore",
     )
 
 with report_col2:
-    # 保存参数配置
+    # 保存参数配置：以参数哈希为主键连同摘要写入本地数据库，相同参数重复保存只更新名称
+    config_name = st.text_input("配置名称", value="", placeholder="可选，便于在列表中识别", key="config_name")
     if st.button("保存当前参数配置"):
-        # 这里只是示例，实际的持久化需要使用数据库或文件系统
-        st.session_state['saved_configs'] = st.session_state.get('saved_configs', []) + [params]
-        st.success(f"参数配置已保存! 当前共有 {len(st.session_state.get('saved_configs', []))} 组配置")
+        config_store.save(params, summary, name=config_name, resolution=resolution)
+        st.success(f"参数配置已保存! 当前共有 {len(config_store)} 组配置")
+
+profiler.mark("已保存的参数配置")
+
+@st.fragment
+def saved_configs_section():
+    """已保存配置的列表、载入/删除和配置对比"""
+    # 已保存配置的列表直接读取数据库中的摘要指标，无需重新计算
+    with st.expander("已保存的参数配置"):
+        list_col1, list_col2, list_col3 = st.columns(3)
+        with list_col1:
+            saved_order = st.selectbox(
+                "排序方式",
+                options=['created_at', 'house_price', 'break_even_year', 'price_to_rent_ratio'],
+                format_func={'created_at': '保存时间', 'house_price': '房价', 'break_even_year': '收支平衡年限',
+                             'price_to_rent_ratio': '价格租金比'}.get,
+                key="saved_order"
+            )
+        with list_col2:
+            saved_max_price = st.number_input("房价上限（0表示不限）", min_value=0, value=0, step=1000000,
+                                              format="%d", key="saved_max_price")
+        with list_col3:
+            saved_max_break_even = st.number_input("收支平衡年限上限（0表示不限）", min_value=0.0, value=0.0, step=1.0,
+                                                   key="saved_max_break_even")
+
+        ranges = {}
+        if saved_max_price:
+            ranges['house_price'] = (None, saved_max_price)
+        if saved_max_break_even:
+            ranges['break_even_year'] = (None, saved_max_break_even)
+        saved = config_store.list_configs(order_by=saved_order, descending=saved_order == 'created_at',
+                                          limit=1000, ranges=ranges)
+
+        if saved.empty:
+            st.info("暂无符合条件的已保存配置")
+        else:
+            st.dataframe(
+                saved.rename(columns={
+                    'name': '名称', 'created_at': '保存时间', 'house_price': '房价', 'monthly_rent': '月租金',
+                    'living_years': '居住年限', 'break_even_year': '收支平衡年限',
+                    'price_to_rent_ratio': '价格租金比', 'monthly_payment': '月供',
+                }).style.format({'房价': '{:,.0f}', '月租金': '{:,.0f}', '月供': '{:,.0f}',
+                                 '收支平衡年限': '{:.1f}', '价格租金比': '{:.1f}'}, na_rep='-'),
+                hide_index=True,
+            )
+            saved_labels = {
+                key: f"{row['name'] or '未命名'} | 房价{row['house_price'] / 10000:.0f}万 | {row['created_at']}"
+                for key, row in saved.iterrows()
+            }
+            selected_config = st.selectbox("选择配置", options=list(saved_labels), format_func=saved_labels.get,
+                                           key="selected_config")
+            action_col1, action_col2 = st.columns(2)
+            with action_col1:
+                if st.button("载入所选配置"):
+                    loaded = config_store.get(selected_config)
+                    if loaded is not None:
+                        # 控件已创建，需在下一次运行开始时写入会话状态
+                        st.session_state['_pending_config'] = loaded[0]
+                        st.rerun()
+            with action_col2:
+                if st.button("删除所选配置"):
+                    config_store.delete(selected_config)
+                    st.rerun()
+
+            # 配置对比：按当前排序和筛选取前若干组，一次批量计算
+            if len(saved) >= 2:
+                st.markdown("#### 配置对比")
+                compare_count = st.number_input(
+                    "对比配置数（按当前排序取前N组）",
+                    min_value=2,
+                    max_value=len(saved),
+                    value=min(50, len(saved)),
+                    step=1,
+                    key="compare_count"
+                )
+                compared = saved.head(compare_count)
+                compare_names = tuple(
+                    f"{row['name'] or '未命名'}（{key[:6]}）" for key, row in compared.iterrows()
+                )
+                fig, comparison_summary = saved_config_comparison(tuple(compared.index), compare_names)
+                st.plotly_chart(fig, use_container_width=True)
+                # 点击表头即可按任意指标排序
+                st.dataframe(
+                    comparison_summary.style.format({
+                        '房价': '{:,.0f}', '月租金': '{:,.0f}', '价格租金比': '{:.1f}', '首付款': '{:,.0f}',
+                        '月供': '{:,.0f}', '收支平衡年限': '{:.1f}', '期末有效买房成本': '{:,.0f}',
+                        '期末有效租房成本': '{:,.0f}', '期末差额(租-买)': '{:,.0f}', '期末房产价值': '{:,.0f}',
+                    }, na_rep='超出计划期限'),
+                    hide_index=True,
+                )
+
+saved_configs_section()
 
 # 页脚
 st.markdown("""
 ---
 <div style="text-align:center; color:#666; padding:20px;">
 买房 vs 租房决策分析工具 | © 2025 | 版本 1.0<br>
-基于Streamlit开发 | 使用Plotly和Matplotlib进行数据可视化
+基于Streamlit开发 | 使用Plotly进行数据可视化
 </div>
 """, unsafe_allow_html=True)
+
+# 性能调试面板：展示本次运行各区段和模型调用的耗时与内存，并写入结构化日志
+if profiling_enabled:
+    profiler.finish()
+    st.session_state['profile_rerun'] = st.session_state.get('profile_rerun', 0) + 1
+    profiler.log(rerun=st.session_state['profile_rerun'])
+    with st.expander("性能调试", expanded=True):
+        profile_records = profiler.to_frame()
+        sections = profile_records[profile_records['kind'] == 'section']
+        total_ms = sections['wall_ms'].sum()
+        st.markdown(f"本次运行（第{st.session_state['profile_rerun']}次，ID {profiler.run_id}）共用时 **{total_ms:,.0f} ms**")
+
+        fig = go.Figure(go.Bar(
+            y=sections['name'],
+            x=sections['wall_ms'],
+            orientation='h',
+            marker_color='#1E88E5',
+            customdata=sections['peak_kb'] / 1024,
+            hovertemplate="%{y}: %{x:,.1f} ms<br>峰值内存增量: %{customdata:,.1f} MB<extra></extra>"
+        ))
+        fig.update_layout(
+            title="各区段耗时",
+            xaxis_title="耗时 (ms)",
+            yaxis=dict(autorange='reversed'),
+            height=max(300, 28 * len(sections) + 120),
+            template="plotly_white"
+        )
+        st.plotly_chart(fig, use_container_width=True)
+
+        st.markdown("#### 按名称汇总")
+        st.dataframe(profiler.summary().style.format({
+            'total_ms': '{:,.1f}', 'max_ms': '{:,.1f}', 'max_peak_kb': '{:,.0f}',
+        }), hide_index=True)
+        st.markdown("#### 区段依赖")
+        st.caption("只调整局部控件时仅重新运行对应片段，不会产生新的整页计时")
+        st.dataframe([
+            {'区段': name, '输入': '、'.join(inputs), '局部重新运行': name in FRAGMENT_SECTIONS}
+            for name, inputs in SECTION_INPUTS.items()
+        ], hide_index=True)
+        st.markdown("#### 全部记录")
+        st.dataframe(profile_records.style.format({
+            'start_ms': '{:,.1f}', 'wall_ms': '{:,.1f}', 'allocated_kb': '{:,.0f}', 'peak_kb': '{:,.0f}',
+        }), hide_index=True)
+        st.download_button(
+            label="下载计时记录 (JSON)",
+            data=profiler.to_json(rerun=st.session_state['profile_rerun']),
+            file_name=f"profile_{profiler.run_id}.json",
+            mime="application/json",
+            on_click="ignore",
+        )
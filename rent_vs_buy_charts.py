@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+买房 vs 租房页面的曲线图层
+
+长周期、多配置叠加和蒙特卡洛模拟的曲线点数可能很多，逐点以 SVG 发送到浏览器会使每次运行的图表数据达到数 MB。
+这里的函数把发送的数据量限制在固定范围内：单条曲线超过 MAX_LINE_POINTS 个点时用 LTTB
+（Largest-Triangle-Three-Buckets）降采样，保留曲线的形状和极值；一个图层的总点数超过 WEBGL_POINT_THRESHOLD
+时改用 WebGL 渲染（Scattergl）；大量路径或配置只发送分位数带，不发送原始曲线。不依赖 Streamlit。
+"""
+
+import numpy as np
+import plotly.graph_objects as go
+
+# 单条曲线最多发送的点数
+MAX_LINE_POINTS = 500
+# 单个图层超过该点数时使用 WebGL 渲染
+WEBGL_POINT_THRESHOLD = 2000
+# 分位数带：外带、内带和中位数
+BAND_PERCENTILES = (5, 25, 50, 75, 95)
+
+
+def lttb_indices(x, y, n_out):
+    """LTTB 降采样，返回保留的点的下标（升序，含首尾两点）
+
+    中间的点按下标均分为 n_out - 2 个桶，每个桶保留与上一个保留点、下一个桶均值点构成三角形面积最大的点。
+    x、y 中不能有空值。
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.intp)
+    selected = np.empty(n_out, dtype=np.intp)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, stop = edges[i], edges[i + 1]
+        # 下一个桶的均值点，最后一个桶之后是末点
+        next_stop = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x, avg_y = x[stop:next_stop].mean(), y[stop:next_stop].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:stop] - y[a]) - (x[a] - x[start:stop]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def downsample_indices(x, y, max_points=MAX_LINE_POINTS):
+    """丢弃空值点后按 LTTB 降采样，返回保留的点在原数组中的下标"""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    finite = np.flatnonzero(np.isfinite(x) & np.isfinite(y))
+    if max_points is None or len(finite) <= max_points:
+        return finite
+    return finite[lttb_indices(x[finite], y[finite], max_points)]
+
+
+def _trace_type(n_points, webgl_threshold):
+    return go.Scattergl if n_points > webgl_threshold else go.Scatter
+
+
+def line_trace(x, y, max_points=MAX_LINE_POINTS, webgl_threshold=WEBGL_POINT_THRESHOLD, **kwargs):
+    """单条曲线图层，其余参数原样传给 go.Scatter / go.Scattergl"""
+    x = np.asarray(x)
+    y = np.asarray(y, dtype=float)
+    keep = downsample_indices(x, y, max_points)
+    return _trace_type(len(keep), webgl_threshold)(x=x[keep], y=y[keep], **kwargs)
+
+
+def multi_line_trace(x, curves, labels, max_points=MAX_LINE_POINTS, webgl_threshold=WEBGL_POINT_THRESHOLD, **kwargs):
+    """多条曲线合并为一个图层，各曲线之间以空值断开，曲线再多也只有一个图层
+
+    curves 形状为 (曲线数, len(x))，空值点不发送；labels 为每条曲线的名称，作为各点的 customdata 供悬停显示。
+    """
+    x = np.asarray(x)
+    xs, ys, names = [], [], []
+    for curve, label in zip(np.asarray(curves, dtype=float), labels):
+        keep = downsample_indices(x, curve, max_points)
+        xs += [x[keep], [np.nan]]
+        ys += [curve[keep], [np.nan]]
+        names.append(np.full(len(keep) + 1, label, dtype=object))
+    x_all, y_all = np.concatenate(xs), np.concatenate(ys)
+    return _trace_type(len(x_all), webgl_threshold)(
+        x=x_all, y=y_all, customdata=np.concatenate(names), mode='lines', **kwargs)
+
+
+def percentile_bands(paths, percentiles=BAND_PERCENTILES):
+    """按时间点计算路径的分位数，返回形状 (len(percentiles), T)；空值（如超出居住期的年份）不参与计算"""
+    return np.nanpercentile(np.asarray(paths, dtype=float), percentiles, axis=0)
+
+
+def _rgba(color, alpha):
+    """'#RRGGBB' 转为带透明度的 rgba 字符串"""
+    red, green, blue = (int(color[i:i + 2], 16) for i in (1, 3, 5))
+    return f"rgba({red},{green},{blue},{alpha})"
+
+
+def percentile_band_traces(x, bands, color, name='', percentiles=BAND_PERCENTILES, max_points=MAX_LINE_POINTS):
+    """分位数扇形图的图层：外带、内带和中位数线
+
+    bands 为按 percentiles 排列的分位数（形状 (5, T)，如 percentile_bands 的结果）。
+    各分位数线共用中位数线的降采样下标，保证填充区域上下边界的横坐标一致。
+    """
+    x = np.asarray(x)
+    bands = np.asarray(bands, dtype=float)
+    keep = downsample_indices(x, bands[2], max_points)
+    x, bands = x[keep], bands[:, keep]
+    prefix = f"{name} " if name else ""
+    traces = []
+    for (low, high), alpha in (((0, 4), 0.15), ((1, 3), 0.35)):
+        traces.append(go.Scatter(x=x, y=bands[low], line=dict(width=0), showlegend=False, hoverinfo='skip',
+                                 legendgroup=name))
+        traces.append(go.Scatter(x=x, y=bands[high], fill='tonexty', fillcolor=_rgba(color, alpha), line=dict(width=0),
+                                 name=f"{prefix}{percentiles[low]}%-{percentiles[high]}%分位", legendgroup=name))
+    traces.append(go.Scatter(x=x, y=bands[2], line=dict(color=color, width=3), name=f"{prefix}中位数",
+                             legendgroup=name))
+    return traces
@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+"""
+买房 vs 租房批量计算命令行工具
+
+从 CSV / Parquet / JSONL 文件读取参数（列名与 calculate_buy_vs_rent 的 params 键相同），按块交给进程池批量计算，
+并把每行参数及其摘要指标逐块写出，摘要列名加 SUMMARY_PREFIX 前缀。不依赖 Streamlit。读取、计算和写出都是逐块进行的生成器流水线，
+峰值内存只取决于块大小和工作进程数，与文件大小无关。
+
+用法示例：
+    python rent_vs_buy_cli.py scenarios.csv -o summary.csv --chunk-size 100000 --workers 8
+"""
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from rent_vs_buy_model import (
+    BATCH_OPTIONAL_PARAMS,
+    BATCH_REQUIRED_PARAMS,
+    RESOLUTION_STEPS,
+    calculate_summary_batch,
+)
+
+# 根据文件扩展名识别的格式
+FILE_FORMATS = {
+    '.csv': 'csv',
+    '.parquet': 'parquet',
+    '.pq': 'parquet',
+    '.jsonl': 'jsonl',
+    '.ndjson': 'jsonl',
+}
+
+# 输出中摘要列名的前缀：摘要的部分字段与参数同名但含义不同（investment_return 为投资收益金额，
+# housing_fund_amount 为按上限截取后的公积金贷款额），加前缀后参数列和摘要列都原样保留
+SUMMARY_PREFIX = 'result_'
+
+
+def detect_format(path):
+    """根据扩展名判断文件格式，'-' 表示标准输入/输出（CSV）"""
+    if path == '-':
+        return 'csv'
+    suffix = os.path.splitext(path)[1].lower()
+    if suffix not in FILE_FORMATS:
+        raise ValueError(f"无法识别的文件格式: {path}（支持 {', '.join(FILE_FORMATS)}）")
+    return FILE_FORMATS[suffix]
+
+
+def read_chunks(path, chunk_size):
+    """按块读取参数文件，逐块返回 DataFrame"""
+    file_format = detect_format(path)
+    source = sys.stdin if path == '-' else path
+    if file_format == 'csv':
+        yield from pd.read_csv(source, chunksize=chunk_size)
+    elif file_format == 'jsonl':
+        yield from pd.read_json(source, lines=True, chunksize=chunk_size)
+    else:
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(source).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+
+
+def evaluate_chunk(chunk, resolution='yearly', float_dtype=np.float64):
+    """计算一块参数的摘要指标，返回参数列与摘要列（加 SUMMARY_PREFIX 前缀）拼接后的 DataFrame"""
+    missing = [key for key in BATCH_REQUIRED_PARAMS if key not in chunk]
+    if missing:
+        raise ValueError(f"参数文件缺少必需的列: {', '.join(missing)}")
+    # 可选参数留空的行取默认值
+    defaults = {key: default for key, default in BATCH_OPTIONAL_PARAMS.items() if key in chunk}
+    summary = calculate_summary_batch(chunk.fillna(defaults), resolution, float_dtype=float_dtype)
+    return pd.concat([chunk, summary.add_prefix(SUMMARY_PREFIX)], axis=1)
+
+
+def evaluate_chunks(chunks, resolution='yearly', workers=1, float_dtype=np.float64):
+    """逐块计算并按输入顺序返回结果
+
+    workers 大于1时使用进程池，同时在途的块数不超过 2 * workers，读取速度快于计算速度时不会积压在内存中。
+    """
+    if workers <= 1:
+        for chunk in chunks:
+            yield evaluate_chunk(chunk, resolution, float_dtype)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(evaluate_chunk, chunk, resolution, float_dtype))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+class ResultWriter:
+    """逐块追加写出结果，支持 CSV、JSONL 和 Parquet"""
+
+    def __init__(self, path):
+        self.path = path
+        self.file_format = detect_format(path)
+        self._parquet_writer = None
+        self._header_written = False
+        self._file = None
+        if self.file_format != 'parquet':
+            self._file = sys.stdout if path == '-' else open(path, 'w', encoding='utf-8', newline='')
+
+    def write(self, frame):
+        if self.file_format == 'parquet':
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self._parquet_writer is None:
+                self._parquet_writer = pq.ParquetWriter(self.path, table.schema)
+            self._parquet_writer.write_table(table)
+        elif self.file_format == 'csv':
+            frame.to_csv(self._file, index=False, header=not self._header_written)
+            self._header_written = True
+        else:
+            frame.to_json(self._file, orient='records', lines=True, force_ascii=False)
+
+    def close(self):
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+        if self._file is not None and self._file is not sys.stdout:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def run(input_path, output_path, chunk_size=100000, workers=1, resolution='yearly', progress=None,
+        float_dtype=np.float64):
+    """读取参数文件并写出摘要，返回处理的行数"""
+    n_rows = 0
+    with ResultWriter(output_path) as writer:
+        for result in evaluate_chunks(read_chunks(input_path, chunk_size), resolution, workers, float_dtype):
+            writer.write(result)
+            n_rows += len(result)
+            if progress is not None:
+                progress(n_rows)
+    return n_rows
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="批量计算买房 vs 租房的摘要指标")
+    parser.add_argument('input', help="参数文件（.csv / .parquet / .jsonl），'-' 表示从标准输入读取CSV")
+    parser.add_argument('-o', '--output', default='-', help="结果文件（.csv / .parquet / .jsonl），默认以CSV写到标准输出")
+    parser.add_argument('--chunk-size', type=int, default=100000, help="每块的行数（默认100000）")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="工作进程数（默认CPU核数，1表示不使用进程池）")
+    parser.add_argument('--resolution', choices=list(RESOLUTION_STEPS), default='yearly', help="收支平衡扫描精度")
+    parser.add_argument('--float32', action='store_true',
+                        help="摘要指标仍以 float64 计算，结果转为 float32 保存和写出，内存与 Parquet 文件减半，约7位有效数字")
+    parser.add_argument('--quiet', action='store_true', help="不在标准错误输出进度")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.chunk_size <= 0:
+        raise SystemExit("--chunk-size 必须为正整数")
+
+    start = time.perf_counter()
+
+    def progress(n_rows):
+        elapsed = time.perf_counter() - start
+        print(f"已处理 {n_rows:,} 行，用时 {elapsed:.1f} 秒", file=sys.stderr)
+
+    try:
+        n_rows = run(args.input, args.output, args.chunk_size, args.workers, args.resolution,
+                     progress=None if args.quiet else progress,
+                     float_dtype=np.float32 if args.float32 else np.float64)
+    except ImportError as exc:
+        # 只有读写 Parquet 时才导入 pyarrow
+        raise SystemExit(f"错误: 读写 Parquet 文件需要安装 pyarrow（{exc}）")
+    except (OSError, ValueError) as exc:
+        raise SystemExit(f"错误: {exc}")
+    if not args.quiet:
+        elapsed = time.perf_counter() - start
+        print(f"完成: 共 {n_rows:,} 行，用时 {elapsed:.1f} 秒", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,1504 @@
+# -*- coding: utf-8 -*-
+"""
+买房 vs 租房决策模型
+
+不依赖 Streamlit 的计算核心：房贷月供、逐年成本推算、摘要指标、批量与蒙特卡洛计算、
+计算缓存以及经济性/灵活性/个人因素评分。可以在批处理任务、后台工作进程或基准测试中直接导入。
+"""
+
+from collections import OrderedDict
+import hashlib
+import threading
+
+import numpy as np
+import pandas as pd
+
+
+def calculate_mortgage_payment(loan_amount, annual_rate, years):
+    """计算每月等额本息还款额"""
+    monthly_rate = annual_rate / 100 / 12
+    num_payments = years * 12
+    if monthly_rate == 0:
+        return loan_amount / num_payments
+    return loan_amount * monthly_rate * (1 + monthly_rate) ** num_payments / ((1 + monthly_rate) ** num_payments - 1)
+
+def _mortgage_payment_array(loan_amount, annual_rate, years):
+    """calculate_mortgage_payment 的数组版本，参数可按 NumPy 规则广播"""
+    monthly_rate = np.asarray(annual_rate) / 100 / 12
+    num_payments = np.asarray(years) * 12
+    safe_rate = np.where(monthly_rate == 0, 1.0, monthly_rate)
+    compound = (1 + safe_rate) ** num_payments
+    return np.where(monthly_rate == 0,
+                    loan_amount / num_payments,
+                    loan_amount * safe_rate * compound / (compound - 1))
+
+# 还款方式：等额本息、等额本金
+REPAYMENT_METHODS = {
+    'equal_installment': '等额本息',
+    'equal_principal': '等额本金',
+}
+
+def _annuity_position(principal, annual_rate, years, months):
+    """等额本息贷款在第 months 个月末的 (剩余本金, 累计还款)，利率为0时退化为按月平均还本
+
+    B_k = B_0(1+r)^k - M[(1+r)^k - 1]/r，累计还款 M·k
+    """
+    monthly_rate = np.asarray(annual_rate) / 100 / 12
+    num_payments = np.asarray(years) * 12
+    k = np.minimum(months, num_payments)
+    payment = _mortgage_payment_array(principal, annual_rate, years)
+    safe_rate = np.where(monthly_rate == 0, 1.0, monthly_rate)
+    compound = (1 + safe_rate) ** k
+    balance = np.where(
+        monthly_rate == 0,
+        principal * (1 - k / num_payments),
+        principal * compound - payment * (compound - 1) / safe_rate,
+    )
+    return balance, payment * k
+
+def _equal_principal_position(principal, annual_rate, years, months):
+    """等额本金贷款在第 months 个月末的 (剩余本金, 累计还款)
+
+    B_k = B_0(1 - k/n)，累计利息 r·B_0·[k - k(k-1)/(2n)]
+    """
+    monthly_rate = np.asarray(annual_rate) / 100 / 12
+    num_payments = np.asarray(years) * 12
+    k = np.minimum(months, num_payments)
+    balance = principal * (1 - k / num_payments)
+    paid = principal * k / num_payments + monthly_rate * principal * (k - k * (k - 1) / (2 * num_payments))
+    return balance, paid
+
+def _annuity_first_payment(principal, annual_rate, years):
+    return (_mortgage_payment_array(principal, annual_rate, years),)
+
+def _equal_principal_first_payment(principal, annual_rate, years):
+    return (principal / (np.asarray(years) * 12) + np.asarray(annual_rate) / 100 / 12 * principal,)
+
+def _scenario_rows(mask, shape):
+    """把标量或形如 (N, 1, ...) 的情景掩码整理为长度 N 的布尔数组；掩码沿其他维度变化时返回 None"""
+    mask = np.asarray(mask, dtype=bool)
+    if mask.ndim == 0:
+        return np.full(shape[0], bool(mask))
+    if mask.ndim != len(shape) or mask.size != mask.shape[0]:
+        return None
+    rows = mask.reshape(-1)
+    return rows if len(rows) == shape[0] else np.full(shape[0], rows[0])
+
+def _by_repayment_method(args, equal_principal, annuity, linear, n_outputs):
+    """按还款方式分别计算 annuity(*args) 或 linear(*args)，args[0] 为本金，返回 n_outputs 个数组的元组
+
+    单组参数只计算对应的一种公式；批量时按情景（第一维）分组，每组只计算自己的公式，本金为0的情景
+    （如未启用公积金贷款）不计算，结果为0。
+    """
+    shape = np.broadcast_shapes(*(np.shape(arg) for arg in args), np.shape(equal_principal))
+    principal = args[0]
+    equal_principal = np.asarray(equal_principal)
+    active = np.asarray(principal) != 0
+    if equal_principal.ndim == 0 and active.ndim == 0:
+        if not active:
+            return tuple(np.zeros(shape) for _ in range(n_outputs))
+        return (linear if equal_principal else annuity)(*args)
+
+    linear_rows = _scenario_rows(equal_principal, shape)
+    active_rows = _scenario_rows(active, shape)
+    if linear_rows is None or active_rows is None:
+        # 掩码不按情景划分时，两种公式都计算后逐元素选取
+        return tuple(np.where(equal_principal, linear_value, annuity_value)
+                     for linear_value, annuity_value in zip(linear(*args), annuity(*args)))
+    if active_rows.all() and (linear_rows.all() or not linear_rows.any()):
+        # 所有情景使用同一种还款方式时不需要分组
+        return (linear if linear_rows[0] else annuity)(*args)
+
+    n = shape[0]
+    parts = []
+    for rows, formula in ((active_rows & ~linear_rows, annuity), (active_rows & linear_rows, linear)):
+        if rows.any():
+            selected = [np.asarray(arg)[rows] if np.ndim(arg) == len(shape) and np.shape(arg)[0] == n else arg
+                        for arg in args]
+            parts.append((rows, formula(*selected)))
+    dtype = np.result_type(float, *(value for _, values in parts for value in values))
+    outputs = tuple(np.zeros(shape, dtype=dtype) for _ in range(n_outputs))
+    for rows, values in parts:
+        for output, value in zip(outputs, values):
+            output[rows] = value
+    return outputs
+
+def _tranche_position(principal, annual_rate, years, months, equal_principal=False):
+    """单笔贷款在第 months 个月末的 (剩余本金, 累计还款)
+
+    使用闭式解，months 可以是任意（含小数的）月数数组，各参数按 NumPy 规则广播；超过贷款期限后余额为0、累计还款不再增加。
+    """
+    balance, paid = _by_repayment_method((principal, annual_rate, years, months), equal_principal,
+                                         _annuity_position, _equal_principal_position, 2)
+    # 消除浮点误差导致的微小负余额
+    return np.maximum(balance, 0), paid
+
+def _first_payment(principal, annual_rate, years, equal_principal=False):
+    """单笔贷款的首月还款额：等额本息为固定月供，等额本金为每月偿还的本金加首月利息"""
+    return _by_repayment_method((principal, annual_rate, years), equal_principal,
+                                _annuity_first_payment, _equal_principal_first_payment, 1)[0]
+
+def amortization_schedule(principal, annual_rate, years, method='equal_installment', n_months=None):
+    """逐月还款计划
+
+    参数均可为标量或可广播的数组（例如 (N, 1) 表示 N 笔贷款），method 为 REPAYMENT_METHODS 中的键。
+    返回字典，'payment'、'interest'、'principal'、'balance' 的形状为 (..., n_months)，
+    分别为每月还款额、利息、偿还本金和月末剩余本金；n_months 默认为最长的贷款期限。
+    """
+    if n_months is None:
+        n_months = int(np.max(years)) * 12
+    months = np.arange(0, n_months + 1)
+    equal_principal = np.asarray(method) == 'equal_principal'
+    balance, paid = _tranche_position(principal, annual_rate, years, months, equal_principal)
+    balance, paid = np.broadcast_arrays(balance, paid)
+    payment = np.diff(paid, axis=-1)
+    principal_paid = -np.diff(balance, axis=-1)
+    return {
+        'month': months[1:],
+        'payment': payment,
+        'interest': payment - principal_paid,
+        'principal': principal_paid,
+        'balance': balance[..., 1:],
+    }
+
+def _split_loan(params):
+    """计算首付、总贷款额，以及公积金与商业贷款的分配（公积金贷款不超过总贷款额）"""
+    P = params['house_price']
+    dp_percent = params['down_payment_percent'] / 100
+    down_payment = P * dp_percent
+    total_loan_amount = P * (1 - dp_percent)
+    
+    use_housing_fund = params.get('use_housing_fund', False)
+    housing_fund_amount = params.get('housing_fund_amount', 0)
+    use_fund = np.logical_and(use_housing_fund, np.greater(housing_fund_amount, 0))
+    housing_fund_amount = np.where(use_fund, np.minimum(housing_fund_amount, total_loan_amount), 0)
+    commercial_loan_amount = total_loan_amount - housing_fund_amount
+    return down_payment, total_loan_amount, housing_fund_amount, commercial_loan_amount
+
+def _loan_position(params, months):
+    """公积金与商业贷款在第 months 个月末的剩余本金和累计还款（不含首付），以及各自的首月还款额"""
+    _, _, housing_fund_amount, commercial_loan_amount = _split_loan(params)
+    n_loan = params['loan_years']
+    equal_principal = np.asarray(params.get('repayment_method', 'equal_installment')) == 'equal_principal'
+    
+    tranches = {
+        'housing_fund': (housing_fund_amount, params.get('housing_fund_rate', 0)),
+        'commercial': (commercial_loan_amount, params['loan_rate']),
+    }
+    position = {}
+    for name, (amount, rate) in tranches.items():
+        balance, paid = _tranche_position(amount, rate, n_loan, months, equal_principal)
+        first_payment = _first_payment(amount, rate, n_loan, equal_principal)
+        position[name] = {'balance': balance, 'paid': paid, 'first_payment': first_payment}
+    
+    position['balance'] = position['housing_fund']['balance'] + position['commercial']['balance']
+    position['paid'] = position['housing_fund']['paid'] + position['commercial']['paid']
+    return position
+
+def calculate_loan_schedule(params, n_months=None):
+    """按参数计算公积金贷款与商业贷款的逐月还款计划，返回以月份为索引的 DataFrame"""
+    _, _, housing_fund_amount, commercial_loan_amount = _split_loan(params)
+    method = params.get('repayment_method', 'equal_installment')
+    n_months = n_months or int(params['loan_years']) * 12
+    
+    housing_fund = amortization_schedule(housing_fund_amount, params.get('housing_fund_rate', 0),
+                                         params['loan_years'], method, n_months)
+    commercial = amortization_schedule(commercial_loan_amount, params['loan_rate'],
+                                       params['loan_years'], method, n_months)
+    return pd.DataFrame({
+        '公积金月供': housing_fund['payment'],
+        '公积金利息': housing_fund['interest'],
+        '公积金剩余本金': housing_fund['balance'],
+        '商业贷款月供': commercial['payment'],
+        '商业贷款利息': commercial['interest'],
+        '商业贷款剩余本金': commercial['balance'],
+        '合计月供': housing_fund['payment'] + commercial['payment'],
+        '合计利息': housing_fund['interest'] + commercial['interest'],
+        '合计剩余本金': housing_fund['balance'] + commercial['balance'],
+    }, index=pd.Index(commercial['month'], name='月份'))
+
+def _compound_index(rate, years, path=False):
+    """复利增长指数，返回 (期末指数, 所在年份的年初指数, 年初指数的累计值)
+
+    years 为任意形状的时间数组（年，可含小数）。rate 为常数增长率时按幂次计算；path 为 True 时 rate 是
+    形如 (N, T) 的逐年增长率路径，年内按该年的增长率复利，跨年按累乘计算。
+    年初指数的累计值为按年阶梯上调的金额（如租金、按年初房价计征的房产税）从0累计到 years 时的倍数，
+    整年部分为各年年初指数之和，当年已过的部分按比例计入。
+    """
+    years = np.asarray(years)
+    # 所在的年份（从0开始，第0年含时间起点）以及在该年内已经过的时间（只按实部取整，以支持复数步长求导）
+    year_index = np.maximum(np.ceil(np.real(years) - 1e-9).astype(int) - 1, 0)
+    elapsed = years - year_index
+    if not path:
+        growth = 1 + np.asarray(rate)
+        start_index = growth ** year_index
+        # 增长率为0时等比数列求和退化为 Y + g·Y(Y-1)/2（一阶展开，保留对增长率的导数）
+        zero_rate = np.real(growth) == 1
+        safe_rate = np.where(zero_rate, 1.0, growth - 1)
+        full_years = np.where(zero_rate, year_index + (growth - 1) * year_index * (year_index - 1) / 2,
+                              np.expm1(year_index * np.log1p(safe_rate)) / safe_rate)
+        return growth ** years, start_index, full_years + elapsed * start_index
+    growth = 1 + rate
+    year_start = np.concatenate([np.ones_like(growth[..., :1]), np.cumprod(growth[..., :-1], axis=-1)], axis=-1)
+    cumulative_start = np.concatenate([np.zeros_like(year_start[..., :1]), np.cumsum(year_start, axis=-1)], axis=-1)
+    if years.ndim < 2:
+        def pick(values):
+            return values[..., year_index]
+    else:
+        # 形如 (N, k) 的逐情景时间点：每条路径只取自己的时间点
+        def pick(values):
+            return np.take_along_axis(values, np.broadcast_to(year_index, (len(values), year_index.shape[-1])), axis=-1)
+    start_index = pick(year_start)
+    return start_index * pick(growth) ** elapsed, start_index, pick(cumulative_start) + elapsed * start_index
+
+# 可以按逐年路径给出的随机参数
+RATE_PATH_PARAMS = ('house_price_growth', 'rent_growth', 'investment_return')
+
+def _project_buy_vs_rent(params, years, rate_paths=None):
+    """按时间推算买房与租房的各项成本（连续时间的闭式解）
+
+    params 中的每个值可以是标量，也可以是形如 (N, 1) 的数组；years 为时间数组（年，可含小数），
+    逐年计算时为 (T,) 的 1, 2, ...，也可以是形如 (N, 1) 的逐情景时间点。租金在每个租约周年日上涨，
+    房产税按年初房产价值计征，持有成本与租金在年内按时间均匀累计；房产价值与投资收益连续复利。
+    rate_paths 可选，键为 RATE_PATH_PARAMS 中的参数名，值为形如 (N, 年数) 的逐年增长率（百分比），
+    给出时替代 params 中对应的常数增长率。
+    返回的数据形状与参数和 years 广播后的形状一致。
+    """
+    rate_paths = rate_paths or {}
+    
+    # 解析参数
+    P = params['house_price']
+    rent = params['monthly_rent']
+    g_rent = rate_paths.get('rent_growth', params['rent_growth']) / 100
+    r_inv = rate_paths.get('investment_return', params['investment_return']) / 100
+    fee = params['property_fee']
+    area = params['property_area']
+    tax = params['property_tax'] / 100
+    maint = params['maintenance_fund']
+    g_home = rate_paths.get('house_price_growth', params['house_price_growth']) / 100
+    inflation = params['inflation_rate'] / 100
+    use_real = params['use_real_returns']
+    
+    # 计算实际利率（如果启用）
+    r_inv_real = np.where(use_real, (1 + r_inv) / (1 + inflation) - 1, r_inv)
+    
+    # 首付与贷款分配
+    down_payment, total_loan_amount, housing_fund_amount, commercial_loan_amount = _split_loan(params)
+    
+    # 公积金与商业贷款按各自利率分别摊还，取各时间点的剩余本金和累计还款
+    loan = _loan_position(params, 12 * years)
+    housing_fund_monthly_payment = loan['housing_fund']['first_payment']
+    commercial_monthly_payment = loan['commercial']['first_payment']
+    monthly_payment = housing_fund_monthly_payment + commercial_monthly_payment
+    
+    # 累计支付（首付 + 累计还款，贷款还清后不再增加）
+    total_payments = down_payment + loan['paid']
+    remaining_principal = loan['balance']
+    
+    # 房产价值：年初价值用于计算房产税，年末价值用于计算房产净值
+    home_index, home_start_index, home_accumulated = _compound_index(g_home, years, 'house_price_growth' in rate_paths)
+    property_values = P * home_index
+    start_property_values = P * home_start_index
+    
+    # 房屋持有成本（累计）
+    annual_property_fee = fee * area * 12
+    annual_holding_costs = (annual_property_fee + maint) * years + P * home_accumulated * tax
+    
+    # 买房总成本
+    buy_total_costs = total_payments + annual_holding_costs
+    
+    # 租房成本计算（租金在每个租约周年日按年增长率上调后累计）
+    _, _, rent_accumulated = _compound_index(g_rent, years, 'rent_growth' in rate_paths)
+    rent_costs = rent * 12 * rent_accumulated
+    
+    # 首付投资收益
+    investment_index, _, _ = _compound_index(r_inv_real, years, 'investment_return' in rate_paths)
+    investment_value = down_payment * investment_index
+    
+    # 投资机会成本（买房的隐性成本）
+    opportunity_cost = investment_value - down_payment
+    
+    # 房产净值（扣除贷款剩余）
+    property_equity = property_values - remaining_principal
+    
+    return {
+        'down_payment': down_payment,
+        'total_loan_amount': total_loan_amount,
+        'housing_fund_amount': housing_fund_amount,
+        'commercial_loan_amount': commercial_loan_amount,
+        'housing_fund_monthly_payment': housing_fund_monthly_payment,
+        'commercial_monthly_payment': commercial_monthly_payment,
+        'monthly_payment': monthly_payment,
+        'annual_property_fee': annual_property_fee,
+        'start_property_values': start_property_values,
+        'property_values': property_values,
+        'total_payments': total_payments,
+        'remaining_principal': remaining_principal,
+        'annual_holding_costs': annual_holding_costs,
+        'buy_total_costs': buy_total_costs,
+        'rent_costs': rent_costs,
+        'investment_value': investment_value,
+        'opportunity_cost': opportunity_cost,
+        'property_equity': property_equity,
+        # 有效买房成本（考虑房产增值为负成本）
+        'effective_buy_costs': buy_total_costs - (property_equity - down_payment),
+        # 有效租房成本（考虑投资收益为负成本）
+        'effective_rent_costs': rent_costs - opportunity_cost,
+    }
+
+# 计算精度：收支平衡求解时每年的扫描点数
+RESOLUTION_STEPS = {
+    'yearly': 1,
+    'monthly': 12,
+}
+
+# 逐年数据的列：推算结果中的键 -> results 的列名
+RESULT_COLUMNS = {
+    'buy_total_costs': '买房累计支出',
+    'rent_costs': '租房累计支出',
+    'opportunity_cost': '买房机会成本',
+    'property_equity': '房产净值',
+    'effective_buy_costs': '有效买房成本',
+    'effective_rent_costs': '有效租房成本',
+    'cost_difference': '成本差额(租-买)',
+}
+
+def _result_columns(proj):
+    """从推算结果中按 RESULT_COLUMNS 的顺序取出逐年数据的各列，返回 {键: 数组}"""
+    columns = {key: proj[key] for key in RESULT_COLUMNS if key in proj}
+    columns['cost_difference'] = proj['effective_rent_costs'] - proj['effective_buy_costs']
+    return columns
+
+def calculate_buy_vs_rent(params, resolution='yearly', horizon=None):
+    """计算买房与租房的成本对比
+
+    results 为逐年数据。summary 中 break_even_year 为收支平衡时间（年，含小数），由 solve_break_even_batch 求得，
+    在 horizon（默认为计划居住年限）年内无平衡点时为 None；评分和建议都以居住期内的平衡点为准，
+    需要展示居住期之后的平衡点时另行调用 solve_break_even(params, BREAK_EVEN_HORIZON)。
+    break_even_month 为发生收支平衡的月份。resolution 为 'monthly' 时按月扫描寻找收支平衡区间，
+    可以发现年内出现又消失的短暂交叉。只需要 summary 时使用 calculate_summary，不构建逐年数据。
+    """
+    # 年份序列，所有逐年数据均以整列数组一次性计算
+    years = np.arange(1, params['living_years'] + 1)
+    proj = _project_buy_vs_rent(params, years)
+    
+    # 整合结果
+    columns = _result_columns(proj)
+    results = pd.DataFrame({RESULT_COLUMNS[key]: value for key, value in columns.items()}, index=years)
+    
+    # 摘要直接取最后一年的推算值，不再单独推算；按年求解居住期内的平衡点时，逐年差额就是扫描结果
+    final = {key: value[-1:] if np.ndim(value) else np.full(1, value) for key, value in proj.items()}
+    scan = None
+    if horizon is None and RESOLUTION_STEPS[resolution] == 1:
+        scan = columns['cost_difference'][None, :]
+    return results, _summary_dict(params, resolution, horizon, final, scan)
+
+# calculate_buy_vs_rent_batch 的可选参数及其默认值，其余参数必须提供
+BATCH_OPTIONAL_PARAMS = {
+    'use_housing_fund': False,
+    'housing_fund_amount': 0,
+    'housing_fund_rate': 0,
+    'repayment_method': 'equal_installment',
+}
+
+# 只在启用公积金贷款时才影响结果的参数
+HOUSING_FUND_PARAMS = ('housing_fund_amount', 'housing_fund_rate')
+
+BATCH_REQUIRED_PARAMS = (
+    'house_price', 'down_payment_percent', 'loan_years', 'loan_rate',
+    'monthly_rent', 'rent_growth', 'investment_return', 'property_fee',
+    'property_area', 'property_tax', 'maintenance_fund', 'living_years',
+    'house_price_growth', 'inflation_rate', 'use_real_returns',
+)
+
+def _batch_columns(param_table):
+    """把列式参数（字典或DataFrame）整理为形如 (N, 1) 的数组，标量列会被广播"""
+    columns = {}
+    for key in BATCH_REQUIRED_PARAMS:
+        columns[key] = np.asarray(param_table[key])
+    for key, default in BATCH_OPTIONAL_PARAMS.items():
+        columns[key] = np.asarray(param_table[key] if key in param_table else default)
+    
+    n = max((col.shape[0] for col in columns.values() if col.ndim > 0), default=1)
+    return {key: col.reshape(n, 1) if col.size == n else np.broadcast_to(col, (n,)).reshape(n, 1)
+            for key, col in columns.items()}, n
+
+def calculate_buy_vs_rent_batch(param_table, n_years=None):
+    """批量计算多组参数的有效成本和收支平衡年限
+
+    param_table 为列式参数：键与 calculate_buy_vs_rent 的 params 相同，值为长度 N 的数组
+    或标量（对所有情景广播），也可以直接传入 DataFrame。所有情景在一次广播计算中完成。
+
+    返回字典：
+    - 'years': (T,) 年份数组，T 默认为最大的计划居住年限
+    - 'effective_buy_costs' / 'effective_rent_costs': (N, T) 有效买房/租房成本
+    - 'break_even_year': (N,) 各情景在其居住年限（且不超过 T）内的收支平衡时间（年，含小数），
+      与 calculate_buy_vs_rent 相同，不存在时为 NaN
+    """
+    columns, n = _batch_columns(param_table)
+    living_years = columns['living_years'][:, 0]
+    if n_years is None:
+        n_years = int(living_years.max())
+    years = np.arange(1, n_years + 1)
+    
+    proj = _project_buy_vs_rent(columns, years)
+    effective_buy_costs = np.broadcast_to(proj['effective_buy_costs'], (n, n_years))
+    effective_rent_costs = np.broadcast_to(proj['effective_rent_costs'], (n, n_years))
+    
+    # 只在各自的计划居住年限内求解，逐年差额就是求解器的按年扫描结果
+    horizon = np.minimum(living_years, n_years)
+    scan = (effective_rent_costs - effective_buy_costs)[:, :int(np.ceil(horizon.max()))]
+    break_even_year = solve_break_even_batch(param_table, horizon, scan=scan)
+    
+    return {
+        'years': years,
+        'effective_buy_costs': effective_buy_costs,
+        'effective_rent_costs': effective_rent_costs,
+        'break_even_year': break_even_year,
+    }
+
+# 收支平衡求解的默认时间上限（年）
+BREAK_EVEN_HORIZON = 50
+
+# 收支平衡扫描时每块的最大元素数（情景数 × 时间点数），限制中间数组的内存占用
+SCAN_BLOCK_SIZE = 2 ** 18
+
+def solve_break_even_batch(param_table, horizon=None, steps_per_year=1, tol=1e-6, scan=None, rate_paths=None):
+    """批量求解收支平衡时间（年，含小数）
+
+    有效成本差额（租-买）是时间的连续函数：先按每年 steps_per_year 个点扫描，找到差额第一次为正的区间，
+    再在区间内用割线法求根，所有情景同时迭代；没有区间的情景不再求根。param_table 的格式与
+    calculate_buy_vs_rent_batch 相同。返回 (N,) 数组，在 horizon（默认 BREAK_EVEN_HORIZON，可以是 (N,) 的
+    逐情景上限）年内没有平衡点的情景为 NaN。
+    扫描按时间分块进行，每块只计算尚未找到区间的情景，中间数组不超过 SCAN_BLOCK_SIZE 个元素，
+    内存占用与情景数成正比，不随 horizon 和扫描精度增长。scan 可选，为调用方已经推算好的各扫描点
+    （第 1/steps_per_year, 2/steps_per_year, ... 年）的差额，形如 (N, 扫描点数)，给出时不再推算扫描点。
+    rate_paths 可选，为 N 条逐年增长率路径（见 _project_buy_vs_rent），路径的年数不少于 horizon，
+    此时 param_table 可以是单组参数。
+    """
+    columns, n = _batch_columns(param_table)
+    rate_paths = rate_paths or {}
+    if rate_paths:
+        n = max(n, *(len(path) for path in rate_paths.values()))
+        columns = {key: np.broadcast_to(value, (n, 1)) for key, value in columns.items()}
+    if scan is not None and not np.any(scan > 0):
+        # 扫描点上差额均不为正，没有可求根的区间
+        return np.full(n, np.nan)
+    horizon = BREAK_EVEN_HORIZON if horizon is None else np.asarray(horizon)
+    steps = np.arange(1, int(np.ceil(np.max(horizon) * steps_per_year)) + 1) / steps_per_year
+    
+    def difference(years, rows=slice(None)):
+        proj = _project_buy_vs_rent({key: value[rows] for key, value in columns.items()}, years,
+                                    {key: path[rows] for key, path in rate_paths.items()})
+        return proj['effective_rent_costs'] - proj['effective_buy_costs']
+    
+    found = np.zeros(n, dtype=bool)
+    upper = np.full(n, steps[-1])
+    f_upper = np.full(n, np.nan)
+    f_lower = np.full(n, np.nan)
+    previous = np.full(n, np.nan)  # 各情景在上一块最后一个时间点的差额
+    remaining = np.arange(n)
+    start = 0
+    while start < len(steps) and len(remaining) > 0:
+        if scan is None:
+            block = steps[start:start + max(1, SCAN_BLOCK_SIZE // len(remaining))]
+            values = np.broadcast_to(difference(block, remaining), (len(remaining), len(block)))
+        else:
+            block = steps[start:]
+            values = np.broadcast_to(scan, (n, len(steps)))[remaining, start:]
+        crossover = values > 0
+        hit = crossover.any(axis=1)
+        first = crossover.argmax(axis=1)
+        rows = remaining[hit]
+        found[rows] = True
+        upper[rows] = block[first[hit]]
+        f_upper[rows] = values[hit, first[hit]]
+        f_lower[rows] = np.where(first[hit] > 0, values[hit, np.maximum(first[hit] - 1, 0)], previous[rows])
+        previous[remaining] = values[:, -1]
+        remaining = remaining[~hit]
+        start += len(block)
+    lower = upper - 1 / steps_per_year
+    # 第一个区间从0开始，需要补算起点的差额
+    at_origin = found & (upper == steps[0])
+    if np.any(at_origin):
+        f_lower[at_origin] = np.broadcast_to(difference(lower[:, None]), (n, 1))[at_origin, 0]
+    
+    # 区间内求根：upper 始终满足差额为正，lower 不满足。每次迭代在估计点两侧各取一点，两点间距略小于 tol
+    # （避免舍入误差使变号后的区间宽度略超过 tol），两点变号时求根结束；否则用这对点的割线斜率估计下一个点
+    # （第一次迭代用区间两端，即试位法）。斜率不为正或上一次迭代区间没有缩小一半时改取区间中点，保证收敛
+    slope = (f_upper - f_lower) / (upper - lower)
+    anchor, f_anchor = upper.copy(), f_upper.copy()
+    bisect = np.zeros(n, dtype=bool)
+    half = 0.45 * tol
+    for _ in range(100):
+        rows = np.flatnonzero(found & (upper - lower > tol))
+        if not len(rows):
+            break
+        low, high = lower[rows], upper[rows]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            secant = anchor[rows] - f_anchor[rows] / slope[rows]
+        middle = np.where((slope[rows] > 0) & ~bisect[rows], secant, (low + high) / 2)
+        middle = np.clip(middle, low + half, high - half)
+        points = middle[:, None] + np.array([-half, half])
+        values = np.broadcast_to(difference(points, rows), points.shape)
+        positive = values > 0
+        # 左点为正时 upper 移到左点，右点不为正时 lower 移到右点，两点变号时两端同时移动
+        upper[rows] = np.where(positive[:, 0], points[:, 0], np.where(positive[:, 1], points[:, 1], high))
+        lower[rows] = np.where(positive[:, 1], np.where(positive[:, 0], low, points[:, 0]), points[:, 1])
+        bisect[rows] = upper[rows] - lower[rows] > (high - low) / 2
+        with np.errstate(divide='ignore', invalid='ignore'):
+            slope[rows] = (values[:, 1] - values[:, 0]) / (points[:, 1] - points[:, 0])
+        anchor[rows], f_anchor[rows] = points[:, 0], values[:, 0]
+    
+    return np.where(found & (upper <= horizon), upper, np.nan)
+
+def solve_break_even(params, horizon=None, steps_per_year=1):
+    """单组参数的收支平衡时间（年，含小数），horizon（默认 BREAK_EVEN_HORIZON）年内没有平衡点时返回 None"""
+    break_even = float(solve_break_even_batch(params, horizon, steps_per_year)[0])
+    return None if np.isnan(break_even) else break_even
+
+# 摘要指标的字段（与 _summary_arrays 的返回顺序一致）：'f' 为浮点，'?' 为布尔
+SUMMARY_FIELDS = {
+    'break_even_year': 'f',
+    'break_even_month': 'f',
+    'price_to_rent_ratio': 'f',
+    'final_property_value': 'f',
+    'total_mortgage_payment': 'f',
+    'total_holding_cost': 'f',
+    'total_rent_cost': 'f',
+    'investment_return': 'f',
+    'loan_remaining_percent': 'f',
+    'rent_coverage_ratio': 'f',
+    'down_payment': 'f',
+    'monthly_payment': 'f',
+    'annual_property_cost': 'f',
+    'housing_fund_amount': 'f',
+    'housing_fund_monthly_payment': 'f',
+    'commercial_loan_amount': 'f',
+    'commercial_monthly_payment': 'f',
+    'total_monthly_payment': 'f',
+    'housing_fund_interest_rate': 'f',
+    'commercial_interest_rate': 'f',
+    'use_housing_fund': '?',
+}
+
+def _summary_arrays(param_table, resolution='yearly', horizon=None, final=None, scan=None):
+    """摘要指标的数组形式：只在各组参数的居住年限末推算一次，不生成逐年数据，返回 {键: (N,) 数组}
+
+    收支平衡时间只在 horizon（默认为各组参数的计划居住年限）内求解。final 可选，为调用方已经推算好的
+    居住年限末取值（{键: (N,) 数组}），给出时不再重复推算；scan 见 solve_break_even_batch。
+    """
+    columns, n = _batch_columns(param_table)
+    if horizon is None:
+        horizon = columns['living_years'][:, 0]
+    break_even_year = solve_break_even_batch(param_table, horizon, RESOLUTION_STEPS[resolution], scan=scan)
+
+    # 各组参数在各自居住年限末的取值
+    if final is None:
+        final = {key: np.broadcast_to(value, (n, 1))[:, 0]
+                 for key, value in _project_buy_vs_rent(columns, columns['living_years']).items()}
+    flat = {key: value[:, 0] for key, value in columns.items()}
+    down_payment = final['down_payment']
+    total_loan_amount = final['total_loan_amount']
+    monthly_payment = final['monthly_payment']
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        loan_remaining_percent = np.where(total_loan_amount > 0,
+                                          final['remaining_principal'] / total_loan_amount * 100, 0)
+        rent_coverage_ratio = np.where(monthly_payment > 0,
+                                       flat['monthly_rent'] / monthly_payment * 100, np.inf)
+
+    return {
+        'break_even_year': break_even_year,
+        'break_even_month': np.ceil(break_even_year * 12 - 1e-6),
+        'price_to_rent_ratio': flat['house_price'] / (flat['monthly_rent'] * 12),
+        'final_property_value': final['property_values'],
+        'total_mortgage_payment': final['total_payments'] - down_payment,
+        'total_holding_cost': final['annual_holding_costs'],
+        'total_rent_cost': final['rent_costs'],
+        'investment_return': final['investment_value'] - down_payment,
+        'loan_remaining_percent': loan_remaining_percent,
+        'rent_coverage_ratio': rent_coverage_ratio,
+        'down_payment': down_payment,
+        'monthly_payment': monthly_payment,
+        'annual_property_cost': (final['annual_property_fee'] + flat['maintenance_fund']
+                                 + final['start_property_values'] * flat['property_tax'] / 100),
+        'housing_fund_amount': final['housing_fund_amount'],
+        'housing_fund_monthly_payment': final['housing_fund_monthly_payment'],
+        'commercial_loan_amount': final['commercial_loan_amount'],
+        'commercial_monthly_payment': final['commercial_monthly_payment'],
+        'total_monthly_payment': monthly_payment,
+        'housing_fund_interest_rate': flat['housing_fund_rate'],
+        'commercial_interest_rate': flat['loan_rate'],
+        'use_housing_fund': flat['use_housing_fund'].astype(bool),
+    }
+
+def calculate_summary_batch(param_table, resolution='yearly', horizon=None, float_dtype=np.float64):
+    """批量计算多组参数的摘要指标，不生成逐年数据
+
+    param_table 的格式与 calculate_buy_vs_rent_batch 相同。返回每组参数一行的 DataFrame，列与
+    calculate_buy_vs_rent 的 summary 键相同；无法收支平衡时 break_even_year / break_even_month 为 NaN。
+    float_dtype=np.float32 时浮点列存为 float32，见 calculate_summary_records。
+    """
+    return pd.DataFrame(calculate_summary_records(param_table, resolution, horizon, float_dtype),
+                        index=param_table.index if isinstance(param_table, pd.DataFrame) else None)
+
+def calculate_summary(params, resolution='yearly', horizon=None):
+    """只计算单组参数的摘要指标，跳过逐年 DataFrame 的构建
+
+    返回值与 calculate_buy_vs_rent 的 summary 相同，适合只需要摘要的调用方（情景对比、评分等）。
+    """
+    return _summary_dict(params, resolution, horizon)
+
+def _summary_dict(params, resolution='yearly', horizon=None, final=None, scan=None):
+    """把单组参数的摘要数组整理为 summary 字典"""
+    arrays = _summary_arrays(params, resolution, horizon, final, scan)
+    return _to_summary_dict({key: value[0] for key, value in arrays.items()}, params)
+
+def _to_summary_dict(values, params=None):
+    """把一组摘要取值（数组元素或摘要记录）整理为 summary 字典（Python 原生类型，无平衡点时为 None）
+
+    给出 params 时参数类字段保留调用方传入的原值。
+    """
+    summary = {key: values[key].item() for key in SUMMARY_FIELDS}
+    if np.isnan(summary['break_even_year']):
+        summary['break_even_year'] = summary['break_even_month'] = None
+    else:
+        summary['break_even_month'] = int(summary['break_even_month'])
+    if params is not None:
+        summary['housing_fund_interest_rate'] = params.get('housing_fund_rate', 0)
+        summary['commercial_interest_rate'] = params['loan_rate']
+        summary['use_housing_fund'] = params.get('use_housing_fund', False)
+    return summary
+
+def summary_dtype(float_dtype=np.float64):
+    """摘要记录的结构化数据类型，浮点字段使用 float_dtype"""
+    return np.dtype([(key, float_dtype if kind == 'f' else kind) for key, kind in SUMMARY_FIELDS.items()])
+
+def calculate_summary_records(param_table, resolution='yearly', horizon=None, float_dtype=np.float64):
+    """批量计算摘要指标，返回紧凑的结构化数组（每组参数一条记录，字段与 summary 的键相同）
+
+    与 calculate_summary_batch 相比不构建 DataFrame、不带索引，float_dtype=np.float32 时内存减半；
+    float32 约有7位有效数字，金额在千万元量级时精确到元。适合在内存中保留大量情景的批处理任务。
+    用 pd.DataFrame(records) 得到 calculate_summary_batch 的形式，用 summary_from_record 得到单组的 summary 字典。
+    """
+    arrays = _summary_arrays(param_table, resolution, horizon)
+    records = np.empty(len(arrays['break_even_year']), dtype=summary_dtype(float_dtype))
+    for key, value in arrays.items():
+        records[key] = value
+    return records
+
+def summary_from_record(record, params=None):
+    """把一条摘要记录还原为 calculate_buy_vs_rent 的 summary 字典
+
+    float64 记录的还原是无损的；给出 params 时参数类字段与 calculate_buy_vs_rent 一样保留传入的原值。
+    """
+    return _to_summary_dict(record, params)
+
+def results_dtype(n_years, float_dtype=np.float64):
+    """逐年数据记录的结构化数据类型：居住年限和 RESULT_COLUMNS 中各列长度为 n_years 的数组"""
+    return np.dtype([('living_years', np.int32)] + [(key, float_dtype, (n_years,)) for key in RESULT_COLUMNS])
+
+def calculate_results_records(param_table, n_years=None, float_dtype=np.float64):
+    """批量计算逐年数据，返回紧凑的结构化数组（每组参数一条记录）
+
+    param_table 的格式与 calculate_buy_vs_rent_batch 相同，n_years 默认为最大的计划居住年限，
+    超出各组居住年限的年份为 NaN。按块推算，中间数组不超过 SCAN_BLOCK_SIZE 个元素。
+    用 results_from_record 得到单组的 results DataFrame。
+    """
+    columns, n = _batch_columns(param_table)
+    living_years = columns['living_years'][:, 0]
+    if n_years is None:
+        n_years = int(living_years.max())
+    years = np.arange(1, n_years + 1)
+
+    records = np.empty(n, dtype=results_dtype(n_years, float_dtype))
+    records['living_years'] = living_years
+    block = max(1, SCAN_BLOCK_SIZE // n_years)
+    for start in range(0, n, block):
+        rows = slice(start, start + block)
+        proj = _project_buy_vs_rent({key: value[rows] for key, value in columns.items()}, years)
+        beyond = years > living_years[rows, None]
+        for key, value in _result_columns(proj).items():
+            records[key][rows] = np.where(beyond, np.nan, value)
+    return records
+
+def results_from_record(record):
+    """把一条逐年数据记录还原为 calculate_buy_vs_rent 的 results DataFrame（float64 记录的还原是无损的）"""
+    living_years = int(record['living_years'])
+    years = np.arange(1, living_years + 1)
+    return pd.DataFrame({label: record[key][:living_years] for key, label in RESULT_COLUMNS.items()}, index=years)
+
+def compare_configs(configs, names=None):
+    """对比多组参数配置：一次批量计算所有配置的有效成本曲线和摘要指标
+
+    configs 为 params 字典的列表，names 为对应的名称（默认按序号命名）。返回字典：
+    - 'years': (T,) 年份数组，T 为最大的计划居住年限
+    - 'effective_buy_costs' / 'effective_rent_costs': (N, T) 有效买房/租房成本，超出各自居住年限的部分为 NaN
+    - 'summary': 每组配置一行的摘要指标 DataFrame，收支平衡时间与 calculate_buy_vs_rent 的结果一致
+    """
+    names = list(names) if names is not None else [f"配置{i + 1}" for i in range(len(configs))]
+    table = pd.DataFrame([{key: config[key] for key in MODEL_PARAM_KEYS if key in config} for config in configs])
+    # 部分配置缺少的可选参数取默认值
+    table = table.fillna({key: default for key, default in BATCH_OPTIONAL_PARAMS.items() if key in table})
+
+    batch = calculate_buy_vs_rent_batch(table)
+    years = batch['years']
+    beyond = years > table['living_years'].to_numpy()[:, None]
+    effective_buy_costs = np.where(beyond, np.nan, batch['effective_buy_costs'])
+    effective_rent_costs = np.where(beyond, np.nan, batch['effective_rent_costs'])
+
+    # 期末指标：每组配置在各自居住年限末的取值
+    columns, _ = _batch_columns(table)
+    final = _project_buy_vs_rent(columns, columns['living_years'])
+    final_buy = final['effective_buy_costs'][:, 0]
+    final_rent = final['effective_rent_costs'][:, 0]
+
+    summary = pd.DataFrame({
+        '名称': names,
+        '房价': table['house_price'].to_numpy(dtype=float),
+        '月租金': table['monthly_rent'].to_numpy(dtype=float),
+        '居住年限': table['living_years'].to_numpy(),
+        '价格租金比': (table['house_price'] / (table['monthly_rent'] * 12)).to_numpy(),
+        '首付款': np.broadcast_to(final['down_payment'], (len(table), 1))[:, 0],
+        '月供': np.broadcast_to(final['monthly_payment'], (len(table), 1))[:, 0],
+        '收支平衡年限': solve_break_even_batch(table, horizon=table['living_years'].to_numpy()),
+        '期末有效买房成本': final_buy,
+        '期末有效租房成本': final_rent,
+        '期末差额(租-买)': final_rent - final_buy,
+        '期末房产价值': final['property_values'][:, 0],
+    })
+
+    return {
+        'years': years,
+        'effective_buy_costs': effective_buy_costs,
+        'effective_rent_costs': effective_rent_costs,
+        'summary': summary,
+    }
+
+def compute_break_even_grid(params, row_key, row_values, col_key, col_values):
+    """在两个参数构成的网格上批量求解收支平衡时间（含小数），返回 (行数, 列数) 的矩阵
+
+    超过计划居住年限的情景为 NaN。
+    """
+    row_grid, col_grid = np.meshgrid(row_values, col_values, indexing='ij')
+    table = dict(params)
+    table[row_key] = row_grid.ravel()
+    table[col_key] = col_grid.ravel()
+    return solve_break_even_batch(table, horizon=params['living_years']).reshape(row_grid.shape)
+
+def compute_break_even_grid_adaptive(params, row_key, row_values, col_key, col_values):
+    """自适应细化的收支平衡年限网格
+
+    先在粗网格上批量计算，再逐层细分：只有四个角点的收支平衡年限不在同一整年内（第几年内首次平衡）的单元格
+    才会继续细分并计算中点，角点在同一整年内的单元格按角点值双线性插值填充。这样可以用远少于整网格的计算量
+    得到清晰的收支平衡分界线。计算的网格点与 compute_break_even_grid 一样求解含小数的收支平衡时间，
+    填充的网格点与精确值相差不超过1年。
+
+    返回 (矩阵, 实际计算的网格点数)，矩阵中不存在收支平衡点的位置为 NaN。
+    """
+    row_values = np.asarray(row_values, dtype=float)
+    col_values = np.asarray(col_values, dtype=float)
+    n_rows, n_cols = len(row_values), len(col_values)
+    matrix = np.full((n_rows, n_cols), np.nan)
+    known = np.zeros((n_rows, n_cols), dtype=bool)
+    filled = np.zeros((n_rows, n_cols), dtype=bool)
+    
+    def evaluate(rows, cols):
+        # 只批量计算尚未计算过的点
+        points = np.unique(np.stack([rows, cols], axis=1), axis=0)
+        rows, cols = points[:, 0], points[:, 1]
+        todo = ~known[rows, cols]
+        rows, cols = rows[todo], cols[todo]
+        if rows.size == 0:
+            return
+        table = dict(params)
+        table[row_key] = row_values[rows]
+        table[col_key] = col_values[cols]
+        matrix[rows, cols] = solve_break_even_batch(table, horizon=params['living_years'])
+        known[rows, cols] = True
+    
+    # 初始粗网格：步长取2的幂，使每个方向约有5个点
+    step = 1
+    while step * 8 <= min(n_rows, n_cols) - 1:
+        step *= 2
+    coarse_rows = np.unique(np.append(np.arange(0, n_rows, step), n_rows - 1))
+    coarse_cols = np.unique(np.append(np.arange(0, n_cols, step), n_cols - 1))
+    grid_rows, grid_cols = np.meshgrid(coarse_rows, coarse_cols, indexing='ij')
+    evaluate(grid_rows.ravel(), grid_cols.ravel())
+    
+    # 单元格以 (r0, r1, c0, c1) 的行表示，包含两端的角点
+    r0, c0 = np.meshgrid(coarse_rows[:-1], coarse_cols[:-1], indexing='ij')
+    r1, c1 = np.meshgrid(coarse_rows[1:], coarse_cols[1:], indexing='ij')
+    cells = np.stack([r0.ravel(), r1.ravel(), c0.ravel(), c1.ravel()], axis=1)
+    
+    while len(cells):
+        r0, r1, c0, c1 = cells.T
+        # 按整年分档比较角点，NaN（无收支平衡）与NaN视为一致
+        corners = np.nan_to_num(np.ceil(np.stack([matrix[r0, c0], matrix[r0, c1], matrix[r1, c0], matrix[r1, c1]])),
+                                nan=-1.0)
+        uniform = np.all(corners == corners[0], axis=0)
+        
+        # 角点一致的单元格按角点双线性插值填充（仅含角点的最小单元格无需填充）
+        for a, b, c, d in cells[uniform & ((r1 - r0 > 1) | (c1 - c0 > 1))]:
+            u = ((np.arange(a, b + 1) - a) / max(b - a, 1))[:, None]
+            v = (np.arange(c, d + 1) - c) / max(d - c, 1)
+            values = ((1 - u) * (1 - v) * matrix[a, c] + (1 - u) * v * matrix[a, d]
+                      + u * (1 - v) * matrix[b, c] + u * v * matrix[b, d])
+            block = matrix[a:b + 1, c:d + 1]
+            unknown = ~known[a:b + 1, c:d + 1]
+            block[unknown] = values[unknown]
+            filled[a:b + 1, c:d + 1] = True
+        
+        # 角点不一致且还能细分的单元格一分为四（宽度为1的方向不再细分）
+        cells = cells[~uniform & ((r1 - r0 > 1) | (c1 - c0 > 1))]
+        if not len(cells):
+            break
+        r0, r1, c0, c1 = cells.T
+        rm = np.where(r1 - r0 > 1, (r0 + r1) // 2, r1)
+        cm = np.where(c1 - c0 > 1, (c0 + c1) // 2, c1)
+        cells = np.concatenate([
+            np.stack([r0, rm, c0, cm], axis=1),
+            np.stack([r0, rm, cm, c1], axis=1),
+            np.stack([rm, r1, c0, cm], axis=1),
+            np.stack([rm, r1, cm, c1], axis=1),
+        ])
+        # 去掉宽度为0的退化单元格
+        cells = cells[(cells[:, 1] > cells[:, 0]) & (cells[:, 3] > cells[:, 2])]
+        evaluate(np.concatenate([cells[:, 0], cells[:, 0], cells[:, 1], cells[:, 1]]),
+                 np.concatenate([cells[:, 2], cells[:, 3], cells[:, 2], cells[:, 3]]))
+    
+    # 一维网格等退化情况：剩余的点直接计算
+    rest_rows, rest_cols = np.nonzero(~known & ~filled)
+    evaluate(rest_rows, rest_cols)
+    return matrix, int(known.sum())
+
+# 敏感度分析覆盖的数值参数及其中文名称
+PARAM_LABELS = {
+    'house_price': '房价',
+    'down_payment_percent': '首付比例',
+    'loan_years': '贷款年限',
+    'loan_rate': '贷款利率',
+    'monthly_rent': '月租金',
+    'rent_growth': '租金年涨幅',
+    'investment_return': '投资回报率',
+    'property_fee': '物业费',
+    'property_area': '房屋面积',
+    'property_tax': '房产税率',
+    'maintenance_fund': '年维修基金',
+    'living_years': '计划居住年限',
+    'house_price_growth': '房价年涨幅',
+    'inflation_rate': '通货膨胀率',
+    'housing_fund_amount': '公积金贷款额度',
+    'housing_fund_rate': '公积金贷款利率',
+}
+
+# 可以取负值的参数（增长率、收益率），其余数值参数不小于0
+SIGNED_PARAMS = ('rent_growth', 'investment_return', 'house_price_growth', 'inflation_rate')
+
+def _sensitivity_keys(params):
+    """参与敏感度分析的参数键，未启用公积金贷款时不包括公积金参数"""
+    return [key for key in PARAM_LABELS
+            if params.get('use_housing_fund', False) or key not in HOUSING_FUND_PARAMS]
+
+def calculate_sensitivities(params, break_even_year=None, step=1e-20):
+    """期末成本差额与收支平衡时间对各数值参数的偏导数，所有参数在一次批量计算中完成
+
+    使用复数步长法：每个参数占一行，在该参数上加虚部扰动 i·h，f(x + i·h) 的虚部除以 h 即为导数，
+    精确到机器精度（等价于前向模式自动微分）。另有一行对时间加扰动，得到成本差额对时间的导数 ∂d/∂t：
+    计划居住年限的敏感度即期末差额对时间的导数，收支平衡时间的敏感度由隐函数定理
+    dt*/dp = -(∂d/∂p)/(∂d/∂t) 得到。break_even_year 为已求得的收支平衡时间（如 summary['break_even_year']），
+    为 None 时收支平衡的敏感度为 NaN。未启用公积金贷款时不计算公积金参数。
+
+    返回以参数键为索引、按期末差额弹性绝对值降序排列的 DataFrame：
+    - '参数': 中文名称，'取值': 当前参数值
+    - '期末差额导数' / '期末差额弹性': 期末成本差额（租-买）对参数的导数，以及参数增加1%时的变化（元）
+    - '收支平衡导数' / '收支平衡弹性': 收支平衡时间的对应值（年）
+    """
+    keys = [key for key in _sensitivity_keys(params) if key != 'living_years']
+    n = len(keys)
+    
+    # 第 i 行对第 i 个参数加虚部扰动，最后一行对时间加扰动
+    table = {key: params.get(key, BATCH_OPTIONAL_PARAMS.get(key)) for key in MODEL_PARAM_KEYS}
+    for i, key in enumerate(keys):
+        column = np.full(n + 1, table[key], dtype=complex)
+        column[i] += 1j * step
+        table[key] = column
+    columns, _ = _batch_columns(table)
+    
+    living_years = params['living_years']
+    years = np.empty((n + 1, 2), dtype=complex)
+    years[:] = [living_years, break_even_year if break_even_year is not None else living_years]
+    years[n] += 1j * step
+    proj = _project_buy_vs_rent(columns, years)
+    derivative = (proj['effective_rent_costs'] - proj['effective_buy_costs']).imag / step
+    
+    # 期末差额：各参数的偏导数，居住年限的导数即期末差额对时间的导数
+    terminal = np.append(derivative[:n, 0], derivative[n, 0])
+    # 收支平衡时间：隐函数定理，居住年限不影响收支平衡时间
+    if break_even_year is None:
+        break_even = np.full(n + 1, np.nan)
+    else:
+        break_even = np.append(-derivative[:n, 1] / derivative[n, 1], 0.0)
+    
+    keys.append('living_years')
+    values = np.array([float(np.real(params.get(key, BATCH_OPTIONAL_PARAMS.get(key)))) for key in keys])
+    sensitivities = pd.DataFrame({
+        '参数': [PARAM_LABELS[key] for key in keys],
+        '取值': values,
+        '期末差额导数': terminal,
+        '期末差额弹性': terminal * values / 100,
+        '收支平衡导数': break_even,
+        '收支平衡弹性': break_even * values / 100,
+    }, index=pd.Index(keys, name='参数键'))
+    return sensitivities.iloc[np.argsort(-np.abs(sensitivities['期末差额弹性'].to_numpy()), kind='stable')]
+
+def one_at_a_time_sweep(params, relative_range=0.2, n_steps=50):
+    """单因素敏感度扫描：每次只改变一个参数，其余参数保持当前值
+
+    每个数值参数在当前值的 ±relative_range（相对变化）范围内均匀取 n_steps 个值，当前值为0时按 ±relative_range
+    个单位扫描；首付比例限制在 0~100%，SIGNED_PARAMS 以外的参数不小于0。所有扫描点在一次批量计算中完成，
+    指标为居住期末的成本差额（有效租房成本 - 有效买房成本）。
+
+    返回字典：
+    - 'summary': 以参数键为索引、按摆幅降序排列的 DataFrame，包含 '参数'、'下限'、'上限'、
+      '下限差额'、'上限差额'（扫描两端的期末差额）和 '摆幅'（扫描范围内期末差额的最大值与最小值之差）
+    - 'keys': 参数键列表，'values' / 'terminal_difference': 形如 (参数个数, n_steps) 的扫描取值与期末差额
+    - 'baseline': 当前参数下的期末差额
+    """
+    keys = _sensitivity_keys(params)
+    n_keys = len(keys)
+    base = {key: params.get(key, BATCH_OPTIONAL_PARAMS.get(key)) for key in MODEL_PARAM_KEYS}
+    
+    # 各参数的扫描取值，形如 (参数个数, n_steps)
+    center = np.array([float(base[key]) for key in keys])[:, None]
+    span = np.where(center == 0, relative_range, np.abs(center) * relative_range)
+    values = center + span * np.linspace(-1, 1, n_steps)
+    lower_bound = np.array([-np.inf if key in SIGNED_PARAMS else 0.0 for key in keys])[:, None]
+    upper_bound = np.array([100.0 if key == 'down_payment_percent' else np.inf for key in keys])[:, None]
+    values = np.clip(values, lower_bound, upper_bound)
+    
+    # 第 k 段 n_steps 行只改变第 k 个参数，最后一行为当前参数
+    table = dict(base)
+    for k, key in enumerate(keys):
+        column = np.full(n_keys * n_steps + 1, float(base[key]))
+        column[k * n_steps:(k + 1) * n_steps] = values[k]
+        table[key] = column
+    columns, _ = _batch_columns(table)
+    proj = _project_buy_vs_rent(columns, columns['living_years'])
+    difference = (proj['effective_rent_costs'] - proj['effective_buy_costs'])[:, 0]
+    terminal_difference = difference[:-1].reshape(n_keys, n_steps)
+    
+    summary = pd.DataFrame({
+        '参数': [PARAM_LABELS[key] for key in keys],
+        '下限': values[:, 0],
+        '上限': values[:, -1],
+        '下限差额': terminal_difference[:, 0],
+        '上限差额': terminal_difference[:, -1],
+        '摆幅': terminal_difference.max(axis=1) - terminal_difference.min(axis=1),
+    }, index=pd.Index(keys, name='参数键'))
+    return {
+        'summary': summary.sort_values('摆幅', ascending=False, kind='stable'),
+        'keys': keys,
+        'values': values,
+        'terminal_difference': terminal_difference,
+        'baseline': float(difference[-1]),
+    }
+
+# 提前还款后的调整方式：缩短年限（月供不变）、减少月供（期限不变）
+PREPAYMENT_MODES = {
+    'shorten': '缩短年限',
+    'reamortize': '减少月供',
+}
+
+def _shortened_term(balance, annual_rate, payment, principal_per_month, equal_principal=False):
+    """保持原月供（等额本金为原每月还本额）不变时，还清 balance 所需的月数（可含小数）"""
+    monthly_rate = np.asarray(annual_rate, dtype=float) / 100 / 12
+    safe_rate = np.where(monthly_rate == 0, 1.0, monthly_rate)
+    payment = np.maximum(payment, 1e-12)
+    ratio = np.clip(balance * safe_rate / payment, 0, 1 - 1e-12)
+    annuity_term = np.where(monthly_rate == 0, balance / payment, -np.log1p(-ratio) / np.log1p(safe_rate))
+    linear_term = balance / np.maximum(principal_per_month, 1e-12)
+    return np.where(equal_principal, linear_term, annuity_term)
+
+def prepayment_position(principal, annual_rate, years, months, equal_principal=False,
+                        prepay_month=np.inf, prepay_amount=0.0, shorten=False,
+                        refinance_month=np.inf, refinance_rate=None):
+    """含提前还款和转贷的单笔贷款在第 months 个月末的状态
+
+    贷款按事件时间分为至多三段，每段都是以段初余额、当期利率和剩余期限重新起算的贷款，逐段使用闭式解：
+    - 提前还款：第 prepay_month 个月末一次性偿还 prepay_amount（不超过当时余额）；shorten 为 True 时
+      保持月供（等额本金为每月还本额）不变、缩短期限，否则期限不变、重新计算月供；
+    - 转贷：第 refinance_month 个月末按 refinance_rate 对剩余本金在剩余期限内重新摊还。
+    不发生的事件传入 np.inf。所有参数均可按 NumPy 规则广播，例如 (N, 1) 的候选策略与 (T,) 的月份。
+    返回 (剩余本金, 累计常规还款, 实际提前还款额)，累计常规还款不含提前还款本身。
+    """
+    if refinance_rate is None:
+        refinance_rate = annual_rate
+    months = np.asarray(months, dtype=float)
+    prepay_month = np.asarray(prepay_month, dtype=float)
+    refinance_month = np.asarray(refinance_month, dtype=float)
+    prepay_first = prepay_month <= refinance_month
+    
+    # 当前段的起始月份、段初余额、利率和期限（月）
+    start = np.zeros_like(prepay_month)
+    balance = np.asarray(principal, dtype=float)
+    rate = np.asarray(annual_rate, dtype=float)
+    term = np.asarray(years, dtype=float) * 12
+    paid_before = 0.0
+    prepaid = 0.0
+    
+    position_balance, position_paid = _tranche_position(balance, rate, term / 12, months, equal_principal)
+    for event_month, is_prepay in ((np.minimum(prepay_month, refinance_month), prepay_first),
+                                   (np.maximum(prepay_month, refinance_month), ~prepay_first)):
+        # 未发生的事件不改变当前段
+        active = np.isfinite(event_month)
+        at = np.where(active, event_month, start)
+        event_balance, event_paid = _tranche_position(balance, rate, term / 12, at - start, equal_principal)
+        remaining = np.maximum(term - (at - start), 0)
+        
+        amount = np.where(active & is_prepay, np.minimum(prepay_amount, event_balance), 0)
+        new_balance = event_balance - amount
+        shortened = _shortened_term(new_balance, rate, _mortgage_payment_array(balance, rate, term / 12),
+                                    balance / term, equal_principal)
+        new_term = np.where(active & is_prepay & shorten, np.minimum(shortened, remaining), remaining)
+        new_rate = np.where(active & ~is_prepay, refinance_rate, rate)
+        
+        paid_before = paid_before + event_paid
+        start, balance, rate, term = at, new_balance, new_rate, np.maximum(new_term, 1e-9)
+        
+        segment_balance, segment_paid = _tranche_position(balance, rate, term / 12,
+                                                          np.maximum(months - start, 0), equal_principal)
+        reached = active & (months >= at)
+        prepaid = prepaid + np.where(reached, amount, 0)
+        position_balance = np.where(reached, segment_balance, position_balance)
+        position_paid = np.where(reached, paid_before + segment_paid, position_paid)
+    
+    return position_balance, position_paid, prepaid
+
+def optimize_prepayment_strategy(params, available_cash, refinance_rate=None, rate_change_year=1,
+                                 refinance_cost=0.0, prepay_fractions=None):
+    """搜索使居住期末有效买房成本最低的提前还款与转贷策略
+
+    候选策略为以下选项的全部组合，在一次广播计算中完成（通常为数千至数万个）：
+    - 提前还款：不提前还款，或在第1年至居住期末的某个年末偿还可用资金的一定比例（prepay_fractions），
+      之后缩短年限或减少月供；
+    - 转贷：给出 refinance_rate 时，可在第 rate_change_year 年起的某个年末转贷，每次支付 refinance_cost。
+    提前还款和转贷只作用于商业贷款部分，公积金贷款保持不变。提前还款资金和转贷费用按投资收益率
+    计算至居住期末的机会成本（与首付机会成本的处理一致）。
+
+    返回字典：
+    - 'strategies': 按有效买房成本升序排列的 DataFrame
+    - 'best': 最优策略（strategies 的第一行）
+    - 'baseline_effective_buy_cost' / 'effective_rent_cost': 不提前还款也不转贷时居住期末的有效买房/租房成本
+    """
+    n_live = int(params['living_years'])
+    horizon = 12 * n_live
+    if prepay_fractions is None:
+        prepay_fractions = np.linspace(0.1, 1.0, 10)
+    equal_principal = params.get('repayment_method', 'equal_installment') == 'equal_principal'
+    
+    # 候选策略：(提前还款年份, 比例, 是否缩短年限) × 转贷年份；居住期末的事件不影响结果，不列入候选。
+    # 不提前还款、不转贷的选项排在最前，成本相同时优先选择更简单的策略
+    prepay_years = np.arange(1, n_live, dtype=float)
+    prepay_grid = [a.ravel() for a in np.meshgrid(prepay_years, prepay_fractions, [True, False], indexing='ij')]
+    prepay_options = [np.insert(grid, 0, default) for grid, default in zip(prepay_grid, (np.inf, 0.0, False))]
+    refinance_options = [np.inf]
+    if refinance_rate is not None:
+        refinance_options += list(np.arange(max(int(rate_change_year), 1), n_live, dtype=float))
+    option_index, refinance_years = np.meshgrid(np.arange(len(prepay_options[0])), refinance_options, indexing='ij')
+    option_index, refinance_years = option_index.ravel(), refinance_years.ravel()
+    prepay_year, fraction, shorten = (option[option_index] for option in prepay_options)
+    
+    _, _, _, commercial_loan_amount = _split_loan(params)
+    balance, paid, prepaid = prepayment_position(
+        commercial_loan_amount, params['loan_rate'], params['loan_years'], horizon, equal_principal,
+        prepay_month=prepay_year * 12, prepay_amount=fraction * available_cash, shorten=shorten,
+        refinance_month=refinance_years * 12, refinance_rate=refinance_rate,
+    )
+    base_balance, base_paid = _tranche_position(commercial_loan_amount, params['loan_rate'],
+                                                params['loan_years'], horizon, equal_principal)
+    
+    # 提前还款资金与转贷费用的机会成本，按实际投资收益率复利到居住期末
+    r_inv = params['investment_return'] / 100
+    r_inv_real = (1 + r_inv) / (1 + params['inflation_rate'] / 100) - 1 if params['use_real_returns'] else r_inv
+    refinanced = np.isfinite(refinance_years)
+    prepay_growth = (1 + r_inv_real) ** np.where(prepaid > 0, n_live - prepay_year, 0)
+    refinance_growth = (1 + r_inv_real) ** np.where(refinanced, n_live - refinance_years, 0)
+    refinance_fees = np.where(refinanced, refinance_cost, 0.0)
+    
+    # 相对基准的有效买房成本变化：多付的现金 + 机会成本 + 期末剩余本金的变化（影响房产净值）
+    cost_change = (paid - base_paid) + prepaid * prepay_growth + refinance_fees * refinance_growth \
+        + (balance - base_balance)
+    
+    proj = _project_buy_vs_rent(params, np.arange(1, n_live + 1))
+    baseline = float(proj['effective_buy_costs'][-1])
+    strategies = pd.DataFrame({
+        '提前还款年份': np.where(prepaid > 0, prepay_year, np.nan),
+        '提前还款金额': prepaid,
+        '调整方式': np.where(prepaid > 0, np.where(shorten, PREPAYMENT_MODES['shorten'], PREPAYMENT_MODES['reamortize']), '-'),
+        '转贷年份': np.where(refinanced, refinance_years, np.nan),
+        '期末剩余本金': balance + (proj['remaining_principal'][-1] - base_balance),
+        '有效买房成本': baseline + cost_change,
+        '相对基准节省': 0.0 - cost_change,  # 避免出现 -0
+    })
+    # 超过当时余额的提前还款会被截断，去掉因此重复的策略
+    strategies = strategies.drop_duplicates().sort_values('有效买房成本', kind='stable').reset_index(drop=True)
+    
+    return {
+        'strategies': strategies,
+        'best': strategies.iloc[0],
+        'baseline_effective_buy_cost': baseline,
+        'effective_rent_cost': float(proj['effective_rent_costs'][-1]),
+    }
+
+# 蒙特卡洛模拟：各市场周期阶段对房价和租金年涨幅的漂移调整（百分点）
+MARKET_CYCLE_DRIFT = {
+    1: {'house_price_growth': -2.0, 'rent_growth': -1.0},  # 萧条期
+    2: {'house_price_growth': 1.0, 'rent_growth': 0.0},    # 复苏期
+    3: {'house_price_growth': 2.0, 'rent_growth': 1.0},    # 扩张期
+    4: {'house_price_growth': -1.0, 'rent_growth': 0.5},   # 过热期
+}
+
+# 蒙特卡洛模拟的默认波动率（年化，百分点）和相关系数
+MONTE_CARLO_DEFAULTS = {
+    'volatility': {'house_price_growth': 6.0, 'rent_growth': 2.0, 'investment_return': 15.0},
+    'correlation': np.array([
+        [1.0, 0.5, 0.2],   # 房价
+        [0.5, 1.0, 0.1],   # 租金
+        [0.2, 0.1, 1.0],   # 投资回报
+    ]),
+    'cycle_advance_probability': 0.3,
+}
+
+def simulate_rate_paths(params, n_paths, n_years, market_cycle=2, volatility=None,
+                        correlation=None, cycle_advance_probability=None, rng=None):
+    """模拟房价涨幅、租金涨幅和投资回报率的逐年相关随机路径
+
+    每年的增长因子 (1 + g) 服从对数正态分布，其均值为参数中的常数增长率加上当年市场周期阶段的漂移。
+    市场周期从 market_cycle 开始，每年以 cycle_advance_probability 的概率进入下一阶段（过热期之后回到萧条期）。
+    返回字典，键为 RATE_PATH_PARAMS，值为形如 (n_paths, n_years) 的年增长率（百分比）。
+    """
+    volatility = {**MONTE_CARLO_DEFAULTS['volatility'], **(volatility or {})}
+    if correlation is None:
+        correlation = MONTE_CARLO_DEFAULTS['correlation']
+    if cycle_advance_probability is None:
+        cycle_advance_probability = MONTE_CARLO_DEFAULTS['cycle_advance_probability']
+    if rng is None:
+        rng = np.random.default_rng()
+    
+    # 市场周期阶段路径 (0-3)
+    advances = rng.random((n_paths, n_years)) < cycle_advance_probability
+    advances[:, 0] = False
+    stages = (market_cycle - 1 + np.cumsum(advances, axis=1)) % 4
+    
+    # 相关的标准正态冲击，形状 (3, n_paths, n_years)
+    chol = np.linalg.cholesky(np.asarray(correlation, dtype=float))
+    shocks = np.tensordot(chol, rng.standard_normal((len(RATE_PATH_PARAMS), n_paths, n_years)), axes=1)
+    
+    paths = {}
+    for k, key in enumerate(RATE_PATH_PARAMS):
+        drift = np.array([MARKET_CYCLE_DRIFT[c + 1].get(key, 0.0) for c in range(4)])
+        mean_growth = 1 + (params[key] + drift[stages]) / 100
+        sigma = volatility[key] / 100
+        # 对数正态：保证增长因子为正，且期望值等于 mean_growth
+        log_factor = np.log(np.maximum(mean_growth, 1e-6)) - 0.5 * sigma ** 2 + sigma * shocks[k]
+        paths[key] = np.expm1(log_factor) * 100
+    return paths
+
+# 蒙特卡洛模拟逐路径结果的字段
+MONTE_CARLO_PATH_FIELDS = ('break_even_year', 'terminal_difference')
+
+def simulate_monte_carlo(params, n_paths=10000, market_cycle=2, seed=42, volatility=None,
+                         correlation=None, chunk_size=20000, float_dtype=np.float64):
+    """蒙特卡洛风险模拟，返回收支平衡年限、期末净值差额的分布和买房胜出概率
+
+    期末净值差额 = 期末有效租房成本 - 期末有效买房成本，为正表示买房在居住期末更有利。
+    收支平衡年限与 calculate_buy_vs_rent 相同，为居住期内的收支平衡时间（年，含小数）。
+    路径按 chunk_size 分块计算以控制内存；相同 seed 得到完全相同的结果。
+    逐路径结果以结构化数组 'paths'（字段见 MONTE_CARLO_PATH_FIELDS）返回，'break_even_year' 和
+    'terminal_difference' 是它的字段视图。float_dtype=np.float32 时逐路径结果和计算分位数用的逐年差额
+    都以 float32 保存，内存减半。
+    """
+    rng = np.random.default_rng(seed)
+    n_years = int(params['living_years'])
+    years = np.arange(1, n_years + 1)
+    
+    paths = np.empty(n_paths, dtype=[(key, float_dtype) for key in MONTE_CARLO_PATH_FIELDS])
+    break_even = paths['break_even_year']
+    terminal_difference = paths['terminal_difference']
+    difference_paths = np.empty((n_paths, n_years), dtype=float_dtype)
+    for start in range(0, n_paths, chunk_size):
+        stop = min(start + chunk_size, n_paths)
+        rate_paths = simulate_rate_paths(params, stop - start, n_years, market_cycle=market_cycle,
+                                         volatility=volatility, correlation=correlation, rng=rng)
+        proj = _project_buy_vs_rent(params, years, rate_paths)
+        difference = proj['effective_rent_costs'] - proj['effective_buy_costs']
+        
+        # 逐年差额作为按年扫描结果，只对存在平衡点的路径求解年内的精确时间
+        break_even[start:stop] = solve_break_even_batch(params, n_years, scan=difference, rate_paths=rate_paths)
+        terminal_difference[start:stop] = difference[:, -1]
+        difference_paths[start:stop] = difference
+    
+    percentiles = (5, 25, 50, 75, 95)
+    return {
+        'years': years,
+        'paths': paths,
+        'break_even_year': break_even,
+        'terminal_difference': terminal_difference,
+        'buy_win_probability': float(np.mean(terminal_difference > 0)),
+        'break_even_probability': float(np.mean(~np.isnan(break_even))),
+        'percentiles': percentiles,
+        'difference_percentiles': np.percentile(difference_paths, percentiles, axis=0),
+    }
+
+# 模型实际读取的参数，缓存键只包含这些字段
+MODEL_PARAM_KEYS = BATCH_REQUIRED_PARAMS + tuple(BATCH_OPTIONAL_PARAMS)
+
+def canonical_params_key(params, ndigits=6):
+    """生成参数的规范化键
+
+    只保留模型读取的字段，数值统一转为四舍五入后的浮点数；未启用公积金贷款时忽略公积金金额和利率，
+    因此只改动与模型无关的参数（如个人因素）时键保持不变。
+    """
+    use_housing_fund = bool(params.get('use_housing_fund', False))
+    key = []
+    for name in MODEL_PARAM_KEYS:
+        value = params.get(name, BATCH_OPTIONAL_PARAMS.get(name))
+        if not use_housing_fund and name in HOUSING_FUND_PARAMS:
+            value = BATCH_OPTIONAL_PARAMS[name]
+        if isinstance(value, (bool, np.bool_)):
+            value = bool(value)
+        elif isinstance(value, (int, float, np.number)):
+            value = round(float(value), ndigits)
+        key.append((name, value))
+    return tuple(key)
+
+def params_hash(params):
+    """规范化参数的稳定哈希值（十六进制字符串），可用于跨进程标识同一组参数"""
+    return hashlib.sha1(repr(canonical_params_key(params)).encode('utf-8')).hexdigest()
+
+class CalculationCache:
+    """线程安全的LRU缓存，记录命中与未命中次数"""
+    
+    def __init__(self, maxsize=512):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get_or_compute(self, key, compute):
+        """返回 key 对应的缓存值，不存在时调用 compute() 计算并缓存"""
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+        
+        value = compute()
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return value
+    
+    def stats(self):
+        """返回缓存统计信息"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+            }
+    
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+# 模块级缓存：模块只导入一次，同一服务进程内的所有会话（或工作线程）共享
+_calculation_cache = CalculationCache(maxsize=512)
+
+def get_calculation_cache():
+    """返回进程内共享的计算缓存"""
+    return _calculation_cache
+
+def cached_calculate_buy_vs_rent(params, resolution='yearly'):
+    """带缓存的 calculate_buy_vs_rent，返回的对象在调用方之间共享，不应原地修改"""
+    key = ('calculate_buy_vs_rent', canonical_params_key(params), resolution)
+    return get_calculation_cache().get_or_compute(key, lambda: calculate_buy_vs_rent(params, resolution))
+
+def cached_calculate_summary(params, resolution='yearly'):
+    """带缓存的 calculate_summary，返回的字典在调用方之间共享，不应原地修改"""
+    key = ('calculate_summary', canonical_params_key(params), resolution)
+    return get_calculation_cache().get_or_compute(key, lambda: calculate_summary(params, resolution))
+
+def cached_break_even_grid(params, row_key, row_values, col_key, col_values, adaptive=False):
+    """带缓存的收支平衡年限网格，返回 (矩阵, 实际计算的网格点数)
+
+    adaptive 为 True 时使用 compute_break_even_grid_adaptive，否则计算完整网格。
+    """
+    key = ('break_even_grid', canonical_params_key(params), adaptive,
+           row_key, tuple(np.round(row_values, 6)), col_key, tuple(np.round(col_values, 6)))
+    
+    def compute():
+        if adaptive:
+            return compute_break_even_grid_adaptive(params, row_key, row_values, col_key, col_values)
+        matrix = compute_break_even_grid(params, row_key, row_values, col_key, col_values)
+        return matrix, matrix.size
+    
+    return get_calculation_cache().get_or_compute(key, compute)
+
+def calculate_economic_score(params, summary):
+    """计算长期经济性得分 (0-100)"""
+    score = 50  # 中性起点
+
+    # 价格租金比影响 (-20 到 +20)
+    pr_ratio = summary['price_to_rent_ratio']
+    if pr_ratio < 12:
+        score += 20  # 买房极其有利
+    elif pr_ratio < 15:
+        score += 15  # 买房非常有利
+    elif pr_ratio < 20:
+        score += 5   # 买房略有优势
+    elif pr_ratio > 30:
+        score -= 20  # 租房极其有利
+    elif pr_ratio > 25:
+        score -= 15  # 租房非常有利
+    elif pr_ratio > 20:
+        score -= 5   # 租房略有优势
+
+    # 收支平衡点影响 (-25 到 +25)
+    living_years = params['living_years']
+    if summary['break_even_year'] and summary['break_even_year'] <= living_years / 3:
+        score += 25  # 买房极其有利
+    elif summary['break_even_year'] and summary['break_even_year'] <= living_years / 2:
+        score += 15  # 买房非常有利
+    elif summary['break_even_year'] and summary['break_even_year'] <= living_years:
+        score += 5   # 买房略有优势
+    elif not summary['break_even_year']:
+        score -= 25  # 租房极其有利
+    else:
+        score -= 10  # 租房有一定优势
+
+    # 房价增长预期影响 (-15 到 +15)
+    g_home = params['house_price_growth']
+    if g_home > 8:
+        score += 15  # 买房极其有利
+    elif g_home > 5:
+        score += 10  # 买房非常有利
+    elif g_home > 3:
+        score += 5   # 买房略有优势
+    elif g_home < 0:
+        score -= 15  # 租房极其有利
+    elif g_home < 1:
+        score -= 10  # 租房非常有利
+    elif g_home < 3:
+        score -= 5   # 租房略有优势
+
+    # 投资回报率影响 (-15 到 +15)
+    r_inv = params['investment_return']
+    if r_inv > 10:
+        score -= 15  # 租房极其有利
+    elif r_inv > 8:
+        score -= 10  # 租房非常有利
+    elif r_inv > 6:
+        score -= 5   # 租房略有优势
+    elif r_inv < 2:
+        score += 15  # 买房极其有利
+    elif r_inv < 3:
+        score += 10  # 买房非常有利
+    elif r_inv < 4:
+        score += 5   # 买房略有优势
+
+    # 确保得分在0-100范围内
+    return max(0, min(100, score))
+
+def calculate_flexibility_score(params, summary):
+    """计算短期灵活性得分 (0-100)，高分表示更灵活"""
+    score = 50  # 中性起点
+
+    # 首付比例影响 (-20 到 +20)
+    dp_percent = params['down_payment_percent']
+    if dp_percent >= 70:
+        score += 10  # 高首付增加灵活性
+    elif dp_percent >= 50:
+        score += 5   # 较高首付略增灵活性
+    elif dp_percent <= 20:
+        score -= 20  # 极低首付大幅降低灵活性
+    elif dp_percent <= 30:
+        score -= 10  # 低首付降低灵活性
+
+    # 贷款压力影响 (-20 到 +20)
+    rent_coverage = summary['rent_coverage_ratio']
+    if rent_coverage > 150:
+        score -= 20  # 租金远高于月供，买房更灵活
+    elif rent_coverage > 120:
+        score -= 10  # 租金高于月供，买房较灵活
+    elif rent_coverage < 70:
+        score += 20  # 月供远高于租金，租房更灵活
+    elif rent_coverage < 90:
+        score += 10  # 月供高于租金，租房较灵活
+
+    # 资金占用影响 (恒定 -20 对买房)
+    score += 20  # 租房更灵活，资金不会被房产占用
+
+    # 居住年限影响
+    living_years = params['living_years']
+    if living_years <= 3:
+        score += 15  # 短期居住，租房灵活性优势明显
+    elif living_years <= 5:
+        score += 10  # 中短期居住，租房有灵活性优势
+    elif living_years >= 15:
+        score -= 15  # 长期居住，买房灵活性成本降低
+    elif living_years >= 10:
+        score -= 10  # 中长期居住，买房灵活性成本较低
+
+    # 确保得分在0-100范围内
+    return max(0, min(100, score))
+
+def calculate_personal_scores(career_stability, family_plan, mobility_need, ownership_importance):
+    """根据个人因素计算买房倾向和租房倾向得分 (0-100)"""
+    personal_buy_score = 0
+    personal_rent_score = 0
+    
+    # 职业稳定性影响
+    if career_stability >= 8:
+        personal_buy_score += 15
+    elif career_stability >= 5:
+        personal_buy_score += 5
+    else:
+        personal_rent_score += 15
+    
+    # 家庭计划影响
+    if family_plan == "扩大家庭":
+        personal_buy_score += 10
+    elif family_plan == "缩小家庭":
+        personal_rent_score += 5
+    elif family_plan == "不确定":
+        personal_rent_score += 10
+    
+    # 流动性需求影响
+    if mobility_need >= 7:
+        personal_rent_score += 15
+    elif mobility_need <= 3:
+        personal_buy_score += 15
+    
+    # 所有权重要性
+    if ownership_importance >= 8:
+        personal_buy_score += 15
+    elif ownership_importance <= 3:
+        personal_rent_score += 10
+    
+    # 归一化分数到100分制
+    max_possible_score = 40  # 根据上面规则的最大可能得分
+    personal_buy_score = (personal_buy_score / max_possible_score) * 100
+    personal_rent_score = (personal_rent_score / max_possible_score) * 100
+    return personal_buy_score, personal_rent_score
@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+"""
+买房 vs 租房页面的渲染计时
+
+按需启用的轻量计时层：记录每次运行中各页面区段和模型调用的墙钟时间，以及可选的内存分配（tracemalloc）。
+结果可以整理为 DataFrame 在调试面板中展示，也可以逐条写入结构化日志（JSON）。不依赖 Streamlit。
+
+tracemalloc 是进程级的，多个会话同时运行时内存数据会相互混入，只适合单用户排查；开启后计算会明显变慢，
+计时数据应只在同样开启内存跟踪的运行之间比较。
+"""
+
+from contextlib import contextmanager
+from functools import wraps
+import json
+import logging
+import time
+import tracemalloc
+import uuid
+
+import pandas as pd
+
+logger = logging.getLogger('rent_vs_buy.profiling')
+
+
+def configure_logging(level=logging.INFO):
+    """保证计时日志能够输出
+
+    日志没有任何处理器时添加一个写到标准错误的处理器（每行一条 JSON），日志级别未设置时设为 level；
+    应用已经自行配置了日志时不做改动。
+    """
+    if not logger.hasHandlers():
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+    if logger.level == logging.NOTSET:
+        logger.setLevel(level)
+
+
+class RenderProfiler:
+    """记录区段和函数调用的耗时与内存
+
+    区段可以用 section() 上下文管理器嵌套记录，也可以用 mark() 按页面从上到下的顺序分段：
+    每次 mark() 结束上一个分段并开始新的分段。wrap() 包装的函数每次调用记录一条 'model' 记录。
+    enabled 为 False 时所有方法都不做任何事，wrap() 直接返回原函数。finish() 之后不再记录：
+    页面片段单独重新运行时仍会调用包装过的函数，这些调用不属于已经结束的整页运行。
+    启用时调用 configure_logging()，使 log() 写出的记录能够输出。
+    """
+
+    def __init__(self, enabled=True, trace_memory=True):
+        self.enabled = enabled
+        self.trace_memory = enabled and trace_memory
+        self.run_id = uuid.uuid4().hex[:12]
+        self.records = []
+        self._origin = time.perf_counter()
+        self._stack = []
+        self._mark_depth = None
+        self._started_tracing = False
+        self._finished = False
+        if enabled:
+            configure_logging()
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    def _enter(self, name, kind):
+        current = 0
+        if self.trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            # 上层区段在进入子区段前的峰值需要保存，因为下面会重置峰值
+            if self._stack:
+                self._stack[-1]['peak'] = max(self._stack[-1]['peak'], peak)
+            tracemalloc.reset_peak()
+        self._stack.append({
+            'name': name,
+            'kind': kind,
+            'depth': len(self._stack),
+            'start': time.perf_counter(),
+            'memory_start': current,
+            'peak': current,
+        })
+
+    def _exit(self):
+        frame = self._stack.pop()
+        record = {
+            'run_id': self.run_id,
+            'name': frame['name'],
+            'kind': frame['kind'],
+            'depth': frame['depth'],
+            'start_ms': (frame['start'] - self._origin) * 1000,
+            'wall_ms': (time.perf_counter() - frame['start']) * 1000,
+        }
+        if self.trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            peak = max(peak, frame['peak'])
+            record['allocated_kb'] = (current - frame['memory_start']) / 1024
+            record['peak_kb'] = (peak - frame['memory_start']) / 1024
+            if self._stack:
+                self._stack[-1]['peak'] = max(self._stack[-1]['peak'], peak)
+        self.records.append(record)
+
+    @contextmanager
+    def section(self, name, kind='section'):
+        """记录一个代码块"""
+        if not self.enabled or self._finished:
+            yield
+            return
+        self._enter(name, kind)
+        try:
+            yield
+        finally:
+            self._exit()
+
+    def mark(self, name):
+        """结束上一个分段（如有）并开始名为 name 的新分段"""
+        if not self.enabled or self._finished:
+            return
+        if self._mark_depth is not None:
+            while len(self._stack) > self._mark_depth:
+                self._exit()
+        self._mark_depth = len(self._stack)
+        self._enter(name, 'section')
+
+    def wrap(self, func, name=None):
+        """包装函数，每次调用记录一条 'model' 记录"""
+        if not self.enabled:
+            return func
+        name = name or func.__name__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with self.section(name, kind='model'):
+                return func(*args, **kwargs)
+        return wrapper
+
+    def finish(self):
+        """结束所有未结束的分段，停止由本对象开启的内存跟踪并停止记录，返回全部记录"""
+        while self._stack:
+            self._exit()
+        self._mark_depth = None
+        self._finished = True
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        return self.records
+
+    def to_frame(self):
+        """记录整理为 DataFrame，按开始顺序排列"""
+        columns = ['run_id', 'name', 'kind', 'depth', 'start_ms', 'wall_ms']
+        if self.trace_memory:
+            columns += ['allocated_kb', 'peak_kb']
+        return pd.DataFrame(self.records, columns=columns).sort_values('start_ms', ignore_index=True)
+
+    def summary(self):
+        """按名称和类型汇总：调用次数、总耗时和最大峰值内存，按总耗时降序排列"""
+        frame = self.to_frame()
+        aggregations = {'count': ('wall_ms', 'size'), 'total_ms': ('wall_ms', 'sum'), 'max_ms': ('wall_ms', 'max')}
+        if self.trace_memory:
+            aggregations['max_peak_kb'] = ('peak_kb', 'max')
+        return (frame.groupby(['kind', 'name'], sort=False).agg(**aggregations)
+                .reset_index().sort_values('total_ms', ascending=False, ignore_index=True))
+
+    def log(self, level=logging.INFO, **context):
+        """把每条记录作为一行 JSON 写入 rent_vs_buy.profiling 日志，context 中的字段附加到每条记录"""
+        for record in self.records:
+            logger.log(level, json.dumps({**context, **record}, ensure_ascii=False))
+
+    def to_json(self, **context):
+        """所有记录导出为 JSON 字符串"""
+        return json.dumps({'run_id': self.run_id, **context, 'records': self.records}, ensure_ascii=False, indent=2)
@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+"""
+买房 vs 租房分析报告
+
+根据模型结果生成 Excel 报告。报告按参数哈希缓存，同一情景重复下载时直接复用已生成的文件内容。
+"""
+
+from io import BytesIO
+
+import pandas as pd
+
+from rent_vs_buy_model import REPAYMENT_METHODS, CalculationCache, params_hash
+
+
+def generate_excel_report(params, results, summary, scores):
+    """生成Excel格式报告，返回 xlsx 文件的字节内容
+
+    scores 为决策矩阵得分字典，包含 buy_economic、buy_flexibility、rent_economic、rent_flexibility。
+    """
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+        # 添加参数表
+        params_list = [{
+            '参数名': '房价',
+            '符号': 'P',
+            '值': f"{params['house_price']:,.0f}元",
+            '说明': '目标房产总价'
+        }, {
+            '参数名': '首付比例',
+            '符号': 'dp',
+            '值': f"{params['down_payment_percent']}%",
+            '说明': '首付款占比'
+        }, {
+            '参数名': '贷款年限',
+            '符号': 'n_loan',
+            '值': f"{params['loan_years']}年",
+            '说明': '按揭贷款期限'
+        }, {
+            '参数名': '贷款利率',
+            '符号': 'r_loan',
+            '值': f"{params['loan_rate']}%/年",
+            '说明': '商业贷款年利率'
+        }, {
+            '参数名': '还款方式',
+            '符号': 'method',
+            '值': REPAYMENT_METHODS[params.get('repayment_method', 'equal_installment')],
+            '说明': '等额本息或等额本金'
+        }, {
+            '参数名': '月租金',
+            '符号': 'rent',
+            '值': f"{params['monthly_rent']:,.0f}元/月",
+            '说明': '当前市场租金'
+        }, {
+            '参数名': '租金年涨幅',
+            '符号': 'g_rent',
+            '值': f"{params['rent_growth']}%/年",
+            '说明': '租金年均增长率'
+        }, {
+            '参数名': '投资回报率',
+            '符号': 'r_inv',
+            '值': f"{params['investment_return']}%/年",
+            '说明': '首付款替代投资年化收益'
+        }, {
+            '参数名': '物业费',
+            '符号': 'fee',
+            '值': f"{params['property_fee']}元/m²/月",
+            '说明': '物业管理费单价'
+        }, {
+            '参数名': '房产税率',
+            '符号': 'tax',
+            '值': f"{params['property_tax']}%/年",
+            '说明': '房产评估价值年税率'
+        }, {
+            '参数名': '维修基金',
+            '符号': 'maint',
+            '值': f"{params['maintenance_fund']:,.0f}元/年",
+            '说明': '年均房屋维护费用'
+        }, {
+            '参数名': '计划居住年限',
+            '符号': 'n_live',
+            '值': f"{params['living_years']}年",
+            '说明': '预计持有/租住时长'
+        }, {
+            '参数名': '房价年涨幅',
+            '符号': 'g_home',
+            '值': f"{params['house_price_growth']}%/年",
+            '说明': '预期房产年均增值率'
+        }, {
+            '参数名': '通货膨胀率',
+            '符号': 'inflation',
+            '值': f"{params['inflation_rate']}%/年",
+            '说明': '年度通货膨胀率'
+        }]
+        
+        # 添加公积金贷款参数
+        if params.get('use_housing_fund', False):
+            params_list.extend([{
+                '参数名': '公积金贷款',
+                '符号': 'HF',
+                '值': f"{params.get('housing_fund_amount', 0):,.0f}元",
+                '说明': '公积金贷款金额'
+            }, {
+                '参数名': '公积金贷款利率',
+                '符号': 'r_hf',
+                '值': f"{params.get('housing_fund_rate', 3.1)}%/年",
+                '说明': '公积金贷款年利率'
+            }])
+
+        params_df = pd.DataFrame(params_list)
+        params_df.to_excel(writer, sheet_name='参数设置', index=False)
+        
+        # 添加结果表
+        results.to_excel(writer, sheet_name='详细数据', index_label='年份')
+        
+        # 添加摘要表
+        summary_list = [{
+            '指标': '价格租金比',
+            '值': f"{summary['price_to_rent_ratio']:.1f}",
+            '说明': '房价相当于多少年的租金总和'
+        }, {
+            '指标': '收支平衡年限',
+            '值': f"{summary['break_even_year']:.1f}年" if summary['break_even_year'] else "超出计划期限",
+            '说明': '租房成本超过买房成本的时间点'
+        }, {
+            '指标': '租金覆盖率',
+            '值': f"{summary['rent_coverage_ratio']:.1f}%",
+            '说明': '月租金占月供的百分比'
+        }, {
+            '指标': '首付金额',
+            '值': f"{summary['down_payment']:,.0f}元",
+            '说明': '房价的首付款金额'
+        }, {
+            '指标': '月供',
+            '值': f"{summary['monthly_payment']:,.0f}元/月",
+            '说明': '每月按揭还款金额'
+        }, {
+            '指标': '总贷款支出',
+            '值': f"{summary['total_mortgage_payment']:,.0f}元",
+            '说明': '贷款期内所有还款总额'
+        }, {
+            '指标': '总房屋持有成本',
+            '值': f"{summary['total_holding_cost']:,.0f}元",
+            '说明': '物业费、维修费和房产税总和'
+        }, {
+            '指标': '总租金支出',
+            '值': f"{summary['total_rent_cost']:,.0f}元",
+            '说明': '租房期内所有租金总和'
+        }, {
+            '指标': '首付投资收益',
+            '值': f"{summary['investment_return']:,.0f}元",
+            '说明': '首付金额投资后的收益'
+        }, {
+            '指标': '最终房产估值',
+            '值': f"{summary['final_property_value']:,.0f}元",
+            '说明': f"{params['living_years']}年后的房产价值"
+        }, {
+            '指标': '买房经济性得分',
+            '值': f"{scores['buy_economic']:.1f}/100",
+            '说明': '买房在决策矩阵中的经济性评分'
+        }, {
+            '指标': '买房灵活性得分',
+            '值': f"{scores['buy_flexibility']:.1f}/100",
+            '说明': '买房在决策矩阵中的灵活性评分'
+        }, {
+            '指标': '租房经济性得分',
+            '值': f"{scores['rent_economic']:.1f}/100",
+            '说明': '租房在决策矩阵中的经济性评分'
+        }, {
+            '指标': '租房灵活性得分',
+            '值': f"{scores['rent_flexibility']:.1f}/100",
+            '说明': '租房在决策矩阵中的灵活性评分'
+        }]
+
+        if params.get('use_housing_fund', False):
+            summary_list.extend([{
+                '指标': '公积金贷款金额',
+                '值': f"{summary['housing_fund_amount']:,.0f}元",
+                '说明': '使用的公积金贷款金额'
+            }, {
+                '指标': '公积金贷款月供',
+                '值': f"{summary['housing_fund_monthly_payment']:,.0f}元/月",
+                '说明': '公积金贷款部分的月供'
+            }, {
+                '指标': '商业贷款金额',
+                '值': f"{summary['commercial_loan_amount']:,.0f}元",
+                '说明': '使用的商业贷款金额'
+            }, {
+                '指标': '商业贷款月供',
+                '值': f"{summary['commercial_monthly_payment']:,.0f}元/月",
+                '说明': '商业贷款部分的月供'
+            }])
+
+        summary_df = pd.DataFrame(summary_list)
+        summary_df.to_excel(writer, sheet_name='摘要指标', index=False)
+        
+        # 配置工作簿
+        workbook = writer.book
+        
+        # 格式化数字
+        number_format = workbook.add_format({'num_format': '#,##0'})
+        
+        # 设置列宽
+        worksheet = writer.sheets['详细数据']
+        worksheet.set_column('A:H', 15, number_format)
+    
+    return output.getvalue()
+
+# 已生成报告的缓存。逐年数据只由参数决定，摘要还取决于收支平衡的扫描精度（按年/按月），
+# 因此键中除参数哈希外还包含摘要和评分的取值
+_report_cache = CalculationCache(maxsize=32)
+
+def cached_excel_report(params, results, summary, scores):
+    """带缓存的 generate_excel_report，以参数哈希、摘要和评分为键"""
+    key = ('excel_report', params_hash(params), tuple(sorted(summary.items())), tuple(sorted(scores.items())))
+    return _report_cache.get_or_compute(key, lambda: generate_excel_report(params, results, summary, scores))
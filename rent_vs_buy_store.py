@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""
+买房 vs 租房参数配置存储
+
+使用标准库 sqlite3 在本地文件中持久保存参数配置。每组配置以参数哈希为主键，与计算得到的摘要一起保存；
+房价、收支平衡年限、价格租金比等关键指标单独成列并建立索引，列出、筛选和重新载入配置时无需重新计算。
+摘要取决于扫描精度，而主键只有参数哈希，因此存储中的摘要统一按 STORE_RESOLUTION 计算。
+"""
+
+from contextlib import contextmanager
+from datetime import datetime
+import json
+import os
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from rent_vs_buy_model import cached_calculate_summary, params_hash
+
+# 默认数据库文件位于本模块所在目录，与启动时的工作目录无关；可通过环境变量 RENT_VS_BUY_DB 指定
+DEFAULT_STORE_PATH = os.environ.get(
+    'RENT_VS_BUY_DB', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rent_vs_buy_configs.db'))
+
+# 存储中摘要统一使用的扫描精度
+STORE_RESOLUTION = 'yearly'
+
+# 单独成列的关键指标：列名 -> 从 (params, summary) 中取值的函数
+INDEXED_COLUMNS = {
+    'house_price': lambda params, summary: params['house_price'],
+    'monthly_rent': lambda params, summary: params['monthly_rent'],
+    'living_years': lambda params, summary: params['living_years'],
+    'break_even_year': lambda params, summary: summary['break_even_year'],
+    'price_to_rent_ratio': lambda params, summary: summary['price_to_rent_ratio'],
+    'monthly_payment': lambda params, summary: summary['monthly_payment'],
+}
+
+# 建立索引的列
+INDEXES = ('house_price', 'break_even_year', 'price_to_rent_ratio', 'created_at')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS configs (
+    params_hash TEXT PRIMARY KEY,
+    name TEXT NOT NULL DEFAULT '',
+    created_at TEXT NOT NULL,
+    params TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    house_price REAL,
+    monthly_rent REAL,
+    living_years REAL,
+    break_even_year REAL,
+    price_to_rent_ratio REAL,
+    monthly_payment REAL
+)
+"""
+
+
+def _json_default(value):
+    """把 NumPy 标量转换为 Python 原生类型以便 JSON 序列化"""
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"无法序列化的类型: {type(value).__name__}")
+
+
+def _to_json(data):
+    return json.dumps(data, ensure_ascii=False, default=_json_default)
+
+
+class ConfigStore:
+    """基于 SQLite 的参数配置存储
+
+    每次操作使用独立的连接，可以在 Streamlit 的多个会话线程之间共享同一个实例。
+    """
+
+    def __init__(self, path=DEFAULT_STORE_PATH):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(_SCHEMA)
+            for column in INDEXES:
+                conn.execute(f'CREATE INDEX IF NOT EXISTS idx_configs_{column} ON configs ({column})')
+
+    @contextmanager
+    def _connect(self):
+        """打开连接，成功时提交事务，结束后关闭连接"""
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def save(self, params, summary, name='', resolution=STORE_RESOLUTION):
+        """保存参数配置及其摘要，返回参数哈希；相同参数重复保存时更新名称和摘要，保留首次保存时间
+
+        resolution 为 summary 的扫描精度，与 STORE_RESOLUTION 不同时按 STORE_RESOLUTION 重新计算摘要，
+        保证同一参数哈希下的摘要与保存时所用的精度无关。
+        """
+        if resolution != STORE_RESOLUTION:
+            summary = cached_calculate_summary(params, STORE_RESOLUTION)
+        key = params_hash(params)
+        metrics = {column: getter(params, summary) for column, getter in INDEXED_COLUMNS.items()}
+        row = {
+            'params_hash': key,
+            'name': name,
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'params': _to_json(params),
+            'summary': _to_json(summary),
+            **{column: None if value is None else float(value) for column, value in metrics.items()},
+        }
+        columns = ', '.join(row)
+        placeholders = ', '.join(f':{column}' for column in row)
+        updates = ', '.join(f'{column} = excluded.{column}' for column in row if column not in ('params_hash', 'created_at'))
+        with self._connect() as conn:
+            conn.execute(f'INSERT INTO configs ({columns}) VALUES ({placeholders}) '
+                         f'ON CONFLICT(params_hash) DO UPDATE SET {updates}', row)
+        return key
+
+    def get(self, key):
+        """按参数哈希读取配置，返回 (params, summary)，不存在时返回 None"""
+        with self._connect() as conn:
+            row = conn.execute('SELECT params, summary FROM configs WHERE params_hash = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        return json.loads(row['params']), json.loads(row['summary'])
+
+    def get_many(self, keys):
+        """批量读取多组配置，返回 {参数哈希: (params, summary)}"""
+        keys = list(keys)
+        if not keys:
+            return {}
+        placeholders = ', '.join('?' * len(keys))
+        with self._connect() as conn:
+            rows = conn.execute(f'SELECT params_hash, params, summary FROM configs WHERE params_hash IN ({placeholders})',
+                                keys).fetchall()
+        return {row['params_hash']: (json.loads(row['params']), json.loads(row['summary'])) for row in rows}
+
+    def list_configs(self, order_by='created_at', descending=True, limit=None, ranges=None):
+        """列出已保存的配置（不含完整参数和摘要），返回以参数哈希为索引的 DataFrame
+
+        order_by 为 'name'、'created_at' 或 INDEXED_COLUMNS 中的列；ranges 为 {列名: (下限, 上限)} 的筛选条件，
+        上下限为 None 表示不限。
+        """
+        allowed = ('name', 'created_at') + tuple(INDEXED_COLUMNS)
+        if order_by not in allowed:
+            raise ValueError(f"不支持的排序列: {order_by}")
+
+        conditions, values = [], []
+        for column, (low, high) in (ranges or {}).items():
+            if column not in INDEXED_COLUMNS:
+                raise ValueError(f"不支持的筛选列: {column}")
+            if low is not None:
+                conditions.append(f'{column} >= ?')
+                values.append(low)
+            if high is not None:
+                conditions.append(f'{column} <= ?')
+                values.append(high)
+
+        query = f"SELECT params_hash, name, created_at, {', '.join(INDEXED_COLUMNS)} FROM configs"
+        if conditions:
+            query += ' WHERE ' + ' AND '.join(conditions)
+        # 无法收支平衡（NULL）的配置始终排在最后
+        query += f" ORDER BY {order_by} IS NULL, {order_by} {'DESC' if descending else 'ASC'}"
+        if limit is not None:
+            query += ' LIMIT ?'
+            values.append(int(limit))
+
+        with self._connect() as conn:
+            rows = conn.execute(query, values).fetchall()
+        columns = ['params_hash', 'name', 'created_at', *INDEXED_COLUMNS]
+        return pd.DataFrame([tuple(row) for row in rows], columns=columns).set_index('params_hash')
+
+    def delete(self, key):
+        """删除配置，返回是否存在并被删除"""
+        with self._connect() as conn:
+            return conn.execute('DELETE FROM configs WHERE params_hash = ?', (key,)).rowcount > 0
+
+    def __len__(self):
+        with self._connect() as conn:
+            return conn.execute('SELECT COUNT(*) FROM configs').fetchone()[0]
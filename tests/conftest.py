@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+"""测试共用的参数和路径设置"""
+
+import os
+import sys
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# 与页面侧边栏默认值一致的参数
+BASE_PARAMS = {
+    'house_price': 5000000,
+    'down_payment_percent': 30,
+    'loan_years': 30,
+    'loan_rate': 4.9,
+    'repayment_method': 'equal_installment',
+    'monthly_rent': 8000,
+    'rent_growth': 5.0,
+    'investment_return': 6.0,
+    'property_fee': 5,
+    'property_area': 100,
+    'property_tax': 0.5,
+    'maintenance_fund': 10000,
+    'living_years': 10,
+    'house_price_growth': 3.0,
+    'inflation_rate': 2.5,
+    'use_real_returns': True,
+    'use_housing_fund': False,
+    'housing_fund_amount': 0,
+    'housing_fund_rate': 3.1,
+}
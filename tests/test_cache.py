@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""计算缓存：LRU 淘汰与命中统计，规范化参数键和参数哈希的稳定性"""
+
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+from conftest import BASE_PARAMS, ROOT
+from rent_vs_buy_model import CalculationCache, canonical_params_key, params_hash
+
+
+def test_cache_hits_misses_and_eviction():
+    cache = CalculationCache(maxsize=2)
+    calls = []
+
+    def compute(value):
+        calls.append(value)
+        return value * 2
+
+    assert cache.get_or_compute('a', lambda: compute(1)) == 2
+    assert cache.get_or_compute('a', lambda: compute(99)) == 2
+    cache.get_or_compute('b', lambda: compute(2))
+    # 访问 a 之后 b 成为最久未使用的键，插入 c 时被淘汰
+    cache.get_or_compute('a', lambda: compute(99))
+    cache.get_or_compute('c', lambda: compute(3))
+    cache.get_or_compute('b', lambda: compute(4))
+    assert calls == [1, 2, 3, 4]
+
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['size'], stats['maxsize']) == (2, 4, 2, 2)
+    assert stats['hit_rate'] == 2 / 6
+
+    cache.clear()
+    assert cache.stats() == {'hits': 0, 'misses': 0, 'hit_rate': 0.0, 'size': 0, 'maxsize': 2}
+
+
+def test_params_key_ignores_types_and_unused_fields():
+    variants = [
+        {**BASE_PARAMS, 'house_price': 5000000.0000001},
+        {**BASE_PARAMS, 'house_price': np.int64(5000000), 'loan_rate': np.float32(4.9)},
+        {**BASE_PARAMS, 'personal_factor': '与模型无关'},
+        # 未启用公积金贷款时公积金金额和利率不影响结果
+        {**BASE_PARAMS, 'housing_fund_amount': 600000, 'housing_fund_rate': 2.85},
+        dict(reversed(list(BASE_PARAMS.items()))),
+    ]
+    expected = canonical_params_key(BASE_PARAMS)
+    for params in variants:
+        assert canonical_params_key(params) == expected
+        assert params_hash(params) == params_hash(BASE_PARAMS)
+
+
+def test_params_key_distinguishes_model_inputs():
+    changed = [
+        {**BASE_PARAMS, 'house_price': 5000001},
+        {**BASE_PARAMS, 'use_real_returns': False},
+        {**BASE_PARAMS, 'use_housing_fund': True, 'housing_fund_amount': 600000},
+        {**BASE_PARAMS, 'repayment_method': 'equal_principal'},
+    ]
+    hashes = {params_hash(params) for params in changed} | {params_hash(BASE_PARAMS)}
+    assert len(hashes) == len(changed) + 1
+
+
+def test_params_hash_is_stable_across_processes():
+    # 哈希基于规范化键的 repr，不受 PYTHONHASHSEED 影响，保存的配置可在重启后重新找到
+    code = ('import sys; sys.path.insert(0, "tests"); from conftest import BASE_PARAMS; '
+            'from rent_vs_buy_model import params_hash; print(params_hash(BASE_PARAMS))')
+    for seed in ('1', '2'):
+        output = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True,
+                                env={**os.environ, 'PYTHONHASHSEED': seed}).stdout
+        assert output.strip() == params_hash(BASE_PARAMS)
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""曲线降采样：LTTB 保留首尾与极值、点数上限、空值处理和图层类型"""
+
+import numpy as np
+import plotly.graph_objects as go
+
+from rent_vs_buy_charts import (MAX_LINE_POINTS, WEBGL_POINT_THRESHOLD, downsample_indices, lttb_indices, line_trace,
+                                multi_line_trace, percentile_band_traces, percentile_bands)
+
+
+def test_lttb_keeps_endpoints_and_extremes():
+    x = np.arange(10000, dtype=float)
+    y = np.sin(x / 500)
+    y[3333] = 50.0
+    keep = lttb_indices(x, y, 200)
+    assert len(keep) == 200
+    assert keep[0] == 0 and keep[-1] == len(x) - 1
+    assert np.all(np.diff(keep) > 0)
+    assert 3333 in keep
+
+
+def test_lttb_returns_all_points_when_short():
+    x = np.arange(10, dtype=float)
+    np.testing.assert_array_equal(lttb_indices(x, x, 20), np.arange(10))
+    np.testing.assert_array_equal(lttb_indices(x, x, 2), np.arange(10))
+
+
+def test_downsample_drops_missing_points():
+    x = np.arange(2000, dtype=float)
+    y = np.cos(x / 100)
+    y[::7] = np.nan
+    keep = downsample_indices(x, y, max_points=300)
+    assert len(keep) == 300
+    assert np.all(np.isfinite(y[keep]))
+    assert keep[0] == 1 and keep[-1] == 1999
+
+    short = np.array([1.0, np.nan, 3.0])
+    np.testing.assert_array_equal(downsample_indices(np.arange(3), short), [0, 2])
+    # max_points=None 时只丢弃空值
+    assert len(downsample_indices(x, y, max_points=None)) == np.isfinite(y).sum()
+
+
+def test_trace_sizes_and_webgl_switch():
+    x = np.arange(100000)
+    trace = line_trace(x, np.log1p(x))
+    assert isinstance(trace, go.Scatter)
+    assert len(trace.x) == MAX_LINE_POINTS
+
+    curves = np.random.default_rng(0).normal(size=(10, 1000)).cumsum(axis=1)
+    combined = multi_line_trace(np.arange(1000), curves, [f"路径{i}" for i in range(10)])
+    # 各曲线之间以一个空值断开，总点数超过阈值时使用 WebGL
+    assert len(combined.x) == 10 * (MAX_LINE_POINTS + 1)
+    assert np.isnan(combined.y).sum() == 10
+    assert len(combined.x) > WEBGL_POINT_THRESHOLD
+    assert isinstance(combined, go.Scattergl)
+
+
+def test_percentile_band_traces_share_x():
+    paths = np.random.default_rng(1).normal(size=(500, 2000)).cumsum(axis=1)
+    paths[:10, 1500:] = np.nan
+    bands = percentile_bands(paths)
+    assert bands.shape == (5, 2000)
+    assert np.all(np.diff(bands, axis=0) >= 0)
+
+    traces = percentile_band_traces(np.arange(2000), bands, '#1E88E5', name='买房')
+    assert len(traces) == 5
+    for trace in traces:
+        assert len(trace.x) == MAX_LINE_POINTS
+        np.testing.assert_array_equal(trace.x, traces[-1].x)
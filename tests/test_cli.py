@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""批量计算命令行工具：分块、并行、各格式读写与摘要列"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import BASE_PARAMS
+from rent_vs_buy_cli import SUMMARY_PREFIX, evaluate_chunk, main, run
+from rent_vs_buy_model import SUMMARY_FIELDS, calculate_summary_batch
+
+
+def scenario_table(n=25):
+    rng = np.random.default_rng(0)
+    table = pd.DataFrame({key: [value] * n for key, value in BASE_PARAMS.items()})
+    table['house_price'] = rng.uniform(2e6, 8e6, n).round()
+    table['living_years'] = rng.integers(1, 31, n)
+    table['use_housing_fund'] = [True, False] * (n // 2) + [True] * (n % 2)
+    table['housing_fund_amount'] = 6e6
+    return table
+
+
+def test_evaluate_chunk_keeps_inputs_and_prefixes_summary():
+    table = scenario_table()
+    result = evaluate_chunk(table)
+    expected = calculate_summary_batch(table)
+    pd.testing.assert_frame_equal(result[list(table)], table)
+    assert list(result.columns[len(table.columns):]) == [SUMMARY_PREFIX + key for key in SUMMARY_FIELDS]
+    # 与参数同名的摘要字段不会覆盖参数：公积金贷款额按总贷款上限截取
+    assert (result['housing_fund_amount'] == 6e6).all()
+    assert (result[SUMMARY_PREFIX + 'housing_fund_amount'] < 6e6).all()
+    np.testing.assert_allclose(result[SUMMARY_PREFIX + 'investment_return'], expected['investment_return'])
+
+
+def test_evaluate_chunk_requires_columns():
+    with pytest.raises(ValueError, match='house_price'):
+        evaluate_chunk(scenario_table().drop(columns=['house_price']))
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_chunked_run_matches_single_chunk(tmp_path, workers):
+    source = tmp_path / 'scenarios.csv'
+    scenario_table().to_csv(source, index=False)
+    single, chunked = tmp_path / 'single.csv', tmp_path / 'chunked.csv'
+    progress = []
+    assert run(str(source), str(single), chunk_size=1000) == 25
+    assert run(str(source), str(chunked), chunk_size=4, workers=workers, progress=progress.append) == 25
+    assert progress == [4, 8, 12, 16, 20, 24, 25]
+    pd.testing.assert_frame_equal(pd.read_csv(chunked), pd.read_csv(single))
+
+
+@pytest.mark.parametrize('suffix', ['.jsonl', '.parquet'])
+def test_formats_round_trip(tmp_path, suffix):
+    if suffix == '.parquet':
+        pytest.importorskip('pyarrow')
+    source, output = tmp_path / f'scenarios{suffix}', tmp_path / f'summary{suffix}'
+    table = scenario_table()
+    if suffix == '.parquet':
+        table.to_parquet(source, index=False)
+    else:
+        table.to_json(source, orient='records', lines=True)
+    assert main([str(source), '-o', str(output), '--chunk-size', '7', '--workers', '1', '--quiet']) == 0
+    written = pd.read_parquet(output) if suffix == '.parquet' else pd.read_json(output, lines=True)
+    expected = evaluate_chunk(table)
+    assert list(written.columns) == list(expected.columns)
+    np.testing.assert_allclose(written[SUMMARY_PREFIX + 'monthly_payment'], expected[SUMMARY_PREFIX + 'monthly_payment'])
+
+
+def test_float32_output(tmp_path):
+    pytest.importorskip('pyarrow')
+    source, output = tmp_path / 'scenarios.csv', tmp_path / 'summary.parquet'
+    scenario_table().to_csv(source, index=False)
+    main([str(source), '-o', str(output), '--workers', '1', '--quiet', '--float32'])
+    written = pd.read_parquet(output)
+    assert written[SUMMARY_PREFIX + 'monthly_payment'].dtype == np.float32
+    np.testing.assert_allclose(written[SUMMARY_PREFIX + 'monthly_payment'],
+                               evaluate_chunk(scenario_table())[SUMMARY_PREFIX + 'monthly_payment'], rtol=1e-6)
+
+
+def test_unknown_format_exits_with_message(tmp_path):
+    with pytest.raises(SystemExit, match='无法识别的文件格式'):
+        main([str(tmp_path / 'scenarios.txt'), '--quiet'])
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""多配置对比：与逐组计算一致，不同居住年限的曲线截断和缺省参数"""
+
+import numpy as np
+import pytest
+
+from conftest import BASE_PARAMS
+from rent_vs_buy_model import calculate_buy_vs_rent, compare_configs
+
+CONFIGS = [
+    BASE_PARAMS,
+    {**BASE_PARAMS, 'monthly_rent': 15000, 'living_years': 20},
+    {**BASE_PARAMS, 'house_price': 8000000, 'living_years': 15, 'repayment_method': 'equal_principal'},
+]
+
+
+def test_matches_single_calculations():
+    comparison = compare_configs(CONFIGS, names=['基准', '高租金', '高房价'])
+    years = comparison['years']
+    np.testing.assert_array_equal(years, np.arange(1, 21))
+    assert comparison['effective_buy_costs'].shape == (3, 20)
+
+    summary = comparison['summary']
+    assert list(summary['名称']) == ['基准', '高租金', '高房价']
+    for i, params in enumerate(CONFIGS):
+        results, expected = calculate_buy_vs_rent(params)
+        n = params['living_years']
+        np.testing.assert_allclose(comparison['effective_buy_costs'][i, :n], results['有效买房成本'], rtol=1e-9)
+        np.testing.assert_allclose(comparison['effective_rent_costs'][i, :n], results['有效租房成本'], rtol=1e-9)
+        # 超出各自居住年限的部分为空值
+        assert np.isnan(comparison['effective_buy_costs'][i, n:]).all()
+
+        row = summary.iloc[i]
+        assert row['期末差额(租-买)'] == pytest.approx(results['成本差额(租-买)'].iloc[-1], rel=1e-9)
+        assert row['月供'] == pytest.approx(expected['monthly_payment'], rel=1e-9)
+        if expected['break_even_year'] is None:
+            assert np.isnan(row['收支平衡年限'])
+        else:
+            assert row['收支平衡年限'] == pytest.approx(expected['break_even_year'], abs=1e-6)
+
+
+def test_default_names_and_missing_optional_params():
+    optional = {key: value for key, value in BASE_PARAMS.items()
+                if key not in ('use_housing_fund', 'housing_fund_amount', 'housing_fund_rate')}
+    comparison = compare_configs([optional, BASE_PARAMS])
+    summary = comparison['summary']
+    assert list(summary['名称']) == ['配置1', '配置2']
+    # 缺少的可选参数取默认值，与完整参数的结果相同
+    np.testing.assert_allclose(comparison['effective_buy_costs'][0], comparison['effective_buy_costs'][1])
+    assert summary['期末差额(租-买)'].iloc[0] == pytest.approx(summary['期末差额(租-买)'].iloc[1])
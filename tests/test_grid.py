@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+"""收支平衡年限网格：整网格与逐点求解一致，自适应网格与整网格一致且计算量更少"""
+
+import numpy as np
+import pytest
+
+from conftest import BASE_PARAMS
+from rent_vs_buy_model import compute_break_even_grid, compute_break_even_grid_adaptive, solve_break_even
+
+PARAMS = {**BASE_PARAMS, 'living_years': 20}
+PRICES = np.linspace(3000000, 8000000, 41)
+RENTS = np.linspace(6000, 20000, 41)
+
+
+def test_dense_grid_matches_pointwise_solver():
+    matrix = compute_break_even_grid(PARAMS, 'house_price', PRICES[::10], 'monthly_rent', RENTS[::10])
+    assert matrix.shape == (5, 5)
+    for i, price in enumerate(PRICES[::10]):
+        for j, rent in enumerate(RENTS[::10]):
+            expected = solve_break_even({**PARAMS, 'house_price': price, 'monthly_rent': rent}, PARAMS['living_years'])
+            if expected is None:
+                assert np.isnan(matrix[i, j])
+            else:
+                assert matrix[i, j] == pytest.approx(expected, abs=1e-6)
+
+
+def test_adaptive_grid_agrees_with_dense_grid():
+    dense = compute_break_even_grid(PARAMS, 'house_price', PRICES, 'monthly_rent', RENTS)
+    adaptive, n_evaluated = compute_break_even_grid_adaptive(PARAMS, 'house_price', PRICES, 'monthly_rent', RENTS)
+    assert adaptive.shape == dense.shape
+    assert 0 < n_evaluated < dense.size
+    # 网格同时包含能够和无法收支平衡的区域
+    assert np.isnan(dense).any() and not np.isnan(dense).all()
+    np.testing.assert_array_equal(np.isnan(adaptive), np.isnan(dense))
+    # 填充的网格点与精确值相差不超过1年
+    found = ~np.isnan(dense)
+    assert np.max(np.abs(adaptive[found] - dense[found])) < 1
@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+"""
+计算核心的回归测试：向量化实现与逐年/逐月循环的参照实现、暴力扫描以及紧凑记录的往返一致
+
+运行：python -m pytest tests
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import BASE_PARAMS
+from rent_vs_buy_model import (
+    RESULT_COLUMNS,
+    _batch_columns,
+    _project_buy_vs_rent,
+    calculate_buy_vs_rent,
+    calculate_buy_vs_rent_batch,
+    calculate_mortgage_payment,
+    calculate_results_records,
+    calculate_summary_records,
+    prepayment_position,
+    results_from_record,
+    simulate_monte_carlo,
+    simulate_rate_paths,
+    solve_break_even_batch,
+    summary_from_record,
+)
+
+
+def loop_results(params):
+    """最初的逐年循环实现（等额本息、不使用公积金贷款），作为向量化实现的参照"""
+    P = params['house_price']
+    dp_percent = params['down_payment_percent'] / 100
+    n_loan = params['loan_years']
+    r_loan = params['loan_rate'] / 100
+    rent = params['monthly_rent']
+    g_rent = params['rent_growth'] / 100
+    r_inv = params['investment_return'] / 100
+    tax = params['property_tax'] / 100
+    n_live = params['living_years']
+    g_home = params['house_price_growth'] / 100
+    if params['use_real_returns']:
+        r_inv = (1 + r_inv) / (1 + params['inflation_rate'] / 100) - 1
+
+    down_payment = P * dp_percent
+    loan_amount = P * (1 - dp_percent)
+    monthly_payment = calculate_mortgage_payment(loan_amount, r_loan * 100, n_loan)
+
+    total_payments = np.zeros(n_live)
+    remaining_principal = np.zeros(n_live)
+    remaining = loan_amount
+    for i in range(n_live):
+        total_payments[i] = (total_payments[i - 1] if i else down_payment) + monthly_payment * 12
+        if i < n_loan:
+            for _ in range(12):
+                if remaining <= 0:
+                    break
+                remaining -= monthly_payment - remaining * r_loan / 12
+        remaining_principal[i] = max(remaining, 0) if i < n_loan else 0
+
+    holding_costs = np.cumsum([params['property_fee'] * params['property_area'] * 12
+                               + P * (1 + g_home) ** i * tax + params['maintenance_fund'] for i in range(n_live)])
+    rent_costs = np.cumsum([rent * 12 * (1 + g_rent) ** i for i in range(n_live)])
+    opportunity_cost = np.array([down_payment * (1 + r_inv) ** (i + 1) for i in range(n_live)]) - down_payment
+    property_equity = np.array([P * (1 + g_home) ** (i + 1) for i in range(n_live)]) - remaining_principal
+    buy_total_costs = total_payments + holding_costs
+    effective_buy_costs = buy_total_costs - (property_equity - down_payment)
+    effective_rent_costs = rent_costs - opportunity_cost
+    return pd.DataFrame({
+        '买房累计支出': buy_total_costs,
+        '租房累计支出': rent_costs,
+        '买房机会成本': opportunity_cost,
+        '房产净值': property_equity,
+        '有效买房成本': effective_buy_costs,
+        '有效租房成本': effective_rent_costs,
+        '成本差额(租-买)': effective_rent_costs - effective_buy_costs,
+    }, index=np.arange(1, n_live + 1))
+
+
+@pytest.mark.parametrize('overrides', [
+    {},
+    {'living_years': 30},
+    {'living_years': 1, 'use_real_returns': False},
+    {'loan_years': 20, 'loan_rate': 3.2, 'rent_growth': 0.0, 'house_price_growth': -2.0},
+    {'down_payment_percent': 100, 'living_years': 15},
+])
+def test_yearly_results_match_loop(overrides):
+    params = {**BASE_PARAMS, **overrides}
+    results, _ = calculate_buy_vs_rent(params)
+    expected = loop_results(params)
+    pd.testing.assert_frame_equal(results[expected.columns], expected, check_dtype=False, check_index_type=False,
+                                  rtol=1e-9, atol=1e-3)
+
+
+def random_table(n, seed):
+    rng = np.random.default_rng(seed)
+    table = pd.DataFrame({key: [value] * n for key, value in BASE_PARAMS.items()})
+    table['house_price'] = rng.uniform(1e6, 1e7, n)
+    table['monthly_rent'] = rng.uniform(3000, 30000, n)
+    table['rent_growth'] = rng.uniform(-2, 10, n)
+    table['house_price_growth'] = rng.uniform(-3, 8, n)
+    table['loan_rate'] = rng.uniform(2, 7, n)
+    table['living_years'] = rng.integers(1, 31, n)
+    table['repayment_method'] = rng.choice(['equal_installment', 'equal_principal'], n)
+    table['use_housing_fund'] = rng.random(n) < 0.5
+    table['housing_fund_amount'] = rng.uniform(0, 1.5e6, n)
+    return table
+
+
+@pytest.mark.parametrize('steps_per_year', [1, 12])
+def test_break_even_matches_brute_force_scan(steps_per_year):
+    table = random_table(60, seed=steps_per_year)
+    horizon = table['living_years'].to_numpy()
+    solved = solve_break_even_batch(table, horizon, steps_per_year)
+
+    # 以 1/2000 年的步长逐点推算，取差额第一次为正的时间
+    step = 1 / 2000
+    years = np.arange(1, 30 * 2000 + 1) * step
+    columns, _ = _batch_columns(table)
+    proj = _project_buy_vs_rent(columns, years)
+    positive = (proj['effective_rent_costs'] - proj['effective_buy_costs'] > 0) & (years <= horizon[:, None])
+    brute = np.where(positive.any(axis=1), years[positive.argmax(axis=1)], np.nan)
+
+    assert np.isfinite(solved).any() and np.isnan(solved).any()
+    np.testing.assert_array_equal(np.isnan(solved), np.isnan(brute))
+    found = np.isfinite(brute)
+    assert np.all(np.abs(solved[found] - brute[found]) <= step)
+
+
+def test_batch_break_even_matches_single_calculation():
+    table = random_table(40, seed=3)
+    batch = calculate_buy_vs_rent_batch(table)['break_even_year']
+    for i in range(len(table)):
+        expected = calculate_buy_vs_rent(table.iloc[i].to_dict())[1]['break_even_year']
+        if expected is None:
+            assert np.isnan(batch[i])
+        else:
+            assert batch[i] == pytest.approx(expected, abs=2e-6)
+
+
+def test_monte_carlo_break_even_matches_brute_force_scan():
+    params = {**BASE_PARAMS, 'living_years': 20}
+    result = simulate_monte_carlo(params, n_paths=200, seed=11)
+    # 相同种子、单块时重新生成同样的增长率路径，逐路径以 1/1000 年的步长扫描
+    paths = simulate_rate_paths(params, 200, 20, rng=np.random.default_rng(11))
+    step = 1 / 1000
+    years = np.arange(1, 20 * 1000 + 1) * step
+    proj = _project_buy_vs_rent(params, years, paths)
+    positive = proj['effective_rent_costs'] - proj['effective_buy_costs'] > 0
+    brute = np.where(positive.any(axis=1), years[positive.argmax(axis=1)], np.nan)
+
+    break_even = result['break_even_year']
+    assert np.isfinite(break_even).any() and np.any(break_even % 1 != 0)
+    np.testing.assert_array_equal(np.isnan(break_even), np.isnan(brute))
+    found = np.isfinite(brute)
+    assert np.all(np.abs(break_even[found] - brute[found]) <= step)
+
+
+def simulate_loan(principal, annual_rate, years, months, equal_principal=False, prepay_month=None,
+                  prepay_amount=0.0, shorten=False, refinance_month=None, refinance_rate=None):
+    """逐月模拟单笔贷款，返回第 1..months 个月末的 (剩余本金, 累计常规还款, 累计提前还款)"""
+    balance, rate, term = principal, annual_rate / 1200, years * 12
+    payment = calculate_mortgage_payment(balance, annual_rate, years)
+    principal_per_month = balance / term
+    paid = prepaid = 0.0
+    history = []
+    for month in range(1, months + 1):
+        interest = balance * rate
+        repaid = min(principal_per_month if equal_principal else payment - interest, balance)
+        balance -= repaid
+        paid += repaid + interest
+        term -= 1
+        if month == prepay_month:
+            amount = min(prepay_amount, balance)
+            balance -= amount
+            prepaid += amount
+            if not shorten:
+                payment = calculate_mortgage_payment(balance, rate * 1200, term / 12)
+                principal_per_month = balance / term
+        if month == refinance_month:
+            rate = refinance_rate / 1200
+            payment = calculate_mortgage_payment(balance, refinance_rate, term / 12)
+            principal_per_month = balance / term
+        history.append((balance, paid, prepaid))
+    return np.array(history).T
+
+
+@pytest.mark.parametrize('equal_principal', [False, True])
+@pytest.mark.parametrize('events', [
+    {},
+    {'prepay_month': 36, 'prepay_amount': 500000},
+    {'prepay_month': 36, 'prepay_amount': 500000, 'shorten': True},
+    {'prepay_month': 60, 'prepay_amount': 5000000},
+    {'refinance_month': 24, 'refinance_rate': 3.5},
+    {'prepay_month': 12, 'prepay_amount': 300000, 'refinance_month': 48, 'refinance_rate': 3.0},
+    {'prepay_month': 48, 'prepay_amount': 300000, 'refinance_month': 12, 'refinance_rate': 3.0},
+])
+def test_prepayment_position_matches_monthly_simulation(equal_principal, events):
+    principal, annual_rate, years = 3500000, 4.9, 30
+    months = np.arange(1, 20 * 12 + 1)
+    expected = simulate_loan(principal, annual_rate, years, len(months), equal_principal, **events)
+    balance, paid, prepaid = prepayment_position(principal, annual_rate, years, months, equal_principal, **{
+        key: (np.inf if value is None else value) for key, value in events.items()})
+    prepaid = np.broadcast_to(prepaid, months.shape)
+    np.testing.assert_allclose(balance, expected[0], rtol=1e-9, atol=1e-4)
+    np.testing.assert_allclose(paid, expected[1], rtol=1e-9, atol=1e-4)
+    np.testing.assert_allclose(prepaid, expected[2], rtol=1e-9, atol=1e-4)
+
+
+def test_results_records_round_trip():
+    table = random_table(40, seed=7)
+    records = calculate_results_records(table)
+    summaries = calculate_summary_records(table)
+    for i in range(len(table)):
+        params = table.iloc[i].to_dict()
+        results, summary = calculate_buy_vs_rent(params)
+        restored = results_from_record(records[i])
+        pd.testing.assert_frame_equal(restored, results[list(RESULT_COLUMNS.values())], check_index_type=False,
+                                      rtol=1e-12)
+        restored_summary = summary_from_record(summaries[i], params)
+        assert restored_summary.keys() == summary.keys()
+        for key, value in summary.items():
+            if isinstance(value, float):
+                assert restored_summary[key] == pytest.approx(value, rel=1e-9, abs=1e-6), key
+            else:
+                assert restored_summary[key] == value, key
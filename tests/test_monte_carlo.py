@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""蒙特卡洛风险模拟：相同种子可复现、结果形状与取值范围"""
+
+import numpy as np
+import pytest
+
+from conftest import BASE_PARAMS
+from rent_vs_buy_model import MONTE_CARLO_PATH_FIELDS, simulate_monte_carlo
+
+PARAMS = {**BASE_PARAMS, 'monthly_rent': 15000, 'living_years': 20}
+
+
+def test_same_seed_reproduces_results():
+    first = simulate_monte_carlo(PARAMS, n_paths=500, seed=7, chunk_size=200)
+    second = simulate_monte_carlo(PARAMS, n_paths=500, seed=7, chunk_size=200)
+    for field in MONTE_CARLO_PATH_FIELDS:
+        np.testing.assert_array_equal(first['paths'][field], second['paths'][field])
+    np.testing.assert_array_equal(first['difference_percentiles'], second['difference_percentiles'])
+    assert first['buy_win_probability'] == second['buy_win_probability']
+
+    other = simulate_monte_carlo(PARAMS, n_paths=500, seed=8, chunk_size=200)
+    assert not np.array_equal(first['terminal_difference'], other['terminal_difference'])
+
+
+@pytest.mark.parametrize('float_dtype', [np.float64, np.float32])
+def test_result_shapes_and_ranges(float_dtype):
+    n_paths = 300
+    result = simulate_monte_carlo(PARAMS, n_paths=n_paths, chunk_size=128, float_dtype=float_dtype)
+    n_years = PARAMS['living_years']
+
+    np.testing.assert_array_equal(result['years'], np.arange(1, n_years + 1))
+    assert result['paths'].shape == (n_paths,)
+    assert result['paths'].dtype.names == tuple(MONTE_CARLO_PATH_FIELDS)
+    assert result['break_even_year'].dtype == float_dtype
+    # 字段视图与结构化数组共享数据
+    np.testing.assert_array_equal(result['terminal_difference'], result['paths']['terminal_difference'])
+    assert result['difference_percentiles'].shape == (len(result['percentiles']), n_years)
+    assert np.all(np.diff(result['difference_percentiles'], axis=0) >= 0)
+
+    break_even = result['break_even_year']
+    found = break_even[~np.isnan(break_even)]
+    assert found.size > 0
+    assert np.all((found >= 0) & (found <= n_years))
+    assert result['break_even_probability'] == pytest.approx(found.size / n_paths)
+    assert result['buy_win_probability'] == pytest.approx(np.mean(result['terminal_difference'] > 0))
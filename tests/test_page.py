@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""页面的无头运行测试（streamlit.testing），检查边界参数下页面能够完整渲染"""
+
+import os
+
+import pytest
+
+AppTest = pytest.importorskip('streamlit.testing.v1').AppTest
+
+from conftest import ROOT
+
+PAGE = os.path.join(ROOT, 'rent_vs_buy_calculator.py')
+
+
+def run_page(**widget_values):
+    app = AppTest.from_file(PAGE, default_timeout=120)
+    app.run()
+    for key, value in widget_values.items():
+        app.slider(key=key).set_value(value)
+    app.run()
+    return app
+
+
+def test_full_down_payment_page():
+    app = run_page(down_payment_percent=100)
+    assert not app.exception
+    metrics = {metric.label: metric for metric in app.metric}
+    assert metrics['月供'].value == '0元/月'
+    assert metrics['月供'].delta == '全款购房'
+
+
+def test_prepayment_inputs_follow_sidebar_defaults():
+    app = run_page()
+    app.slider(key='refinance_rate').set_value(3.0)
+    app.number_input(key='prepay_cash').set_value(100000)
+    app.run()
+    assert app.slider(key='refinance_rate').value == 3.0
+
+    # 未改变来源参数时保留调整过的值
+    app.slider(key='living_years').set_value(12)
+    app.run()
+    assert app.slider(key='refinance_rate').value == 3.0
+    assert app.number_input(key='prepay_cash').value == 100000
+
+    # 贷款利率和首付比例改变后回到新的默认值
+    app.slider(key='loan_rate').set_value(3.5)
+    app.slider(key='down_payment_percent').set_value(40)
+    app.run()
+    assert not app.exception
+    assert app.slider(key='refinance_rate').value == 3.5
+    # 个人总资产默认等于房价：500万 - 40%首付
+    assert app.number_input(key='prepay_cash').value == 3000000
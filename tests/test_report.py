@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""Excel 报告缓存：键包含参数哈希、摘要和评分"""
+
+import pytest
+
+from conftest import BASE_PARAMS
+import rent_vs_buy_report
+from rent_vs_buy_model import calculate_buy_vs_rent
+from rent_vs_buy_report import cached_excel_report
+
+SCORES = {'buy_economic': 60.0, 'buy_flexibility': 40.0, 'rent_economic': 55.0, 'rent_flexibility': 80.0}
+PARAMS = {**BASE_PARAMS, 'monthly_rent': 15000, 'living_years': 20}
+
+
+@pytest.fixture(autouse=True)
+def report_cache():
+    cache = rent_vs_buy_report._report_cache
+    cache.clear()
+    yield cache
+    cache.clear()
+
+
+def test_same_inputs_reuse_report(report_cache):
+    results, summary = calculate_buy_vs_rent(PARAMS)
+    report = cached_excel_report(PARAMS, results, summary, SCORES)
+    assert report[:2] == b'PK'
+    # 与模型无关的参数不影响键
+    again = cached_excel_report({**PARAMS, 'personal_factor': 1}, results, dict(summary), dict(SCORES))
+    assert again is report
+    assert report_cache.stats()['hits'] == 1
+
+
+def test_summary_and_scores_are_part_of_key(report_cache):
+    results, summary = calculate_buy_vs_rent(PARAMS)
+    monthly_results, monthly_summary = calculate_buy_vs_rent(PARAMS, 'monthly')
+    assert monthly_summary != summary
+
+    report = cached_excel_report(PARAMS, results, summary, SCORES)
+    # 参数相同、摘要（按月精度）或评分不同时重新生成报告
+    assert cached_excel_report(PARAMS, monthly_results, monthly_summary, SCORES) is not report
+    assert cached_excel_report(PARAMS, results, summary, {**SCORES, 'buy_economic': 65.0}) is not report
+    assert report_cache.stats()['misses'] == 3
+    assert report_cache.stats()['hits'] == 0
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""复数步长法敏感度：与中心差分一致，排序和公积金参数的取舍"""
+
+import numpy as np
+import pytest
+
+from conftest import BASE_PARAMS
+from rent_vs_buy_model import (HOUSING_FUND_PARAMS, calculate_buy_vs_rent, calculate_sensitivities, calculate_summary,
+                               solve_break_even)
+
+PARAMS = {**BASE_PARAMS, 'monthly_rent': 15000, 'living_years': 20}
+
+
+def terminal_difference(params):
+    results, _ = calculate_buy_vs_rent(params)
+    return results['成本差额(租-买)'].iloc[-1]
+
+
+def central_difference(f, params, key):
+    h = max(abs(params[key]), 1.0) * 1e-6
+    return (f({**params, key: params[key] + h}) - f({**params, key: params[key] - h})) / (2 * h)
+
+
+def test_matches_central_differences():
+    break_even = calculate_summary(PARAMS)['break_even_year']
+    sensitivities = calculate_sensitivities(PARAMS, break_even)
+    horizon = PARAMS['living_years']
+    for key in ('house_price', 'monthly_rent', 'loan_rate', 'investment_return', 'house_price_growth'):
+        expected = central_difference(terminal_difference, PARAMS, key)
+        assert sensitivities.loc[key, '期末差额导数'] == pytest.approx(expected, rel=1e-5), key
+        expected = central_difference(lambda params: solve_break_even(params, horizon), PARAMS, key)
+        assert sensitivities.loc[key, '收支平衡导数'] == pytest.approx(expected, rel=1e-4), key
+    assert sensitivities.loc['living_years', '收支平衡导数'] == 0
+
+
+def test_sorted_by_elasticity_and_housing_fund_keys():
+    sensitivities = calculate_sensitivities(PARAMS)
+    elasticity = np.abs(sensitivities['期末差额弹性'].to_numpy())
+    assert np.all(np.diff(elasticity) <= 0)
+    # 未给出收支平衡时间时对应列为 NaN
+    assert sensitivities['收支平衡导数'].isna().all()
+    assert not set(HOUSING_FUND_PARAMS) & set(sensitivities.index)
+
+    with_fund = calculate_sensitivities({**PARAMS, 'use_housing_fund': True, 'housing_fund_amount': 600000})
+    assert set(HOUSING_FUND_PARAMS) <= set(with_fund.index)
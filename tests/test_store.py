@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""参数配置存储：保存与重复保存、摘要精度统一、列出筛选、删除和默认路径"""
+
+import os
+
+import pytest
+
+from conftest import BASE_PARAMS, ROOT
+import rent_vs_buy_store
+from rent_vs_buy_model import calculate_summary, params_hash
+from rent_vs_buy_store import STORE_RESOLUTION, ConfigStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ConfigStore(str(tmp_path / 'configs.db'))
+
+
+@pytest.mark.skipif('RENT_VS_BUY_DB' in os.environ, reason='默认路径被环境变量覆盖')
+def test_default_path_is_relative_to_module():
+    # 与启动时的工作目录无关
+    assert rent_vs_buy_store.DEFAULT_STORE_PATH == os.path.join(ROOT, 'rent_vs_buy_configs.db')
+
+
+def test_save_get_roundtrip(store):
+    summary = calculate_summary(BASE_PARAMS)
+    key = store.save(BASE_PARAMS, summary, name='基准')
+    assert key == params_hash(BASE_PARAMS)
+    params, loaded = store.get(key)
+    assert params == BASE_PARAMS
+    assert loaded['break_even_year'] == summary['break_even_year']
+    assert store.get('missing') is None
+    assert len(store) == 1
+
+
+def test_resave_updates_name_and_keeps_created_at(store):
+    summary = calculate_summary(BASE_PARAMS)
+    key = store.save(BASE_PARAMS, summary, name='旧名称')
+    created_at = store.list_configs().loc[key, 'created_at']
+    store.save(BASE_PARAMS, summary, name='新名称')
+    listing = store.list_configs()
+    assert len(store) == 1
+    assert listing.loc[key, 'name'] == '新名称'
+    assert listing.loc[key, 'created_at'] == created_at
+
+
+def test_summary_stored_at_canonical_resolution(store):
+    # 按月精度保存时重新按 STORE_RESOLUTION 计算摘要，同一参数哈希下的摘要与保存顺序无关
+    params = {**BASE_PARAMS, 'monthly_rent': 15000, 'living_years': 20}
+    monthly = calculate_summary(params, 'monthly')
+    expected = calculate_summary(params, STORE_RESOLUTION)
+    assert monthly['break_even_year'] != expected['break_even_year']
+    key = store.save(params, monthly, resolution='monthly')
+    _, stored = store.get(key)
+    assert stored['break_even_year'] == expected['break_even_year']
+    assert store.list_configs().loc[key, 'break_even_year'] == expected['break_even_year']
+
+
+def test_list_configs_order_and_ranges(store):
+    prices = [3000000, 5000000, 8000000]
+    keys = [store.save({**BASE_PARAMS, 'house_price': price}, calculate_summary({**BASE_PARAMS, 'house_price': price}))
+            for price in prices]
+    listing = store.list_configs(order_by='house_price', descending=False)
+    assert list(listing.index) == keys
+    assert list(listing['house_price']) == prices
+
+    filtered = store.list_configs(order_by='house_price', ranges={'house_price': (None, 5000000)})
+    assert list(filtered.index) == [keys[1], keys[0]]
+    assert len(store.list_configs(limit=2)) == 2
+
+    with pytest.raises(ValueError):
+        store.list_configs(order_by='params')
+    with pytest.raises(ValueError):
+        store.list_configs(ranges={'params': (0, 1)})
+
+
+def test_get_many_and_delete(store):
+    other = {**BASE_PARAMS, 'monthly_rent': 10000}
+    keys = [store.save(params, calculate_summary(params)) for params in (BASE_PARAMS, other)]
+    loaded = store.get_many(keys + ['missing'])
+    assert set(loaded) == set(keys)
+    assert loaded[keys[1]][0] == other
+    assert store.get_many([]) == {}
+
+    assert store.delete(keys[0])
+    assert not store.delete(keys[0])
+    assert len(store) == 1
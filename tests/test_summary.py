@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""只计算摘要的路径：与完整计算的 summary 一致，全款购房等边界情况"""
+
+import math
+
+import numpy as np
+import pytest
+
+from conftest import BASE_PARAMS
+from rent_vs_buy_model import calculate_buy_vs_rent, calculate_summary, calculate_summary_batch
+
+
+@pytest.mark.parametrize('overrides', [
+    {},
+    {'living_years': 30, 'repayment_method': 'equal_principal'},
+    {'use_housing_fund': True, 'housing_fund_amount': 800000},
+    {'down_payment_percent': 100},
+])
+def test_summary_matches_full_calculation(overrides):
+    params = {**BASE_PARAMS, **overrides}
+    _, expected = calculate_buy_vs_rent(params)
+    summary = calculate_summary(params)
+    assert summary.keys() == expected.keys()
+    for key, value in expected.items():
+        if isinstance(value, float):
+            assert summary[key] == pytest.approx(value, rel=1e-9, abs=1e-6), key
+        else:
+            assert summary[key] == value, key
+
+
+def test_full_down_payment_summary():
+    params = {**BASE_PARAMS, 'down_payment_percent': 100}
+    summary = calculate_summary(params)
+    # 摘要取值为 Python 原生类型，调用方按0做除数判断
+    assert type(summary['monthly_payment']) is float
+    assert summary['monthly_payment'] == 0
+    assert summary['total_mortgage_payment'] == 0
+    assert summary['loan_remaining_percent'] == 0
+    assert math.isinf(summary['rent_coverage_ratio'])
+    assert summary['down_payment'] == params['house_price']
+
+    batch = calculate_summary_batch({key: np.array([value, value]) for key, value in params.items()})
+    assert (batch['monthly_payment'] == 0).all()
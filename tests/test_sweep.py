@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""单因素敏感度扫描：批量结果与逐点计算一致，取值范围和排序"""
+
+import numpy as np
+import pytest
+
+from conftest import BASE_PARAMS
+from rent_vs_buy_model import SIGNED_PARAMS, calculate_buy_vs_rent, one_at_a_time_sweep
+
+PARAMS = {**BASE_PARAMS, 'monthly_rent': 15000, 'living_years': 20}
+
+
+def terminal_difference(params):
+    results, _ = calculate_buy_vs_rent(params)
+    return results['成本差额(租-买)'].iloc[-1]
+
+
+def test_sweep_matches_pointwise_calculation():
+    sweep = one_at_a_time_sweep(PARAMS, n_steps=5)
+    assert sweep['baseline'] == pytest.approx(terminal_difference(PARAMS), rel=1e-9)
+    for k, key in enumerate(sweep['keys']):
+        for step in (0, 2, 4):
+            params = {**PARAMS, key: sweep['values'][k, step]}
+            assert sweep['terminal_difference'][k, step] == pytest.approx(terminal_difference(params), rel=1e-9), key
+
+
+def test_sweep_ranges_and_order():
+    params = {**PARAMS, 'down_payment_percent': 90, 'inflation_rate': 0.0}
+    sweep = one_at_a_time_sweep(params, relative_range=0.2, n_steps=7)
+    keys = sweep['keys']
+    values = sweep['values']
+    assert values.shape == sweep['terminal_difference'].shape == (len(keys), 7)
+    assert np.all(np.diff(values, axis=1) >= 0)
+
+    # 首付比例不超过100%，当前值为0时按 ±relative_range 个单位扫描，非 SIGNED_PARAMS 不小于0
+    assert values[keys.index('down_payment_percent'), -1] == 100
+    np.testing.assert_allclose(values[keys.index('inflation_rate'), [0, -1]], [-0.2, 0.2])
+    unsigned = [k for k, key in enumerate(keys) if key not in SIGNED_PARAMS]
+    assert np.all(values[unsigned] >= 0)
+
+    summary = sweep['summary']
+    assert list(summary.columns) == ['参数', '下限', '上限', '下限差额', '上限差额', '摆幅']
+    assert np.all(np.diff(summary['摆幅'].to_numpy()) <= 0)
+    swing = np.ptp(sweep['terminal_difference'], axis=1)
+    np.testing.assert_allclose(summary.loc[keys, '摆幅'], swing)